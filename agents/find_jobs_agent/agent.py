@@ -10,7 +10,14 @@ import os
 # Add the shared module to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 
-from config import get_gemini_model, get_model_config, create_session, setup_logging
+from config import config, get_hybrid_model, create_session, setup_logging
+from deadline import deadline_scope, iterate_with_deadline
+from memo import memoize_pipeline
+from profiling import profile_pipeline
+from structured_logging import log_context
+from prompts import PromptTemplate
+from tool_executor import offload_tools
+from usage import track_usage
 from google.adk.agents.llm_agent import LlmAgent
 from google.adk.agents.sequential_agent import SequentialAgent
 from google.adk.runners import Runner
@@ -25,12 +32,9 @@ APP_NAME = "job_search_agent"
 USER_ID = "job_seeker"
 
 def get_search_model():
-    """Get the appropriate model for search agent"""
-    google_api_key = os.getenv("GOOGLE_API_KEY")
+    """Search runs on Gemini (with Google Search) when configured, else on the local model"""
+    return get_hybrid_model(policy="remote", temperature=0.2)
 
-    if google_api_key:
-        logger.info("✅ Using Gemini model for Google Search agent")
-        return get_gemini_model()
 
 # Job search agent
 job_searcher = LlmAgent(
@@ -57,10 +61,12 @@ job_searcher = LlmAgent(
 # Job analyzer
 job_analyzer = LlmAgent(
     name="JobAnalyzer",
-    model=get_model_config(),
-    instruction="""You are a career advisor and job market analyst.
+    # Long report, decode-bound: use the draft model when one is configured,
+    # offload to the remote model when the local runner is saturated
+    model=get_hybrid_model(speculative=True),
+    instruction=PromptTemplate("""You are a career advisor and job market analyst.
 
-    Analyze the job search results from state['job_search_results'] and provide:
+    Analyze the job search results in <job_search_results> below and provide:
 
     1. **Job Market Overview**
        - Current demand for the role
@@ -91,7 +97,7 @@ job_analyzer = LlmAgent(
        - Resources for skill development
 
     Present findings in a clear, actionable format that helps with job search strategy.
-    """,
+    """, slots={"job_search_results": 6000}),
     description="Analyzes job market data and provides career guidance.",
     output_key="job_analysis"
 )
@@ -102,12 +108,25 @@ root_agent = SequentialAgent(
     sub_agents=[job_searcher, job_analyzer],
     description="Searches for jobs and provides comprehensive career analysis."
 )
+track_usage(root_agent)
+offload_tools(root_agent)
+
 
+# Test queries (also the prompt corpus for load and benchmark runs)
+TEST_QUERIES = [
+    os.getenv("TEST_QUERY", "Python developer jobs remote"),
+    "Data scientist positions in technology companies",
+    "DevOps engineer roles with Kubernetes experience",
+    "Frontend developer jobs with React and TypeScript"
+]
 
+
+@memoize_pipeline(root_agent, should_cache=lambda result: 'error' not in result)
+@profile_pipeline(APP_NAME, root_agent)
 async def find_jobs(job_query: str):
     """Find and analyze job opportunities"""
     try:
-        logger.info(f"💼 Searching for jobs: {job_query[:50]}...")
+        logger.info("💼 Searching for jobs: %.50s...", job_query)
 
         # Create session
         session_service, session = await create_session(APP_NAME, USER_ID)
@@ -155,14 +174,18 @@ async def find_jobs(job_query: str):
         search_results = None
         analysis = None
 
-        async for event in events:
-            if event.is_final_response():
-                if event.author == "JobSearcher":
-                    search_results = event.content.parts[0].text
-                elif event.author == "JobAnalyzer":
-                    analysis = event.content.parts[0].text
+        with deadline_scope(config.run_deadline), log_context(app=APP_NAME, session_id=session.id):
+            async for event in iterate_with_deadline(events):
+                if event.is_final_response():
+                    if event.author == "JobSearcher":
+                        search_results = event.content.parts[0].text
+                    elif event.author == "JobAnalyzer":
+                        analysis = event.content.parts[0].text
 
-                logger.info(f"📝 {event.author}: {len(event.content.parts[0].text)} characters")
+                    logger.info(
+                        "📝 %s: %d characters", event.author, len(event.content.parts[0].text),
+                        extra={"event": True, "agent": event.author, "run_id": event.invocation_id}
+                    )
 
         return {
             'search_results': search_results,
@@ -170,7 +193,7 @@ async def find_jobs(job_query: str):
         }
 
     except Exception as e:
-        logger.error(f"❌ Job search failed: {e}")
+        logger.error("❌ Job search failed: %s", e)
         return {'error': str(e)}
 
 
@@ -179,15 +202,7 @@ async def main():
     try:
         logger.info("🚀 Starting Job Search Agent...")
 
-        # Test job search queries
-        test_queries = [
-            os.getenv("TEST_QUERY", "Python developer jobs remote"),
-            "Data scientist positions in technology companies",
-            "DevOps engineer roles with Kubernetes experience",
-            "Frontend developer jobs with React and TypeScript"
-        ]
-
-        for i, query in enumerate(test_queries[:1], 1):  # Run first query only by default
+        for i, query in enumerate(TEST_QUERIES[:1], 1):  # Run first query only by default
             print(f"\n{'='*80}")
             print(f"💼 Job Search {i}")
             print(f"📋 Query: {query}")
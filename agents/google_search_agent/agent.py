@@ -10,7 +10,12 @@ import os
 # Add the shared module to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 
-from config import get_gemini_model, create_session, setup_logging
+from config import config, get_hybrid_model, create_session, setup_logging
+from deadline import deadline_scope, iterate_with_deadline
+from profiling import profile_pipeline
+from structured_logging import log_context
+from tool_executor import offload_tools
+from usage import track_usage
 from google.adk.agents.llm_agent import LlmAgent
 from google.adk.runners import Runner
 from google.adk.tools import google_search
@@ -27,16 +32,9 @@ USER_ID = "researcher"
 # Now supports both local LLM and Gemini based on environment variables
 
 def get_search_model():
-    """Get the appropriate model for search agent"""
-    google_api_key = os.getenv("GOOGLE_API_KEY")
+    """Search runs on Gemini (with Google Search) when configured, else on the local model"""
+    return get_hybrid_model(policy="remote", temperature=0.2)
 
-    if google_api_key:
-        logger.info("✅ Using Gemini model for Google Search agent")
-        return get_gemini_model()
-    else:
-        logger.info("⚠️ No GOOGLE_API_KEY found, using local model")
-        from config import get_model_config
-        return get_model_config(temperature=0.2)
 
 # Google Search Agent
 search_agent = LlmAgent(
@@ -67,12 +65,24 @@ search_agent = LlmAgent(
 
 # Create the root agent
 root_agent = search_agent
+track_usage(root_agent)
+offload_tools(root_agent)
 
 
+# Test queries (also the prompt corpus for load and benchmark runs)
+TEST_QUERIES = [
+    os.getenv("TEST_QUERY", "Docker Model Runner features and recent updates"),
+    "Latest trends in AI agent development frameworks 2025",
+    "Google ADK Agent Development Kit capabilities and use cases",
+    "Container orchestration platforms comparison 2025"
+]
+
+
+@profile_pipeline(APP_NAME, root_agent)
 async def perform_research(search_query: str):
     """Perform Google search research on a topic"""
     try:
-        logger.info(f"🔍 Researching: {search_query[:50]}...")
+        logger.info("🔍 Researching: %.50s...", search_query)
 
         # Create session
         session_service, session = await create_session(APP_NAME, USER_ID)
@@ -102,14 +112,15 @@ async def perform_research(search_query: str):
         )
 
         # Collect response
-        async for event in events:
-            if event.is_final_response():
-                return event.content.parts[0].text
+        with deadline_scope(config.run_deadline), log_context(app=APP_NAME, session_id=session.id):
+            async for event in iterate_with_deadline(events):
+                if event.is_final_response():
+                    return event.content.parts[0].text
 
         return None
 
     except Exception as e:
-        logger.error(f"❌ Research failed: {e}")
+        logger.error("❌ Research failed: %s", e)
         return f"Error performing research: {str(e)}"
 
 
@@ -124,15 +135,7 @@ async def main():
             logger.warning("⚠️ GOOGLE_API_KEY not found. Google Search may not work properly.")
             logger.info("💡 Set GOOGLE_API_KEY environment variable to enable Google Search.")
 
-        # Test research queries
-        test_queries = [
-            os.getenv("TEST_QUERY", "Docker Model Runner features and recent updates"),
-            "Latest trends in AI agent development frameworks 2025",
-            "Google ADK Agent Development Kit capabilities and use cases",
-            "Container orchestration platforms comparison 2025"
-        ]
-
-        for i, query in enumerate(test_queries[:1], 1):  # Run first query only by default
+        for i, query in enumerate(TEST_QUERIES[:1], 1):  # Run first query only by default
             print(f"\n{'='*80}")
             print(f"🧪 Research Task {i}")
             print(f"📋 Query: {query}")
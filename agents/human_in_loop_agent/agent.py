@@ -1,56 +1,29 @@
-from google.adk.models.lite_llm import LiteLlm
+import sys
+import os
+import asyncio
+
+# Add the shared module to the path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+
+from config import config, get_model_config
+from deadline import deadline_scope, iterate_with_deadline
+from history import compact_history
+from profiling import profile_pipeline
+from structured_logging import log_context
+from tool_executor import make_function_tool, offload_tools
+from prompts import PromptTemplate
+from usage import track_usage
 from google.adk.agents.llm_agent import LlmAgent
 from google.adk.agents.sequential_agent import SequentialAgent
 from google.genai import types
 from google.adk.sessions import InMemorySessionService
 from google.adk.runners import Runner
-from google.adk.tools import FunctionTool
 from typing import Optional
-import os
-import asyncio
 
 APP_NAME = "travel_planner"
 USER_ID = "user_01"
 SESSION_ID = "session_travel_01"
 
-def get_docker_model_runner_endpoint():
-    """Get Docker Model Runner endpoint with environment detection."""
-    explicit_endpoint = os.environ.get('DOCKER_MODEL_RUNNER')
-    if explicit_endpoint:
-        print(f"Using explicit DOCKER_MODEL_RUNNER: {explicit_endpoint}")
-        return explicit_endpoint
-
-    if _is_running_in_container():
-        endpoint = "http://model-runner.docker.internal/engines/llama.cpp/v1"
-        print("Detected container environment - using docker.internal endpoint")
-    else:
-        endpoint = "http://localhost:12434/engines/llama.cpp/v1"
-        print("Detected host environment - using localhost endpoint")
-
-    return endpoint
-
-def _is_running_in_container():
-    """Detect if we're running inside a Docker container."""
-    try:
-        return (
-            os.path.exists('/.dockerenv') or
-            (os.path.exists('/proc/self/cgroup') and 'docker' in open('/proc/self/cgroup', 'r').read())
-        )
-    except:
-        return False
-
-# Configuration
-api_base_url = get_docker_model_runner_endpoint()
-model_name_at_endpoint = "openai/ai/llama3.2:1B-Q8_0"
-
-# Set environment variables
-os.environ["OPENAI_API_KEY"] = os.environ.get("OPENAI_API_KEY", "anything")
-os.environ["OPENAI_API_BASE"] = api_base_url
-
-print(f"Configuration:")
-print(f"  API Base URL: {api_base_url}")
-print(f"  Model: {model_name_at_endpoint}")
-
 def ask_for_human_approval(planned_activities: str, user_input: Optional[str] = None) -> str:
     if user_input is None:
         return "pending"
@@ -63,74 +36,72 @@ def ask_for_human_approval(planned_activities: str, user_input: Optional[str] =
     else:
         return "pending"
 
-approval_tool = FunctionTool(func=ask_for_human_approval)
+# Runs on the tool thread pool so a blocking approval step doesn't stall other sessions
+approval_tool = make_function_tool(ask_for_human_approval)
 
 
 destination_agent = LlmAgent(
     name="DestinationSuggester",
-    model=LiteLlm(
-        model=model_name_at_endpoint,
-        api_base=api_base_url,
-        api_key="anything"
-    ),
+    model=get_model_config(),
     instruction="""
     Suggest a relaxing travel destination for a 3-day solo trip.
     Just name the destination with 1 short sentence explaining why.
     Output only the destination and reasoning.
     """,
-    output_key="suggested_destination"
+    output_key="suggested_destination",
+    before_model_callback=compact_history
 )
 
 activity_agent = LlmAgent(
     name="ActivityPlanner",
-    model=LiteLlm(
-        model=model_name_at_endpoint,
-        api_base=api_base_url,
-        api_key="anything"
+    model=get_model_config(),
+    instruction=PromptTemplate(
+        """
+        Based on the destination in <suggested_destination>, suggest 2-3 unique things to do there.
+        Summarize in 2-3 bullet points.
+        Output only the activities.
+        """,
+        slots={"suggested_destination": 500},
     ),
-    instruction="""
-    Based on the destination in state key 'suggested_destination', suggest 2-3 unique things to do there.
-    Summarize in 2-3 bullet points.
-    Output only the activities.
-    """,
-    output_key="planned_activities"
+    output_key="planned_activities",
+    before_model_callback=compact_history
 )
 
 human_approval_agent = LlmAgent(
     name="RequestHumanApproval",
-    model=LiteLlm(
-        model=model_name_at_endpoint,
-        api_base=api_base_url,
-        api_key="anything"
+    model=get_model_config(),
+    instruction=PromptTemplate(
+        """
+        Use the ask_for_human_approval tool with the activities in <planned_activities>.
+        The tool will prompt for approval or for choices after rejection.
+        Save the approval status or next action in state key 'user_approval' or 'user_next_action'.
+        """,
+        slots={"planned_activities": 2000},
     ),
-    instruction="""
-    Use the ask_for_human_approval tool with planned_activities from state.
-    The tool will prompt for approval or for choices after rejection.
-    Save the approval status or next action in state key 'user_approval' or 'user_next_action'.
-    """,
     tools=[approval_tool],
-    output_key="user_approval"
+    output_key="user_approval",
+    before_model_callback=compact_history
 )
 
 final_agent = LlmAgent(
     name="FinalConfirmer",
-    model=LiteLlm(
-        model=model_name_at_endpoint,
-        api_base=api_base_url,
-        api_key="anything"
+    model=get_model_config(),
+    instruction=PromptTemplate(
+        """
+        If <user_approval> is 'yes', confirm the travel plan by combining the destination and activities.
+
+        If <user_approval> is 'no',
+        check <user_next_action>:
+          - If 'change_destination', delete 'suggested_destination' from state.
+          - If 'change_days', ask user for new number of days and update 'trip_duration'.
+        Then reply with "Okay! Restarting with your updated preferences."
+
+        Otherwise, say "Plan rejected by user."
+        """,
+        slots={"user_approval": 200, "user_next_action": 200, "suggested_destination": 500, "planned_activities": 2000},
     ),
-    instruction="""
-    If state 'user_approval' is 'yes', confirm the travel plan by combining the destination and activities.
-
-    If state 'user_approval' is 'no',
-    check 'user_next_action':
-      - If 'change_destination', delete 'suggested_destination' from state.
-      - If 'change_days', ask user for new number of days and update 'trip_duration'.
-    Then reply with "Okay! Restarting with your updated preferences."
-
-    Otherwise, say "Plan rejected by user."
-    """,
-    output_key="final_confirmation"
+    output_key="final_confirmation",
+    before_model_callback=compact_history
 )
 
 root_agent = SequentialAgent(
@@ -142,10 +113,19 @@ root_agent = SequentialAgent(
         final_agent
     ]
 )
+track_usage(root_agent)
+offload_tools(root_agent)
+
+# Test queries (also the prompt corpus for load and benchmark runs)
+TEST_QUERIES = [
+    "Plan a short relaxing trip for me.",
+    "Plan a trip to dubai"
+]
 
 session_service = InMemorySessionService()
 runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
 
+@profile_pipeline(APP_NAME, root_agent)
 async def setup_and_run_agent():
     """Set up session and run the agent properly."""
 
@@ -155,21 +135,24 @@ async def setup_and_run_agent():
 
     print("Session created successfully!")
 
-    query = "Plan a short relaxing trip for me."
+    query = TEST_QUERIES[0]
     content = types.Content(role='user', parts=[types.Part(text=query)])
 
     print(f"\nSending query: {query}")
     print("Processing...")
 
-    async for event in runner.run_async(
+    events = runner.run_async(
         user_id=USER_ID,
         session_id=SESSION_ID,
         new_message=content
-    ):
-        if event.is_final_response():
-            print("\n✅ Final Response:")
-            print(event.content.parts[0].text)
-            break
+    )
+
+    with deadline_scope(config.run_deadline), log_context(app=APP_NAME, session_id=SESSION_ID):
+        async for event in iterate_with_deadline(events):
+            if event.is_final_response():
+                print("\n✅ Final Response:")
+                print(event.content.parts[0].text)
+                break
 
 if __name__ == "__main__":
     asyncio.run(setup_and_run_agent())
\ No newline at end of file
@@ -1,9 +1,19 @@
 import asyncio
 import sys
 import os
+from typing import Optional
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 
-from config import get_model_config, create_session, setup_logging
+from config import config, get_model_config, create_session, setup_logging
+from deadline import deadline_scope, iterate_with_deadline
+from evaluation import non_empty, section_presence
+from history import compact_history
+from profiling import profile_pipeline
+from structured_logging import log_context
+from results import EventRecord, ResultSink, result_sink
+from prompts import PromptTemplate
+from tool_executor import offload_tools
+from usage import track_usage
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.agents.llm_agent import LlmAgent
 from google.adk.agents.loop_agent import LoopAgent
@@ -23,37 +33,62 @@ STATE_MEAL_TYPE = "meal_type"
 
 recipe_generator = LlmAgent(
     name="RecipeAgent",
-    model=get_model_config(temperature=0.1),
-    instruction=f"""
-    You're a Creative Chef AI.
-    Use '{STATE_MEAL_TYPE}' from state to generate a healthy meal recipe.
-    If feedback exists in '{STATE_DIET_FEEDBACK}', modify the recipe accordingly.
-    Output only the recipe.
-    """,
+    model=get_model_config(temperature=0.1, semantic_cache_threshold=0.92),
+    instruction=PromptTemplate(
+        f"""
+        You're a Creative Chef AI.
+        Generate a healthy meal recipe for the requested meal (or <{STATE_MEAL_TYPE}> when given).
+        If there is feedback in <{STATE_DIET_FEEDBACK}>, improve the recipe in <{STATE_RECIPE}> accordingly.
+        Output only the recipe.
+        """,
+        slots={STATE_MEAL_TYPE: 200, STATE_DIET_FEEDBACK: 2000, STATE_RECIPE: 4000},
+    ),
     description="Generates or improves a recipe.",
-    output_key=STATE_RECIPE
+    output_key=STATE_RECIPE,
+    before_model_callback=compact_history
 )
 
 dietician_agent = LlmAgent(
     name="DieticianAgent",
     model=get_model_config(temperature=0.1),
-    instruction=f"""
-    You're a Dietician AI.
-    Review the recipe in '{STATE_RECIPE}'.
-    Suggest 1-2 brief improvements (e.g., reduce sugar, add protein).
-    Output only the feedback.
-    """,
+    instruction=PromptTemplate(
+        f"""
+        You're a Dietician AI.
+        Review the recipe in <{STATE_RECIPE}>.
+        Suggest 1-2 brief improvements (e.g., reduce sugar, add protein).
+        Output only the feedback.
+        """,
+        slots={STATE_RECIPE: 4000},
+    ),
     description="Gives nutritional feedback on the recipe.",
-    output_key=STATE_DIET_FEEDBACK
+    output_key=STATE_DIET_FEEDBACK,
+    before_model_callback=compact_history
 )
 
 root_agent = LoopAgent(
-    name="RecipeDietLoop", sub_agents=[recipe_generator, dietician_agent], max_iterations=2
+    name="RecipeDietLoop", sub_agents=[recipe_generator, dietician_agent],
+    max_iterations=int(os.getenv("RECIPE_LOOP_MAX_ITERATIONS", "2"))
 )
+track_usage(root_agent)
+offload_tools(root_agent)
+
+# Test queries (also the prompt corpus for load and benchmark runs)
+TEST_QUERIES = [
+    os.getenv("TEST_QUERY", "Suggest some healthy recipe with paneer"),
+    "Review Recipe",
+    "A high-protein vegetarian breakfast"
+]
+
+# Output checks for the evaluation harness (state key -> checks)
+EVAL_CHECKS = {
+    STATE_RECIPE: [section_presence("Ingredients", "Instructions")],
+    STATE_DIET_FEEDBACK: [non_empty],
+}
 
-async def call_agent(query):
+@profile_pipeline(APP_NAME, root_agent)
+async def call_agent(query, sink: Optional[ResultSink] = None):
     try:
-        logger.info(f"🚀 Processing query: {query[:50]}...")
+        logger.info("🚀 Processing query: %.50s...", query)
         
         # Create session
         session_service, session = await create_session(APP_NAME, USER_ID)
@@ -79,20 +114,28 @@ async def call_agent(query):
         )
         
         # Collect responses
+        sink = sink or result_sink
         responses = []
-        async for event in events:
-            if event.is_final_response():
-                response_text = event.content.parts[0].text
-                responses.append({
-                    'agent': event.author,
-                    'response': response_text
-                })
-                logger.info(f"📝 {event.author}: {len(response_text)} characters")
+        with deadline_scope(config.run_deadline), log_context(app=APP_NAME, session_id=session.id):
+            async for event in iterate_with_deadline(events):
+                if event.is_final_response():
+                    # Stream the full text to the sink; keep only a compact record
+                    record = await sink.emit(
+                        event.author, event.content.parts[0].text,
+                        run_id=event.invocation_id, session_id=session.id
+                    )
+                    responses.append(record)
+                    logger.info(
+                        "📝 %s: %d characters", event.author, record.length,
+                        extra={"event": True, "agent": event.author, "run_id": event.invocation_id}
+                    )
         
         return responses
         
     except Exception as e:
-        logger.error(f"❌ Pipeline execution failed: {e}")
-        return [{'agent': 'error', 'response': f"Error: {str(e)}"}]
+        logger.error("❌ Pipeline execution failed: %s", e)
+        return [EventRecord('error', len(str(e)), f"Error: {str(e)}")]
 
-call_agent("Review Recipe")
\ No newline at end of file
+if __name__ == "__main__":
+    for record in asyncio.run(call_agent(TEST_QUERIES[0])):
+        print(f"\n🤖 {record.agent}:\n{record.preview}")
\ No newline at end of file
@@ -6,13 +6,23 @@ Executes multiple market analysis agents in parallel.
 import asyncio
 import sys
 import os
+from typing import Optional
 
 # Add the shared module to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 
-from config import get_gemini_model, get_model_config, create_session, setup_logging
+from config import config, get_hybrid_model, create_session, setup_logging
+from deadline import deadline_scope, iterate_with_deadline
+from evaluation import section_presence
+from memo import memoize_pipeline
+from profiling import profile_pipeline
+from structured_logging import log_context
+from results import EventRecord, ResultSink, result_sink
+from fanout import QuorumFanoutAgent, is_partial
+from prompts import PromptTemplate
+from tool_executor import offload_tools
+from usage import track_usage
 from google.adk.agents.llm_agent import LlmAgent
-from google.adk.agents.parallel_agent import ParallelAgent
 from google.adk.runners import Runner
 from google.adk.tools import google_search
 from google.genai import types
@@ -26,16 +36,9 @@ USER_ID = "analyst"
 
 
 def get_search_model():
-    """Get the appropriate model for search agent"""
-    google_api_key = os.getenv("GOOGLE_API_KEY")
+    """Search runs on Gemini (with Google Search) when configured, else on the local model"""
+    return get_hybrid_model(policy="remote", temperature=0.2)
 
-    if google_api_key:
-        logger.info("✅ Using Gemini model for Google Search agent")
-        return get_gemini_model()
-    else:
-        logger.info("⚠️ No GOOGLE_API_KEY found, using local model")
-        from config import get_model_config
-        return get_model_config(temperature=0.2)
 
 # Define parallel analysis agents
 competitor_analyst = LlmAgent(
@@ -77,23 +80,21 @@ sentiment_analyzer = LlmAgent(
     output_key="sentiment_analysis"
 )
 
-# Create parallel execution group
-parallel_research_agent = ParallelAgent(
-    name="ParallelMarketResearch",
-    sub_agents=[competitor_analyst, trend_detector, sentiment_analyzer],
-    description="Executes market research tasks in parallel for comprehensive analysis."
-)
-
 # Create summary agent to synthesize parallel results
 summary_agent = LlmAgent(
     name="MarketIntelligenceSynthesizer",
-    model=get_model_config(temperature=0.1),
-    instruction="""You are a senior market intelligence director.
+    # Long report, decode-bound: use the draft model when one is configured,
+    # offload to the remote model when the local runner is saturated
+    model=get_hybrid_model(temperature=0.1, speculative=True),
+    instruction=PromptTemplate("""You are a senior market intelligence director.
 
-    Synthesize findings from the parallel research agents:
-    - Competitor Analysis from state['competitor_analysis']
-    - Trend Analysis from state['trend_analysis']
-    - Sentiment Analysis from state['sentiment_analysis']
+    Synthesize findings from the parallel research agents, given below as:
+    - Competitor Analysis in <competitor_analysis>
+    - Trend Analysis in <trend_analysis>
+    - Sentiment Analysis in <sentiment_analysis>
+
+    Some analyses may still be in progress; work with the ones available
+    and do not invent findings for the missing ones.
 
     Create a comprehensive market intelligence report with:
     1. Executive Summary (key insights)
@@ -103,23 +104,54 @@ summary_agent = LlmAgent(
     5. Strategic Recommendations
 
     Present findings in a clear, actionable format for decision-makers.
-    """,
+    """, slots={"competitor_analysis": 4000, "trend_analysis": 4000, "sentiment_analysis": 4000}),
     description="Synthesizes parallel research into comprehensive market intelligence.",
     output_key="market_intelligence_report"
 )
 
-# Create the sequential pipeline (parallel research → synthesis)
-root_agent = ParallelAgent(
+# Parallel research → synthesis once a quorum of analysts has answered;
+# late analyses are appended to the report as addenda
+root_agent = QuorumFanoutAgent(
     name="MarketIntelligenceAgent",
-    sub_agents=[parallel_research_agent, summary_agent],
+    sub_agents=[competitor_analyst, trend_detector, sentiment_analyzer, summary_agent],
+    quorum=config.fanout_quorum,
+    branch_timeout=config.fanout_branch_timeout,
+    late_timeout=config.fanout_late_timeout,
+    report_key="market_intelligence_report",
     description="Parallel market research followed by intelligent synthesis."
 )
-
-
-async def process_market_query(query: str):
-    """Process a market intelligence query"""
+track_usage(root_agent)
+offload_tools(root_agent)
+
+
+# Test queries (also the prompt corpus for load and benchmark runs)
+TEST_QUERIES = [
+    os.getenv("TEST_QUERY", "Analyze the current Docker and containerization market landscape including competitors, trends, and customer sentiment"),
+    "Research the SaaS productivity tools market including competitive analysis and emerging trends",
+    "Investigate the AI/ML development tools market with focus on developer sentiment and competitive positioning"
+]
+
+# Output checks for the evaluation harness (state key -> checks): the report sections asked for above
+EVAL_CHECKS = {
+    "market_intelligence_report": [section_presence(
+        "Executive Summary", "Competitive Landscape", "Emerging Trends", "Customer Sentiment",
+        "Strategic Recommendations",
+    )],
+}
+
+
+@memoize_pipeline(
+    root_agent,
+    # Errors, and reports written before every analyst answered, are not reused
+    should_cache=lambda responses: all(
+        response['agent'] != 'error' and not response.get('partial') for response in responses
+    )
+)
+@profile_pipeline(APP_NAME, root_agent)
+async def research_market(query: str):
+    """Run the market intelligence pipeline; returns every final response in full"""
     try:
-        logger.info(f"🚀 Processing market query: {query[:50]}...")
+        logger.info("🚀 Processing market query: %.50s...", query)
 
         # Create session
         session_service, session = await create_session(APP_NAME, USER_ID)
@@ -151,20 +183,45 @@ async def process_market_query(query: str):
 
         # Collect responses
         responses = []
-        async for event in events:
-            if event.is_final_response():
-                response_text = event.content.parts[0].text
-                responses.append({
-                    'agent': event.author,
-                    'response': response_text
-                })
-                logger.info(f"📝 {event.author}: {len(response_text)} characters")
+        with deadline_scope(config.run_deadline), log_context(app=APP_NAME, session_id=session.id):
+            async for event in iterate_with_deadline(events):
+                if event.is_final_response():
+                    text = event.content.parts[0].text
+                    responses.append({
+                        'agent': event.author, 'text': text,
+                        'run_id': event.invocation_id, 'session_id': session.id,
+                        'partial': is_partial(event),
+                    })
+                    logger.info(
+                        "📝 %s: %d characters", event.author, len(text),
+                        extra={"event": True, "agent": event.author, "run_id": event.invocation_id}
+                    )
 
         return responses
 
     except Exception as e:
-        logger.error(f"❌ Parallel execution failed: {e}")
-        return [{'agent': 'error', 'response': f"Error: {str(e)}"}]
+        logger.error("❌ Parallel execution failed: %s", e)
+        return [{'agent': 'error', 'text': f"Error: {str(e)}"}]
+
+
+async def process_market_query(query: str, sink: Optional[ResultSink] = None):
+    """Process a market intelligence query, writing each response to the sink.
+
+    Emitting happens outside the memoized pipeline, so a memo hit writes the
+    same records (with the ids of the run that produced them) as a fresh run.
+    """
+    sink = sink or result_sink
+    records = []
+    for response in await research_market(query):
+        if response['agent'] == 'error':
+            records.append(EventRecord('error', len(response['text']), response['text']))
+            continue
+        # Stream the full text to the sink; keep only a compact record
+        records.append(await sink.emit(
+            response['agent'], response['text'],
+            run_id=response['run_id'], session_id=response['session_id']
+        ))
+    return records
 
 
 async def main():
@@ -172,14 +229,7 @@ async def main():
     try:
         logger.info("🚀 Starting Parallel Market Intelligence Agent...")
 
-        # Test queries focused on market analysis
-        test_queries = [
-            os.getenv("TEST_QUERY", "Analyze the current Docker and containerization market landscape including competitors, trends, and customer sentiment"),
-            "Research the SaaS productivity tools market including competitive analysis and emerging trends",
-            "Investigate the AI/ML development tools market with focus on developer sentiment and competitive positioning"
-        ]
-
-        for i, query in enumerate(test_queries[:1], 1):  # Run first query only by default
+        for i, query in enumerate(TEST_QUERIES[:1], 1):  # Run first query only by default
             print(f"\n{'='*80}")
             print(f"🧪 Market Intelligence Analysis {i}")
             print(f"📋 Query: {query}")
@@ -187,23 +237,22 @@ async def main():
 
             responses = await process_market_query(query)
 
-            for response in responses:
-                print(f"\n🤖 {response['agent']}:")
+            for record in responses:
+                print(f"\n🤖 {record.agent}:")
                 print("-" * 50)
                 # Show a meaningful preview of each response
-                response_text = response['response']
-                if response['agent'] == 'MarketIntelligenceSynthesizer':
+                if record.agent == 'MarketIntelligenceSynthesizer':
                     # Show more of the final synthesized report
-                    if len(response_text) > 2000:
-                        print(response_text[:2000] + "\n... [report continues] ...")
+                    if record.length > 2000:
+                        print(record.preview[:2000] + "\n... [report continues] ...")
                     else:
-                        print(response_text)
+                        print(record.preview)
                 else:
                     # Show preview of individual agent responses
-                    if len(response_text) > 500:
-                        print(response_text[:500] + "\n... [analysis continues] ...")
+                    if record.length > 500:
+                        print(record.preview[:500] + "\n... [analysis continues] ...")
                     else:
-                        print(response_text)
+                        print(record.preview)
 
         logger.info("✅ Parallel market intelligence analysis completed!")
 
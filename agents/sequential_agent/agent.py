@@ -6,13 +6,20 @@ Creates a pipeline: Code Writer → Code Reviewer → Code Refactorer
 import asyncio
 import sys
 import os
+from typing import Optional
 
 # Add the shared module to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 
-from config import get_model_config, create_session, setup_logging
-from google.adk.agents.llm_agent import LlmAgent
-from google.adk.agents.sequential_agent import SequentialAgent
+from config import config, create_session, setup_logging
+from deadline import deadline_scope, iterate_with_deadline
+from evaluation import html_validity, non_empty
+from graph_loader import GraphAgent
+from profiling import profile_pipeline
+from structured_logging import log_context
+from results import EventRecord, ResultSink, result_sink
+from tool_executor import offload_tools
+from usage import track_usage
 from google.adk.runners import Runner
 from google.genai import types
 
@@ -23,72 +30,36 @@ logger = setup_logging()
 APP_NAME = "sequential_code_pipeline"
 USER_ID = "developer"
 
-# Define agents with improved instructions
-code_writer_agent = LlmAgent(
-    name="CodeWriterAgent",
-    model=get_model_config(temperature=0.1),
-    instruction="""You are an expert HTML/CSS developer.
-    Create clean, semantic HTML code based on user requirements.
-    Include proper structure, accessibility attributes, and basic CSS styling.
-    Output ONLY the complete HTML code - no explanations or markdown formatting.
-    """,
-    description="Generates initial HTML code from specifications.",
-    output_key="generated_code"
+# The pipeline (Code Writer → Code Reviewer → Code Refactorer) is defined in
+# graph.yaml and reloaded when the file changes
+root_agent = GraphAgent(
+    name="CodePipeline",
+    path=os.path.join(os.path.dirname(__file__), "graph.yaml"),
+    description="A 3-stage code development pipeline: Write → Review → Refactor"
 )
+track_usage(root_agent)
+offload_tools(root_agent)
 
-code_reviewer_agent = LlmAgent(
-    name="CodeReviewerAgent", 
-    model=get_model_config(temperature=0.1),
-    instruction="""You are a senior code reviewer specializing in web development.
-    Review the HTML code from state['generated_code'].
-    
-    Check for:
-    - HTML semantic structure
-    - Accessibility issues  
-    - CSS best practices
-    - Cross-browser compatibility
-    - Performance considerations
-    
-    Provide specific, actionable feedback in bullet points.
-    Focus on the most important improvements only.
-    """,
-    description="Reviews code and provides constructive feedback.",
-    output_key="review_comments"
-)
 
-code_refactor_agent = LlmAgent(
-    name="CodeRefactorerAgent",
-    model=get_model_config(temperature=0.1), 
-    instruction="""You are an expert code refactoring specialist.
-    
-    Take the original code from state['generated_code'] and 
-    the review feedback from state['review_comments'].
-    
-    Apply the suggested improvements to create better code.
-    Ensure the refactored code:
-    - Addresses all valid review points
-    - Maintains original functionality
-    - Follows modern web standards
-    - Is well-structured and readable
-    
-    Output ONLY the final refactored HTML code - no explanations.
-    """,
-    description="Refactors code based on review feedback.",
-    output_key="refactored_code"
-)
+# Test queries (also the prompt corpus for load and benchmark runs)
+TEST_QUERIES = [
+    os.getenv("TEST_QUERY", "Create a responsive HTML landing page with navigation"),
+    "Build a contact form with validation styling",
+    "Create a card component with image, title, and description"
+]
 
-# Create the sequential pipeline
-root_agent = SequentialAgent(
-    name="CodePipelineAgent",
-    sub_agents=[code_writer_agent, code_reviewer_agent, code_refactor_agent],
-    description="A 3-stage code development pipeline: Write → Review → Refactor"
-)
+# Output checks for the evaluation harness (state key -> checks)
+EVAL_CHECKS = {
+    "refactored_code": [html_validity],
+    "review_comments": [non_empty],
+}
 
 
-async def process_query(query: str):
+@profile_pipeline(APP_NAME, root_agent)
+async def process_query(query: str, sink: Optional[ResultSink] = None):
     """Process a single query through the sequential pipeline"""
     try:
-        logger.info(f"🚀 Processing query: {query[:50]}...")
+        logger.info("🚀 Processing query: %.50s...", query)
         
         # Create session
         session_service, session = await create_session(APP_NAME, USER_ID)
@@ -114,21 +85,27 @@ async def process_query(query: str):
         )
         
         # Collect responses
+        sink = sink or result_sink
         responses = []
-        async for event in events:
-            if event.is_final_response():
-                response_text = event.content.parts[0].text
-                responses.append({
-                    'agent': event.author,
-                    'response': response_text
-                })
-                logger.info(f"📝 {event.author}: {len(response_text)} characters")
+        with deadline_scope(config.run_deadline), log_context(app=APP_NAME, session_id=session.id):
+            async for event in iterate_with_deadline(events):
+                if event.is_final_response():
+                    # Stream the full text to the sink; keep only a compact record
+                    record = await sink.emit(
+                        event.author, event.content.parts[0].text,
+                        run_id=event.invocation_id, session_id=session.id
+                    )
+                    responses.append(record)
+                    logger.info(
+                        "📝 %s: %d characters", event.author, record.length,
+                        extra={"event": True, "agent": event.author, "run_id": event.invocation_id}
+                    )
         
         return responses
         
     except Exception as e:
-        logger.error(f"❌ Pipeline execution failed: {e}")
-        return [{'agent': 'error', 'response': f"Error: {str(e)}"}]
+        logger.error("❌ Pipeline execution failed: %s", e)
+        return [EventRecord('error', len(str(e)), f"Error: {str(e)}")]
 
 
 async def main():
@@ -136,29 +113,21 @@ async def main():
     try:
         logger.info("🚀 Starting Sequential Code Pipeline Agent...")
         
-        # Test queries
-        test_queries = [
-            os.getenv("TEST_QUERY", "Create a responsive HTML landing page with navigation"),
-            "Build a contact form with validation styling",
-            "Create a card component with image, title, and description"
-        ]
-        
-        for i, query in enumerate(test_queries[:1], 1):  # Run first query only by default
+        for i, query in enumerate(TEST_QUERIES[:1], 1):  # Run first query only by default
             print(f"\n{'='*80}")
             print(f"🧪 Test {i}: {query}")
             print('='*80)
             
             responses = await process_query(query)
             
-            for response in responses:
-                print(f"\n🤖 {response['agent']}:")
+            for record in responses:
+                print(f"\n🤖 {record.agent}:")
                 print("-" * 50)
                 # Truncate very long responses for readability
-                response_text = response['response']
-                if len(response_text) > 1000:
-                    print(response_text[:1000] + "\n... [truncated] ...")
+                if record.length > 1000:
+                    print(record.preview[:1000] + "\n... [truncated] ...")
                 else:
-                    print(response_text)
+                    print(record.preview)
                     
         logger.info("✅ Sequential agent completed successfully!")
                 
@@ -0,0 +1,226 @@
+"""
+Offline batch runner for bulk report generation.
+Reads queries from a JSONL file, runs them through an agent pipeline with
+bounded concurrency and appends one JSON result per query to an output file.
+Model calls are grouped by stage, so the same agent's prompts run back to back
+on a warm prefix cache. The output file doubles as the checkpoint: rerunning
+the job skips queries that already succeeded.
+
+Usage:
+    # queries.jsonl: {"id": "docker", "query": "Analyze the Docker market"} per line
+    python agents/shared/batch.py parallel_agent queries.jsonl reports.jsonl --concurrency 16 --slots 4
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional, Set
+
+SHARED_DIR = os.path.dirname(os.path.abspath(__file__))
+AGENTS_DIR = os.path.dirname(SHARED_DIR)
+
+logger = logging.getLogger(__name__)
+
+
+class StageScheduler:
+    """Admits model calls for one agent (stage) at a time, up to `slots` concurrently.
+
+    The active stage keeps the model until it has no calls waiting or in flight;
+    then the stage with the most waiting calls takes over.
+    """
+
+    def __init__(self, slots: int = 4):
+        self.slots = slots
+        self.active: Optional[str] = None
+        self.in_flight = 0
+        self.waiting: Dict[str, Deque[asyncio.Future]] = defaultdict(deque)
+        self.switches = 0
+
+    def _dispatch(self):
+        if self.in_flight == 0 and not self.waiting.get(self.active):
+            candidates = {agent: len(queue) for agent, queue in self.waiting.items() if queue}
+            new_active = max(candidates, key=candidates.get) if candidates else None
+            if new_active is not None and new_active != self.active:
+                self.switches += 1
+            self.active = new_active
+
+        queue = self.waiting.get(self.active)
+        while queue and self.in_flight < self.slots:
+            future = queue.popleft()
+            if not future.done():
+                future.set_result(None)
+                self.in_flight += 1
+
+    @asynccontextmanager
+    async def slot(self, agent: Optional[str]):
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[agent or "unknown"].append(future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled; hand the slot back
+                self.in_flight -= 1
+                self._dispatch()
+            raise
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._dispatch()
+
+
+def read_queries(path: str) -> List[Dict[str, Any]]:
+    """Queries as {"id", "query"}; ids default to the line number"""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"query": item}
+            item.setdefault("id", str(line_number))
+            queries.append(item)
+    return queries
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids already answered successfully in an existing output file"""
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partial line from an interrupted run
+                if not record.get("error"):
+                    done.add(str(record["id"]))
+    return done
+
+
+def trim_partial_line(path: str):
+    """Cut an interrupted run's unfinished last line, so new records start on a line of their own"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Find the last newline, reading backwards in blocks
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                break
+            end = start
+        else:
+            f.truncate(0)
+    logger.warning(f"⚠️ Dropped an unfinished line at the end of {path}")
+
+
+async def run_query(root_agent, app_name: str, query: str) -> List[Dict[str, str]]:
+    """Run one query through the pipeline and return every final response"""
+    from google.adk.runners import Runner
+    from google.genai import types
+    from config import create_session
+
+    session_service, session = await create_session(app_name, "batch")
+    runner = Runner(agent=root_agent, app_name=app_name, session_service=session_service)
+    content = types.Content(role="user", parts=[types.Part(text=query)])
+    results = []
+    async for event in runner.run_async(user_id="batch", session_id=session.id, new_message=content):
+        if event.error_code:
+            raise RuntimeError(f"{event.author}: {event.error_code} {event.error_message}")
+        if event.is_final_response() and event.content and event.content.parts:
+            results.append({"agent": event.author, "text": event.content.parts[0].text or ""})
+    return results
+
+
+async def run_batch(root_agent, app_name: str, queries: List[Dict[str, Any]], output_path: str,
+                    concurrency: int = 8, slots: Optional[int] = 4) -> Dict[str, int]:
+    """Run queries with bounded concurrency, appending results as they finish"""
+    from deadline import deadline_scope
+    from model_client import model_gate
+    from config import config
+
+    scheduler = StageScheduler(slots) if slots else None
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"succeeded": 0, "failed": 0}
+
+    trim_partial_line(output_path)
+    with open(output_path, "a", encoding="utf-8") as output:
+        async def worker(item):
+            async with semaphore:
+                # Set inside the task, so the gate applies to this query's model calls only
+                token = model_gate.set(scheduler)
+                started = time.perf_counter()
+                record = {"id": item["id"], "query": item["query"]}
+                try:
+                    with deadline_scope(config.run_deadline):
+                        record["results"] = await run_query(root_agent, app_name, item["query"])
+                    counts["succeeded"] += 1
+                except Exception as e:
+                    record["error"] = str(e)
+                    counts["failed"] += 1
+                    logger.error(f"❌ Query {item['id']} failed: {e}")
+                finally:
+                    model_gate.reset(token)
+                record["seconds"] = round(time.perf_counter() - started, 3)
+                # One line per query, flushed immediately: the file is the checkpoint
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+
+        await asyncio.gather(*(worker(item) for item in queries))
+
+    if scheduler:
+        counts["stage_switches"] = scheduler.switches
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of queries through an agent pipeline")
+    parser.add_argument("agent", help="Agent package name, e.g. parallel_agent")
+    parser.add_argument("input", help="JSONL file of {\"id\", \"query\"} objects (or plain strings)")
+    parser.add_argument("output", help="JSONL results file; also used to resume an interrupted job")
+    parser.add_argument("--concurrency", type=int, default=8, help="Queries in progress at once")
+    parser.add_argument("--slots", type=int, default=4,
+                        help="Model calls in flight at once, grouped by stage (0 = no grouping)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, AGENTS_DIR)
+    module = importlib.import_module(f"{args.agent}.agent")
+
+    queries = read_queries(args.input)
+    done = completed_ids(args.output)
+    pending = [item for item in queries if str(item["id"]) not in done]
+    logger.info(f"📦 {len(pending)} of {len(queries)} queries to run ({len(done)} already done)")
+
+    started = time.perf_counter()
+    counts = asyncio.run(run_batch(
+        module.root_agent, f"batch_{args.agent}", pending, args.output, args.concurrency, args.slots
+    ))
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"✅ Batch finished in {elapsed:.1f}s: {counts['succeeded']} succeeded, {counts['failed']} failed "
+        f"({counts['succeeded'] / elapsed:.2f} queries/s, {counts.get('stage_switches', 0)} stage switches)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+Benchmark recorder for regression tracking.
+Runs agent pipelines a fixed number of times against the stub model server,
+records per-agent latency, token counts and output length in a SQLite store
+keyed by git commit, and compares them with a baseline commit using a
+Mann-Whitney U test. Exits non-zero when a metric regressed significantly.
+
+Usage:
+    # Record the current commit and compare with the last benchmarked one
+    python agents/shared/bench.py sequential_agent loop_agent --runs 10
+
+    # Compare uncommitted prompt changes with a given commit
+    python agents/shared/bench.py sequential_agent --baseline main --report bench.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from importlib import metadata
+from typing import Any, Dict, List, Optional, Tuple
+
+SHARED_DIR = os.path.dirname(os.path.abspath(__file__))
+AGENTS_DIR = os.path.dirname(SHARED_DIR)
+
+# Samples of the whole run, next to the per-agent ones
+PIPELINE = "(pipeline)"
+
+# Metric -> which change is a regression and the relative change of the median that matters
+METRICS = {
+    "latency_s": ("increase", 0.10),
+    "prompt_tokens": ("increase", 0.02),
+    "completion_tokens": ("increase", 0.02),
+    # Longer answers are slower, shorter ones may have lost content
+    "output_chars": ("change", 0.02),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    commit_sha TEXT NOT NULL,
+    dirty INTEGER NOT NULL,
+    pipeline TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    runs INTEGER NOT NULL,
+    environment TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    recording_id INTEGER NOT NULL REFERENCES recordings(id),
+    iteration INTEGER NOT NULL,
+    agent TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recordings_by_commit ON recordings(pipeline, commit_sha);
+CREATE INDEX IF NOT EXISTS samples_by_recording ON samples(recording_id);
+"""
+
+
+class BenchmarkStore:
+    """Benchmark samples per pipeline and commit in a SQLite file"""
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def record(self, commit: str, dirty: bool, pipeline: str, environment: Dict[str, Any],
+               runs: List[Dict[str, Dict[str, float]]]) -> int:
+        with self.db:
+            recording_id = self.db.execute(
+                "INSERT INTO recordings (commit_sha, dirty, pipeline, recorded_at, runs, environment) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (commit, int(dirty), pipeline, time.time(), len(runs), json.dumps(environment)),
+            ).lastrowid
+            self.db.executemany(
+                "INSERT INTO samples (recording_id, iteration, agent, metric, value) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (recording_id, iteration, agent, metric, value)
+                    for iteration, run in enumerate(runs)
+                    for agent, metrics in run.items()
+                    for metric, value in metrics.items()
+                ],
+            )
+        return recording_id
+
+    def baseline(self, pipeline: str, exclude_id: int, commit: Optional[str] = None,
+                 current_commit: Optional[str] = None, current_dirty: bool = False) -> Optional[sqlite3.Row]:
+        """Latest recording of `commit`, or of the last other benchmarked commit; clean trees first.
+
+        A dirty tree is compared with the clean recording of its own commit, so
+        uncommitted changes are measured against what they change.
+        """
+        if commit:
+            condition, params = "commit_sha LIKE ?", [f"{commit}%"]
+        elif current_dirty:
+            condition, params = "1", []
+        else:
+            condition, params = "commit_sha != ?", [current_commit]
+        return self.db.execute(
+            f"SELECT * FROM recordings WHERE pipeline = ? AND id != ? AND {condition} "
+            "ORDER BY dirty, commit_sha = ? DESC, id DESC LIMIT 1",
+            [pipeline, exclude_id, *params, current_commit],
+        ).fetchone()
+
+    def samples(self, recording_id: int) -> Dict[Tuple[str, str], List[float]]:
+        series = defaultdict(list)
+        for row in self.db.execute(
+            "SELECT agent, metric, value FROM samples WHERE recording_id = ? ORDER BY iteration", (recording_id,)
+        ):
+            series[(row["agent"], row["metric"])].append(row["value"])
+        return series
+
+
+def mann_whitney_u(baseline: List[float], current: List[float], alternative: str = "two-sided") -> float:
+    """p-value of the Mann-Whitney U test (normal approximation, tie-corrected).
+
+    `alternative` is "greater" (current tends to be larger), "less" or "two-sided".
+    """
+    n1, n2 = len(current), len(baseline)
+    n = n1 + n2
+    combined = sorted([(value, True) for value in current] + [(value, False) for value in baseline])
+    rank_sum = 0.0
+    ties = 0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1
+        rank_sum += rank * sum(1 for k in range(i, j + 1) if combined[k][1])
+        ties += (j - i + 1) ** 3 - (j - i + 1)
+        i = j + 1
+
+    u = rank_sum - n1 * (n1 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0  # every sample is equal
+    shift = u - n1 * n2 / 2
+    if alternative == "greater":
+        z = (shift - 0.5) / math.sqrt(variance)
+    elif alternative == "less":
+        z = (-shift - 0.5) / math.sqrt(variance)
+    else:
+        z = (abs(shift) - 0.5) / math.sqrt(variance)
+        return min(1.0, math.erfc(z / math.sqrt(2)))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def compare(baseline: Dict[Tuple[str, str], List[float]], current: Dict[Tuple[str, str], List[float]],
+            alpha: float = 0.05, min_samples: int = 3) -> List[Dict[str, Any]]:
+    """One verdict per agent and metric measured in both recordings"""
+    rows = []
+    for agent, metric in sorted(set(baseline) & set(current)):
+        before, after = baseline[(agent, metric)], current[(agent, metric)]
+        if len(before) < min_samples or len(after) < min_samples:
+            continue
+        direction, threshold = METRICS.get(metric, ("change", 0.05))
+        base_median, median = _median(before), _median(after)
+        change = (median - base_median) / base_median if base_median else (math.inf if median else 0.0)
+
+        if direction == "increase":
+            p_worse = mann_whitney_u(before, after, "greater")
+            p_better = mann_whitney_u(before, after, "less")
+            if p_worse < alpha and change > threshold:
+                verdict, p_value = "regressed", p_worse
+            elif p_better < alpha and change < -threshold:
+                verdict, p_value = "improved", p_better
+            else:
+                verdict, p_value = "ok", min(p_worse, p_better)
+        else:
+            p_value = mann_whitney_u(before, after)
+            verdict = "changed" if p_value < alpha and abs(change) > threshold else "ok"
+
+        rows.append({
+            "agent": agent,
+            "metric": metric,
+            "baseline": round(base_median, 4),
+            "current": round(median, 4),
+            "change": round(change, 4) if math.isfinite(change) else None,
+            "p_value": round(p_value, 4),
+            "verdict": verdict,
+        })
+    return rows
+
+
+def current_commit() -> Tuple[str, bool]:
+    """HEAD of the checkout and whether tracked files have uncommitted changes"""
+    try:
+        def git(*args):
+            return subprocess.run(
+                ["git", *args], cwd=AGENTS_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        return git("rev-parse", "HEAD"), bool(git("status", "--porcelain", "--untracked-files=no"))
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", True
+
+
+def resolve_commit(ref: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", ref], cwd=AGENTS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ref  # not a ref here; may still be a commit recorded elsewhere
+
+
+def environment(args) -> Dict[str, Any]:
+    """What besides the commit can move the numbers"""
+    versions = {}
+    for package in ("google-adk", "litellm", "google-genai"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "python": platform.python_version(),
+        "packages": versions,
+        "stub": None if args.no_stub else {"token_delay": args.stub_token_delay},
+        "queries": args.queries,
+    }
+
+
+async def measure_run(root_agent, app_name: str, query: str) -> Dict[str, Dict[str, float]]:
+    """Latency, tokens and output length per agent (and for the whole run) of one run"""
+    from google.adk.runners import Runner
+    from google.genai import types
+    from config import create_session
+    from profiling import RunProfile, recording
+    from usage import usage_ledger
+
+    session_service, session = await create_session(app_name, "bench")
+    runner = Runner(agent=root_agent, app_name=app_name, session_service=session_service)
+    content = types.Content(role="user", parts=[types.Part(text=query)])
+    profile = RunProfile(app_name)
+    output_chars: Dict[str, int] = defaultdict(int)
+    invocation_id = None
+
+    started = time.perf_counter()
+    with recording(profile):
+        async for event in runner.run_async(user_id="bench", session_id=session.id, new_message=content):
+            invocation_id = event.invocation_id
+            if event.error_code:
+                raise RuntimeError(f"{event.author}: {event.error_code} {event.error_message}")
+            if not event.partial and event.content and event.content.parts:
+                output_chars[event.author] += sum(len(part.text or "") for part in event.content.parts)
+    elapsed = time.perf_counter() - started
+
+    usage = usage_ledger.usage("run", invocation_id) or {}
+    metrics: Dict[str, Dict[str, float]] = defaultdict(dict)
+    for agent, wall in profile.agent_wall.items():
+        metrics[agent]["latency_s"] = wall
+    for agent, tokens in usage.get("agents", {}).items():
+        metrics[agent]["prompt_tokens"] = tokens["prompt_tokens"]
+        metrics[agent]["completion_tokens"] = tokens["completion_tokens"]
+    for agent, chars in output_chars.items():
+        metrics[agent]["output_chars"] = chars
+    metrics[PIPELINE] = {
+        "latency_s": elapsed,
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "output_chars": sum(output_chars.values()),
+    }
+    return dict(metrics)
+
+
+async def benchmark(module, name: str, runs: int, queries: int) -> List[Dict[str, Dict[str, float]]]:
+    from profiling import add_timing_callbacks
+
+    root_agent = add_timing_callbacks(module.root_agent)
+    corpus = list(getattr(module, "TEST_QUERIES", []))[:queries] or ["Hello"]
+    app_name = f"bench_{name}"
+
+    # One unmeasured run pays for lazy imports and connection setup
+    await measure_run(root_agent, app_name, corpus[0])
+    # Runs are sequential: concurrent runs would measure contention, not the pipeline
+    return [await measure_run(root_agent, app_name, corpus[i % len(corpus)]) for i in range(runs)]
+
+
+def print_report(pipeline: str, baseline: sqlite3.Row, rows: List[Dict[str, Any]]):
+    print(f"\n📊 {pipeline}: {baseline['commit_sha'][:10]}{' (dirty)' if baseline['dirty'] else ''} -> current")
+    print(f"{'agent':<32} {'metric':<18} {'baseline':>10} {'current':>10} {'change':>8} {'p':>7}  verdict")
+    for row in rows:
+        change = "n/a" if row["change"] is None else f"{row['change']:+.1%}"
+        marker = {"regressed": "❌", "changed": "⚠️", "improved": "✅"}.get(row["verdict"], "")
+        print(
+            f"{row['agent']:<32} {row['metric']:<18} {row['baseline']:>10} {row['current']:>10} "
+            f"{change:>8} {row['p_value']:>7}  {row['verdict']} {marker}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record agent pipeline benchmarks and compare with a baseline")
+    parser.add_argument("agents", nargs="+", help="Agent package names, e.g. sequential_agent")
+    parser.add_argument("--runs", type=int, default=10, help="Measured runs per pipeline")
+    parser.add_argument("--queries", type=int, default=1, help="TEST_QUERIES used, in rotation")
+    parser.add_argument("--db", default="benchmarks.sqlite", help="SQLite file holding the history")
+    parser.add_argument("--baseline", help="Commit or ref to compare with (default: last benchmarked commit)")
+    parser.add_argument("--commit", help="Record under this commit instead of the checkout's HEAD")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level of the U test")
+    parser.add_argument("--report", help="Write the comparison to this JSON file")
+    parser.add_argument("--no-stub", action="store_true", help="Run against the configured Model Runner")
+    parser.add_argument("--stub-port", type=int, default=12435)
+    parser.add_argument("--stub-token-delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    from loadgen import start_stub_server
+
+    stub: Optional[subprocess.Popen] = None
+    if not args.no_stub:
+        stub = start_stub_server(args.stub_port, args.stub_token_delay)
+        os.environ["DOCKER_MODEL_RUNNER"] = f"http://127.0.0.1:{args.stub_port}/engines/llama.cpp/v1"
+        # Everything answered by the stub, so runs are repeatable
+        os.environ["HYBRID_REMOTE"] = "none"
+    # Cached answers and background work would measure something else
+    os.environ.update({
+        "SEMANTIC_CACHE_ENABLED": "false", "PIPELINE_CACHE_TTL": "0", "REQUEST_COALESCING": "false",
+        "MODEL_WARMUP": "false", "ENDPOINT_MONITOR": "false", "ADK_PROFILE": "false",
+    })
+
+    commit, dirty = (args.commit, False) if args.commit else current_commit()
+    store = BenchmarkStore(args.db)
+    report = {"commit": commit, "dirty": dirty, "pipelines": {}}
+    failed = False
+    try:
+        sys.path.insert(0, AGENTS_DIR)
+        for name in args.agents:
+            # Configuration is read at import, so agents are imported after the env is set
+            module = importlib.import_module(f"{name}.agent")
+            runs = asyncio.run(benchmark(module, name, args.runs, args.queries))
+            recording_id = store.record(commit, dirty, name, environment(args), runs)
+            print(f"✅ Recorded {len(runs)} runs of {name} for {commit[:10]}{' (dirty)' if dirty else ''}")
+
+            baseline = store.baseline(
+                name, recording_id, resolve_commit(args.baseline) if args.baseline else None, commit, dirty
+            )
+            if baseline is None:
+                print(f"ℹ️ No baseline recorded for {name} yet; nothing to compare")
+                continue
+            rows = compare(store.samples(baseline["id"]), store.samples(recording_id), args.alpha)
+            print_report(name, baseline, rows)
+            regressions = [row for row in rows if row["verdict"] in ("regressed", "changed")]
+            failed = failed or bool(regressions)
+            report["pipelines"][name] = {
+                "baseline": {"commit": baseline["commit_sha"], "dirty": bool(baseline["dirty"])},
+                "passed": not regressions,
+                "metrics": rows,
+            }
+    finally:
+        if stub:
+            stub.terminate()
+
+    report["passed"] = not failed
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    print(f"\n{'❌ FAIL' if failed else '✅ PASS'}: {len(report['pipelines'])} pipelines compared")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Helpers for attaching callbacks across an agent tree.
+"""
+
+CALLBACK_FIELDS = (
+    "before_agent_callback",
+    "after_agent_callback",
+    "before_model_callback",
+    "after_model_callback",
+    "before_tool_callback",
+    "after_tool_callback",
+)
+
+
+def add_callbacks(agent, recursive: bool = True, **callbacks):
+    """Append callbacks to an agent (and its sub-agents) without replacing existing ones.
+
+    Keyword names are callback fields, e.g. `before_model_callback=fn`. Model and
+    tool callbacks are only attached to agents that support them (LlmAgent).
+    """
+    for field, callback in callbacks.items():
+        if field not in CALLBACK_FIELDS:
+            raise ValueError(f"Unknown callback field: {field}")
+        if field not in type(agent).model_fields:
+            continue
+
+        existing = getattr(agent, field)
+        if existing is None:
+            setattr(agent, field, [callback])
+        elif isinstance(existing, list):
+            if callback not in existing:
+                setattr(agent, field, [*existing, callback])
+        elif existing is not callback:
+            setattr(agent, field, [existing, callback])
+
+    if recursive:
+        # Agents that rebuild their sub-tree (GraphAgent) re-apply these after a reload
+        remember = getattr(agent, "remember_callbacks", None)
+        if remember is not None:
+            remember(callbacks)
+        for sub_agent in agent.sub_agents or []:
+            add_callbacks(sub_agent, recursive=True, **callbacks)
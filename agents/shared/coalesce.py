@@ -0,0 +1,96 @@
+"""
+Single-flight coalescing for identical concurrent requests.
+The first caller for a key starts the upstream generation on its own task;
+callers arriving while it is in flight join it and receive every response
+(replayed, then streamed) instead of sending a duplicate request.
+"""
+
+import asyncio
+import logging
+import weakref
+from typing import Any, AsyncGenerator, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-flight upstream generation and the callers waiting on it"""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.updated = asyncio.Event()
+
+    def notify(self):
+        self.updated.set()
+        self.updated = asyncio.Event()
+
+
+class SingleFlight:
+    """Share one async generator run between concurrent callers with the same key"""
+
+    def __init__(self):
+        # asyncio objects belong to one event loop; keep flights per loop
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Flight]]" = weakref.WeakKeyDictionary()
+        self.started = 0
+        self.joined = 0
+
+    async def _produce(self, flights: Dict[Hashable, _Flight], key: Hashable, flight: _Flight,
+                       factory: Callable[[], AsyncGenerator[Any, None]]):
+        try:
+            async for item in factory():
+                flight.items.append(item)
+                flight.notify()
+        except BaseException as e:
+            flight.error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            flight.finished = True
+            flight.notify()
+            if flights.get(key) is flight:
+                del flights[key]
+
+    async def stream(self, key: Hashable, factory: Callable[[], AsyncGenerator[Any, None]],
+                     copy: Callable[[Any], Any] = lambda item: item,
+                     copy_joined: Optional[Callable[[Any], Any]] = None) -> AsyncGenerator[Any, None]:
+        """Yield the responses of `factory()`, run once for all concurrent callers of `key`.
+
+        `copy` is applied to every item handed to a caller, so callers can't see
+        each other's mutations; callers that joined an existing flight get
+        `copy_joined` instead when given (e.g. to mark replayed responses). The
+        upstream run is cancelled once its last caller goes away.
+        """
+        flights = self._flights.setdefault(asyncio.get_running_loop(), {})
+        flight = flights.get(key)
+        if flight is None:
+            flight = flights[key] = _Flight()
+            flight.task = asyncio.create_task(self._produce(flights, key, flight, factory))
+            self.started += 1
+        else:
+            self.joined += 1
+            copy = copy_joined or copy
+            logger.debug(f"🔗 Joined in-flight request ({flight.subscribers} already waiting)")
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(flight.items):
+                    yield copy(flight.items[index])
+                    index += 1
+                if flight.finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.updated.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.finished:
+                # Nobody is listening any more; stop generating tokens
+                if flights.get(key) is flight:
+                    del flights[key]
+                flight.task.cancel()
@@ -3,106 +3,382 @@ Centralized configuration module for all ADK agents.
 Handles Docker Model Runner endpoint detection and environment variables.
 """
 
+import asyncio
+import copy
 import os
-import socket
 import logging
-from typing import Optional, Dict, Any
-from urllib.parse import urlparse
+import time
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Mapping
 
 logger = logging.getLogger(__name__)
 
+# Common container networking patterns, tried in order
+CONTAINER_ENDPOINTS = [
+    "http://host.docker.internal:12434/engines/llama.cpp/v1",  # Docker Desktop
+    "http://model-runner.docker.internal:12434/engines/llama.cpp/v1",  # Docker internal
+    "http://172.17.0.1:12434/engines/llama.cpp/v1",  # Default Docker bridge
+    "http://model-runner:12434/engines/llama.cpp/v1",  # Docker Compose service
+]
+LOCALHOST_ENDPOINT = "http://localhost:12434/engines/llama.cpp/v1"
+
+
+def _get_model_name(env: Mapping[str, str]) -> str:
+    """Get model name with proper OpenAI prefix"""
+    model = env.get("MODEL_NAME", "ai/llama3.2:1B-Q8_0")
+    
+    # Ensure openai/ prefix for Docker Model Runner
+    if not model.startswith("openai/"):
+        model = f"openai/{model}"
+        
+    return model
+
+
+def _running_in_container(env: Mapping[str, str]) -> bool:
+    """Detect if code is running inside a container"""
+    indicators = [
+        os.path.exists("/.dockerenv"),  # Docker creates this file
+        os.path.exists("/run/.containerenv"),  # Podman creates this
+        env.get("KUBERNETES_SERVICE_HOST") is not None,  # Kubernetes
+        env.get("CONTAINER") == "docker",  # Some images set this
+    ]
+    
+    return any(indicators)
+
+
+class EndpointProbe:
+    """Outcome of one GET of an endpoint's `/models`"""
+
+    __slots__ = ("endpoint", "serves_model", "latency", "error")
+
+    def __init__(self, endpoint: str, serves_model: Optional[bool] = None,
+                 latency: Optional[float] = None, error: Optional[str] = None):
+        self.endpoint = endpoint
+        self.serves_model = serves_model  # None when the endpoint didn't answer
+        self.latency = latency
+        self.error = error
+
+    @property
+    def reachable(self) -> bool:
+        return self.serves_model is not None
+
+
+async def probe_endpoint(session, endpoint: str, model: str) -> EndpointProbe:
+    """GET `/models` once; the one probe behind detection, health checks and warm-up"""
+    started = time.perf_counter()
+    try:
+        async with session.get(f"{endpoint.rstrip('/')}/models") as response:
+            response.raise_for_status()
+            payload = await response.json()
+    except Exception as e:
+        logger.debug(f"Probe of {endpoint} failed: {e}")
+        return EndpointProbe(endpoint, error=str(e) or type(e).__name__)
+    latency = time.perf_counter() - started
+    served = [entry.get("id") for entry in payload.get("data", [])]
+    if model not in served:
+        logger.debug(f"Probe of {endpoint}: {model} is not served there")
+    return EndpointProbe(endpoint, serves_model=model in served, latency=latency)
+
+
+async def probe_endpoints(endpoints: List[str], model: str, api_key: str, timeout: float) -> List[EndpointProbe]:
+    """Probe endpoints concurrently over one session, results in the order given"""
+    import aiohttp
+
+    async with aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=timeout), headers={"Authorization": f"Bearer {api_key}"}
+    ) as session:
+        return list(await asyncio.gather(*(probe_endpoint(session, endpoint, model) for endpoint in endpoints)))
+
+
+async def discover_endpoint(candidates: List[str], model: str, api_key: str, timeout: float) -> Optional[str]:
+    """Probe candidates concurrently; the first serving the model wins, then the first answering"""
+    probes = await probe_endpoints(candidates, model, api_key, timeout)
+    for wanted in (True, False):
+        for probe in probes:
+            if probe.serves_model is wanted:
+                return probe.endpoint
+    return None
+
+
+def _known_endpoint(env: Mapping[str, str]) -> Optional[str]:
+    """The endpoint when there is nothing to probe: an explicit one, or localhost outside a container"""
+    
+    # Explicit environment variable (Docker run -e)
+    docker_model_runner = env.get("DOCKER_MODEL_RUNNER")
+    if docker_model_runner:
+        logger.info(f"✅ Using DOCKER_MODEL_RUNNER: {docker_model_runner}")
+        return docker_model_runner
+        
+    # Outside a container: localhost (development/direct host execution)
+    if not _running_in_container(env):
+        logger.info(f"🏠 Using localhost endpoint: {LOCALHOST_ENDPOINT}")
+        return LOCALHOST_ENDPOINT
+    return None
+
+
+async def detect_endpoint(env: Mapping[str, str]) -> str:
+    """Auto-detect the correct Docker Model Runner endpoint"""
+    endpoint = _known_endpoint(env)
+    if endpoint:
+        return endpoint
+        
+    # In a container: try common container networking patterns, all at once
+    endpoint = await discover_endpoint(
+        CONTAINER_ENDPOINTS,
+        _get_model_name(env)[len("openai/"):],
+        env.get("OPENAI_API_KEY", "anything"),
+        float(env.get("ENDPOINT_PROBE_TIMEOUT", "2")),
+    )
+    if endpoint:
+        logger.info(f"✅ Auto-detected container endpoint: {endpoint}")
+        return endpoint
+        
+    # Nothing answered: fall back to localhost
+    logger.warning("⚠️ No container endpoints reachable, falling back to localhost")
+    logger.info(f"🏠 Using localhost endpoint: {LOCALHOST_ENDPOINT}")
+    return LOCALHOST_ENDPOINT
+
+
+class _ActiveEndpoint:
+    """The endpoint new requests go to; shared by a config and the copies made from it"""
+
+    __slots__ = ("url",)
+
+    def __init__(self, url: str):
+        self.url = url
+
 
 class ModelRunnerConfig:
-    """Container-aware configuration for Docker Model Runner endpoints"""
+    """Container-aware configuration for Docker Model Runner endpoints.
+
+    Settings are read once from `env` (default os.environ) and the instance is
+    immutable afterwards; keyword overrides replace single settings, and
+    `replace()` derives a modified copy, e.g. for one agent. Inside an event
+    loop use `await ModelRunnerConfig.create()`, which probes without blocking;
+    a config built synchronously there starts on the first container endpoint
+    and detects the real one in the background.
+    """
     
-    def __init__(self):
-        self.api_base = self._detect_model_runner_endpoint()
-        self.model_name = self._get_model_name()
-        self.api_key = os.getenv("OPENAI_API_KEY", "anything")
-        self.google_api_key = os.getenv("GOOGLE_API_KEY")
-        self.google_cloud_location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
+    def __init__(self, api_base: Optional[str] = None, env: Optional[Mapping[str, str]] = None, **overrides):
+        env = dict(os.environ if env is None else env)
+        self._env = env
+        self._detection: Optional[asyncio.Task] = None
+        if api_base is None:
+            api_base = _known_endpoint(env)
+        if api_base is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                api_base = asyncio.run(detect_endpoint(env))
+            else:
+                # Built from a coroutine (e.g. an agent module imported lazily by a
+                # server): probing here would stall the loop, so detect in a task
+                api_base = CONTAINER_ENDPOINTS[0]
+                logger.info(f"🔎 Detecting the container endpoint in the background; starting on {api_base}")
+                self._detection = loop.create_task(self._detect_in_background(env))
+        self._endpoint = _ActiveEndpoint(api_base)
+        self.model_name = _get_model_name(env)
+        self.api_key = env.get("OPENAI_API_KEY", "anything")
+        self.google_api_key = env.get("GOOGLE_API_KEY")
+        self.google_cloud_location = env.get("GOOGLE_CLOUD_LOCATION", "us-central1")
+        
+        # Endpoint health monitoring and re-discovery (extra endpoints are comma-separated)
+        self.endpoint_monitor_enabled = env.get("ENDPOINT_MONITOR", "true").lower() == "true"
+        self.endpoint_check_interval = float(env.get("ENDPOINT_CHECK_INTERVAL", "15"))
+        self.endpoint_failure_threshold = int(env.get("ENDPOINT_FAILURE_THRESHOLD", "3"))
+        self.endpoint_latency_threshold = float(env.get("ENDPOINT_LATENCY_THRESHOLD", "2"))
+        self.endpoint_probe_timeout = float(env.get("ENDPOINT_PROBE_TIMEOUT", "2"))
+        self.endpoint_fallbacks = tuple(
+            endpoint.strip() for endpoint in env.get("MODEL_RUNNER_FALLBACK_ENDPOINTS", "").split(",") if endpoint.strip()
+        )
+        
+        # Startup warm-up settings
+        self.warmup_enabled = env.get("MODEL_WARMUP", "true").lower() == "true"
+        self.warmup_timeout = float(env.get("MODEL_WARMUP_TIMEOUT", "120"))
+        self.warmup_agents = tuple(
+            name.strip() for name in env.get("WARMUP_AGENTS", "").split(",") if name.strip()
+        )
+        
+        # Pipeline result memoization (TTL of 0 disables it)
+        self.pipeline_cache_ttl = float(env.get("PIPELINE_CACHE_TTL", "300"))
+        self.pipeline_cache_stale_ttl = float(env.get("PIPELINE_CACHE_STALE_TTL", "0"))
+        self.pipeline_cache_max_entries = int(env.get("PIPELINE_CACHE_MAX_ENTRIES", "256"))
+        
+        # Hot reload of declarative agent graphs (checked between runs)
+        self.graph_hot_reload = env.get("GRAPH_HOT_RELOAD", "true").lower() == "true"
+        self.graph_reload_interval = float(env.get("GRAPH_RELOAD_INTERVAL", "2"))
+        
+        # Default deadline for a whole agent run in seconds (0 = no deadline)
+        self.run_deadline = float(env.get("RUN_DEADLINE_SECONDS", "0")) or None
         
-        # Set environment variables for LiteLLM compatibility
-        os.environ["OPENAI_API_KEY"] = self.api_key
-        os.environ["OPENAI_API_BASE"] = self.api_base
+        # Default length cap for state slots in compiled prompt templates
+        self.prompt_slot_max_chars = int(env.get("PROMPT_SLOT_MAX_CHARS", "4000"))
+        
+        # Conversation history policy (0 turns = send the full history)
+        self.history_max_turns = int(env.get("HISTORY_MAX_TURNS", "4"))
+        self.history_summary_chars = int(env.get("HISTORY_SUMMARY_CHARS", "200"))
+        self.history_max_summary_chars = int(env.get("HISTORY_MAX_SUMMARY_CHARS", "2000"))
+        
+        # Profiling mode (per-agent timings, sampling profile and event-loop lag)
+        self.profile_enabled = env.get("ADK_PROFILE", "false").lower() == "true"
+        self.profile_dir = env.get("ADK_PROFILE_DIR", "profiles")
+        self.profile_interval = float(env.get("ADK_PROFILE_INTERVAL", "0.001"))
+        
+        # Logging (LOG_FORMAT is "text" or "json"; per-event logs are sampled)
+        self.log_level = env.get("LOG_LEVEL", "INFO")
+        self.log_format = env.get("LOG_FORMAT", "text")
+        self.log_event_sample_rate = float(env.get("LOG_EVENT_SAMPLE_RATE", "1.0"))
+        
+        # Quorum fan-out: synthesize once FANOUT_QUORUM branches answered and the timeout passed
+        self.fanout_quorum = int(env.get("FANOUT_QUORUM", "2"))
+        self.fanout_branch_timeout = float(env.get("FANOUT_BRANCH_TIMEOUT", "30")) or None
+        self.fanout_late_timeout = float(env.get("FANOUT_LATE_TIMEOUT", "0")) or None
+        
+        # Pools for synchronous tools (timeout and concurrency are per tool; 0 = unlimited)
+        self.tool_max_threads = int(env.get("TOOL_MAX_THREADS", "8"))
+        self.tool_max_processes = int(env.get("TOOL_MAX_PROCESSES", "2"))
+        self.tool_timeout = float(env.get("TOOL_TIMEOUT", "30"))
+        self.tool_max_concurrency = int(env.get("TOOL_MAX_CONCURRENCY", "4"))
+        
+        # Result sink for runner output: empty (previews only), a file path or tcp://host:port
+        self.result_sink = env.get("RESULT_SINK", "")
+        self.result_preview_chars = int(env.get("RESULT_PREVIEW_CHARS", "2000"))
+        
+        # Speculative decoding: draft model loaded into the llama.cpp runtime (empty = disabled)
+        self.draft_model = env.get("DRAFT_MODEL", "")
+        self.speculative_draft_max = int(env.get("SPECULATIVE_DRAFT_MAX", "16"))
+        self.speculative_draft_min = int(env.get("SPECULATIVE_DRAFT_MIN", "0"))
+        self.speculative_p_min = float(env.get("SPECULATIVE_P_MIN", "0.75"))
+        
+        # Token budgets per run, session and user (0 = unlimited); past the soft budget answers
+        # are capped at TOKEN_BUDGET_DOWNGRADE_MAX_TOKENS, past the hard budget the run stops
+        self.token_budgets = MappingProxyType({
+            scope: MappingProxyType({
+                "soft": int(env.get(f"TOKEN_BUDGET_{scope.upper()}_SOFT", "0")),
+                "hard": int(env.get(f"TOKEN_BUDGET_{scope.upper()}_HARD", "0")),
+            })
+            for scope in ("run", "session", "user")
+        })
+        self.token_budget_downgrade_max_tokens = int(env.get("TOKEN_BUDGET_DOWNGRADE_MAX_TOKENS", "256"))
+        
+        # Hybrid routing: HYBRID_REMOTE is gemini, mock or none; policies are auto, local or remote
+        # (HYBRID_AGENT_POLICY overrides them per agent, e.g. "JobSearcher=remote,CodeWriterAgent=local")
+        self.hybrid_remote = env.get("HYBRID_REMOTE", "gemini")
+        self.hybrid_remote_model = env.get("HYBRID_REMOTE_MODEL", "gemini-2.0-flash")
+        self.hybrid_default_policy = env.get("HYBRID_DEFAULT_POLICY", "auto")
+        self.hybrid_agent_policies = MappingProxyType(dict(
+            item.split("=", 1) for item in env.get("HYBRID_AGENT_POLICY", "").replace(" ", "").split(",") if "=" in item
+        ))
+        self.hybrid_max_local_queue = int(env.get("HYBRID_MAX_LOCAL_QUEUE", "4"))
+        self.hybrid_max_local_latency = float(env.get("HYBRID_MAX_LOCAL_LATENCY", "0"))
+        self.hybrid_max_remote_concurrency = int(env.get("HYBRID_MAX_REMOTE_CONCURRENCY", "8"))
+        self.hybrid_mock_latency = float(env.get("HYBRID_MOCK_LATENCY", "0.05"))
+        
+        # Share one upstream generation between identical concurrent model calls
+        self.request_coalescing = env.get("REQUEST_COALESCING", "true").lower() == "true"
+        
+        # Semantic prompt cache (embedding model served by Model Runner, empty = hashing embedder)
+        self.semantic_cache_enabled = env.get("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        self.embedding_model = env.get("EMBEDDING_MODEL", "")
+        self.semantic_cache_max_entries = int(env.get("SEMANTIC_CACHE_MAX_ENTRIES", "1024"))
+        
+        # Explicit settings win over the environment; nothing is written back to it
+        self._apply(overrides)
+        self._frozen = True
         
         logger.info(f"🔧 Model Runner Configuration:")
         logger.info(f"   API Base: {self.api_base}")
         logger.info(f"   Model: {self.model_name}")
         logger.info(f"   Running in container: {self._running_in_container()}")
+        if self.semantic_cache_enabled and not self.embedding_model:
+            logger.info("   Semantic cache: off (set EMBEDDING_MODEL to enable it)")
+        if self.draft_model:
+            logger.info(f"   Draft model: {self.draft_model} (runtime flags: {' '.join(self.speculative_runtime_flags())})")
         
-    def _detect_model_runner_endpoint(self) -> str:
-        """Auto-detect the correct Docker Model Runner endpoint"""
+    @classmethod
+    async def create(cls, env: Optional[Mapping[str, str]] = None, **overrides) -> "ModelRunnerConfig":
+        """Build a config from inside an event loop; endpoint probes don't block the loop"""
+        env = dict(os.environ if env is None else env)
+        api_base = overrides.pop("api_base", None) or await detect_endpoint(env)
+        return cls(api_base=api_base, env=env, **overrides)
         
-        # 1. Check explicit environment variable (Docker run -e)
-        docker_model_runner = os.getenv("DOCKER_MODEL_RUNNER")
-        if docker_model_runner:
-            logger.info(f"✅ Using DOCKER_MODEL_RUNNER: {docker_model_runner}")
-            return docker_model_runner
-            
-        # 2. Check if we're running in a container
+    async def _detect_in_background(self, env: Mapping[str, str]):
+        endpoint = await detect_endpoint(env)
+        if endpoint != self.api_base:
+            self.switch_endpoint(endpoint)
+        
+    def __setattr__(self, name: str, value: Any):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"ModelRunnerConfig is immutable; use config.replace({name}=...) for a modified copy")
+        super().__setattr__(name, value)
+        
+    def _apply(self, changes: Dict[str, Any]):
+        unknown = [name for name in changes if name.startswith("_") or name not in self.__dict__]
+        if unknown:
+            raise TypeError(f"Unknown ModelRunnerConfig settings: {', '.join(unknown)}")
+        self.__dict__.update(changes)
+        
+    def replace(self, **changes) -> "ModelRunnerConfig":
+        """Copy with some settings changed; an explicit api_base stops following endpoint switches"""
+        clone = copy.copy(self)
+        if "api_base" in changes:
+            clone.__dict__["_endpoint"] = _ActiveEndpoint(changes.pop("api_base"))
+        clone._apply(changes)
+        return clone
+        
+    @property
+    def api_base(self) -> str:
+        return self._endpoint.url
+        
+    def candidate_endpoints(self) -> List[str]:
+        """Endpoints to try when re-discovering Model Runner, in order of preference"""
+        candidates = [self._env.get("DOCKER_MODEL_RUNNER", ""), *self.endpoint_fallbacks]
         if self._running_in_container():
-            # Try common container networking patterns
-            container_endpoints = [
-                "http://host.docker.internal:12434/engines/llama.cpp/v1",  # Docker Desktop
-                "http://model-runner.docker.internal:12434/engines/llama.cpp/v1",  # Docker internal
-                "http://172.17.0.1:12434/engines/llama.cpp/v1",  # Default Docker bridge
-                "http://model-runner:12434/engines/llama.cpp/v1",  # Docker Compose service
-            ]
-            
-            for endpoint in container_endpoints:
-                if self._test_endpoint_connectivity(endpoint):
-                    logger.info(f"✅ Auto-detected container endpoint: {endpoint}")
-                    return endpoint
-                    
-            logger.warning("⚠️ No container endpoints reachable, falling back to localhost")
-            
-        # 3. Fallback to localhost (development/direct host execution)
-        localhost_endpoint = "http://localhost:12434/engines/llama.cpp/v1"
-        logger.info(f"🏠 Using localhost endpoint: {localhost_endpoint}")
-        return localhost_endpoint
-        
-    def _get_model_name(self) -> str:
-        """Get model name with proper OpenAI prefix"""
-        model = os.getenv("MODEL_NAME", "ai/llama3.2:1B-Q8_0")
-        
-        # Ensure openai/ prefix for Docker Model Runner
-        if not model.startswith("openai/"):
-            model = f"openai/{model}"
-            
-        return model
+            candidates.extend(CONTAINER_ENDPOINTS)
+        candidates.append(LOCALHOST_ENDPOINT)
+        return list(dict.fromkeys(endpoint for endpoint in candidates if endpoint))
+        
+    def switch_endpoint(self, endpoint: str):
+        """Point new model requests at another endpoint; requests in flight keep theirs"""
+        previous, self._endpoint.url = self._endpoint.url, endpoint
+        logger.warning(f"🔀 Switched Model Runner endpoint: {previous} -> {endpoint}")
+        
+    @property
+    def semantic_cache_active(self) -> bool:
+        """Semantic caching needs a real embedding model; word overlap isn't meaning"""
+        return self.semantic_cache_enabled and bool(self.embedding_model)
+        
+    @property
+    def served_model_name(self) -> str:
+        """Model name as known to Docker Model Runner (without the LiteLLM prefix)"""
+        return self.model_name[len("openai/"):] if self.model_name.startswith("openai/") else self.model_name
         
     def _running_in_container(self) -> bool:
-        """Detect if code is running inside a container"""
-        indicators = [
-            os.path.exists("/.dockerenv"),  # Docker creates this file
-            os.path.exists("/run/.containerenv"),  # Podman creates this
-            os.getenv("KUBERNETES_SERVICE_HOST") is not None,  # Kubernetes
-            os.getenv("CONTAINER") == "docker",  # Some images set this
+        return _running_in_container(self._env)
+    
+    def speculative_runtime_flags(self) -> List[str]:
+        """llama.cpp server flags that load the draft model"""
+        return [
+            "--model-draft", self.draft_model,
+            "--draft-max", str(self.speculative_draft_max),
+            "--draft-min", str(self.speculative_draft_min),
+            "--draft-p-min", str(self.speculative_p_min),
         ]
         
-        return any(indicators)
-        
-    def _test_endpoint_connectivity(self, endpoint: str) -> bool:
-        """Test if an endpoint is reachable"""
-        try:
-            parsed = urlparse(endpoint)
-            host = parsed.hostname
-            port = parsed.port or (443 if parsed.scheme == 'https' else 80)
-            
-            # Quick socket test
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(2)
-            result = sock.connect_ex((host, port))
-            sock.close()
-            
-            return result == 0
-            
-        except Exception as e:
-            logger.debug(f"Connectivity test failed for {endpoint}: {e}")
-            return False
+    def get_speculative_params(self, enabled: bool) -> Dict[str, Any]:
+        """Per-request llama.cpp speculative decoding fields (none without a draft model)"""
+        if not self.draft_model:
+            return {}
+        if not enabled:
+            # Short stages don't benefit; keep the draft model from competing for CPU
+            return {"speculative.n_max": 0}
+        return {
+            "speculative.n_max": self.speculative_draft_max,
+            "speculative.n_min": self.speculative_draft_min,
+            "speculative.p_min": self.speculative_p_min,
+        }
     
-    def get_litellm_config(self, **kwargs) -> Dict[str, Any]:
+    def get_litellm_config(self, speculative: bool = False, **kwargs) -> Dict[str, Any]:
         """Get LiteLLM configuration dictionary"""
         config = {
             "model": self.model_name,
@@ -114,6 +390,10 @@ class ModelRunnerConfig:
         
         # Add any additional kwargs
         config.update(kwargs)
+        
+        speculative_params = self.get_speculative_params(speculative)
+        if speculative_params:
+            config["extra_body"] = {**speculative_params, **config.get("extra_body", {})}
         return config
     
     def get_gemini_config(self) -> Dict[str, Any]:
@@ -131,18 +411,46 @@ class ModelRunnerConfig:
 config = ModelRunnerConfig()
 
 
-def get_model_config(**kwargs):
-    """Convenience function to get LiteLLM model configuration"""
-    from google.adk.models.lite_llm import LiteLlm
-    return LiteLlm(**config.get_litellm_config(**kwargs))
+def get_model_config(semantic_cache_threshold: Optional[float] = None,
+                     cfg: Optional[ModelRunnerConfig] = None, **kwargs):
+    """Convenience function to get the shared Model Runner client.
+
+    Pass semantic_cache_threshold (cosine similarity, e.g. 0.92) to reuse responses
+    for near-duplicate prompts; only do this for deterministic stages. Pass
+    speculative=True for long, decode-bound stages to use the DRAFT_MODEL, and
+    cfg to use an agent's own config instead of the global one.
+    """
+    from model_client import ModelRunnerLlm
+    cfg = cfg or config
+    if not cfg.semantic_cache_active:
+        semantic_cache_threshold = None
+    return ModelRunnerLlm(
+        semantic_cache_threshold=semantic_cache_threshold,
+        cfg=cfg,
+        **cfg.get_litellm_config(**kwargs)
+    )
+
+
+def get_hybrid_model(policy: Optional[str] = None, **kwargs):
+    """Model that runs on Model Runner and offloads to the remote provider under load.
+
+    `policy` is auto, local or remote (default HYBRID_DEFAULT_POLICY); other
+    arguments configure the local client as in get_model_config.
+    """
+    from hybrid import HybridLlm, get_remote_model
+    return HybridLlm(
+        local=get_model_config(**kwargs),
+        remote=get_remote_model(),
+        policy=policy or config.hybrid_default_policy,
+    )
 
 
-def get_gemini_model():
+def get_gemini_model(model: str = "gemini-2.0-flash"):
     """Convenience function to get Gemini model configuration"""
     from google.adk.models.google_llm import Gemini
     gemini_config = config.get_gemini_config()
     return Gemini(
-        model="gemini-2.0-flash",
+        model=model,
         api_key=gemini_config["api_key"],
         location=gemini_config["location"]
     )
@@ -162,9 +470,11 @@ async def create_session(app_name: str, user_id: str = "default_user"):
 
 
 def setup_logging():
-    """Setup consistent logging across all agents"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    """Setup consistent, non-blocking logging across all agents (configured once)"""
+    from structured_logging import configure_logging
+    configure_logging(
+        level=config.log_level,
+        fmt=config.log_format,
+        event_sample_rate=config.log_event_sample_rate
     )
     return logging.getLogger(__name__)
@@ -0,0 +1,80 @@
+"""
+Run-level deadlines and cancellation.
+The deadline of a run lives in a context variable, so it follows the run into
+every sub-agent task and the model client without changing ADK signatures.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Absolute deadline (time.monotonic) of the current run, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("run_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a run outlives its deadline"""
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current run's deadline (None when unbounded)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline():
+    """Fail fast instead of starting new work after the deadline has passed"""
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("Run deadline exceeded")
+
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]):
+    """Bound everything run inside this scope to `timeout` seconds.
+
+    Nested scopes can only shorten the deadline. A timeout of None is a no-op.
+    """
+    if timeout is None:
+        yield
+        return
+
+    deadline = time.monotonic() + timeout
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def iterate_with_deadline(agen: AsyncGenerator[T, None]) -> AsyncGenerator[T, None]:
+    """Iterate an async generator, cancelling the pending step when the deadline passes.
+
+    Cancelling the step aborts whatever it is awaiting (e.g. the HTTP request to
+    the model server), so no tokens are generated for an abandoned run.
+    """
+    try:
+        while True:
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded("Run deadline exceeded")
+            # asyncio.timeout keeps the step in this task, so context-local state
+            # (tracing spans, the deadline itself) behaves as without a deadline
+            timeout = asyncio.timeout(remaining)
+            try:
+                async with timeout:
+                    item = await agen.__anext__()
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                if not timeout.expired():
+                    raise  # a timeout raised by the generator itself
+                raise DeadlineExceeded("Run deadline exceeded") from None
+            yield item
+    finally:
+        await agen.aclose()
@@ -0,0 +1,146 @@
+"""
+Health monitoring and re-discovery of the Model Runner endpoint.
+A background thread probes the active endpoint's `/models` and model calls
+report connection failures. When the endpoint keeps failing or gets slow, the
+candidate endpoints are probed again and new requests switch to the best one;
+requests already in flight finish on the endpoint they started on.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import config, ModelRunnerConfig, probe_endpoints
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest probe in the smoothed latency
+LATENCY_SMOOTHING = 0.3
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Errors that say the endpoint is unreachable or broken, not that the request was bad"""
+    import litellm
+
+    return isinstance(error, (
+        litellm.APIConnectionError, litellm.ServiceUnavailableError, litellm.InternalServerError,
+        ConnectionError,
+    ))
+
+
+class EndpointMonitor:
+    """Watches the active endpoint of a config and re-runs discovery when it degrades"""
+
+    def __init__(self, cfg: ModelRunnerConfig = config):
+        self.cfg = cfg
+        self.consecutive_failures = 0
+        self.latency: Optional[float] = None
+        self.switches = 0
+        self.last_check: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def probe(self, endpoints: List[str]) -> Dict[str, float]:
+        """Seconds taken by `/models` on each endpoint that lists the configured model"""
+        # Runs on the monitor thread, which has no event loop of its own
+        probes = asyncio.run(probe_endpoints(
+            endpoints, self.cfg.served_model_name, self.cfg.api_key, self.cfg.endpoint_probe_timeout
+        ))
+        return {probe.endpoint: probe.latency for probe in probes if probe.serves_model}
+
+    def record(self, endpoint: str, ok: bool, error: Optional[str] = None):
+        """Report the outcome of a request to `endpoint` (results for old endpoints are ignored)"""
+        with self._lock:
+            if endpoint != self.cfg.api_base:
+                return
+            if ok:
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            self.last_error = error
+            failing = self.consecutive_failures >= self.cfg.endpoint_failure_threshold
+        if failing:
+            # Don't wait for the next scheduled check
+            self._wake.set()
+
+    @property
+    def degraded(self) -> bool:
+        if self.consecutive_failures >= self.cfg.endpoint_failure_threshold:
+            return True
+        threshold = self.cfg.endpoint_latency_threshold
+        return bool(threshold) and self.latency is not None and self.latency > threshold
+
+    def check(self) -> bool:
+        """Probe the active endpoint and re-discover if it is degraded; True after a switch"""
+        endpoint = self.cfg.api_base
+        latency = self.probe([endpoint]).get(endpoint)
+        self.last_check = time.time()
+        if latency is None:
+            self.record(endpoint, ok=False, error="health probe failed")
+        else:
+            self.record(endpoint, ok=True)
+            self.latency = latency if self.latency is None else (
+                LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency
+            )
+        return self.rediscover() if self.degraded else False
+
+    def rediscover(self) -> bool:
+        """Switch to the fastest healthy candidate endpoint; True if the endpoint changed"""
+        current = self.cfg.api_base
+        logger.warning(
+            f"⚠️ Model Runner endpoint {current} degraded "
+            f"({self.consecutive_failures} failures, latency {self.latency}); re-discovering"
+        )
+        # All candidates at once: a dead one costs one probe timeout, not one each
+        healthy = self.probe(list(dict.fromkeys(self.cfg.candidate_endpoints() + [current])))
+        if not healthy:
+            logger.error(f"❌ No Model Runner endpoint reachable; staying on {current}")
+            return False
+
+        best = min(healthy, key=healthy.get)
+        with self._lock:
+            self.consecutive_failures = 0
+            self.latency = healthy[best]
+            if best == current:
+                return False
+            # A single attribute assignment: new requests read it, in-flight ones already hold theirs
+            self.cfg.switch_endpoint(best)
+            self.switches += 1
+        return True
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.cfg.endpoint_check_interval)
+            self._wake.clear()
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"❌ Endpoint health check failed: {e}")
+
+    def ensure_started(self):
+        """Start the monitor thread once (no-op when ENDPOINT_MONITOR is off)"""
+        if self._thread is not None or not self.cfg.endpoint_monitor_enabled:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="endpoint-monitor", daemon=True)
+                self._thread.start()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.cfg.api_base,
+            "degraded": self.degraded,
+            "consecutive_failures": self.consecutive_failures,
+            "latency": round(self.latency, 4) if self.latency is not None else None,
+            "last_check": self.last_check,
+            "last_error": self.last_error,
+            "switches": self.switches,
+            "candidates": self.cfg.candidate_endpoints(),
+        }
+
+
+endpoint_monitor = EndpointMonitor(config)
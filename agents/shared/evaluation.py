@@ -0,0 +1,391 @@
+"""
+Evaluation harness for output quality versus speed.
+Runs a fixed prompt set through an agent pipeline under several
+configurations (sets of environment overrides, e.g. a smaller MODEL_NAME or a
+lower PROMPT_SLOT_MAX_CHARS) in parallel, one process per configuration (or
+per shard of its prompts) so each configuration is read fresh at import. Outputs are scored with cheap deterministic checks that
+agent modules declare in EVAL_CHECKS, next to TEST_QUERIES; quality is then
+reported against latency and tokens, with the fastest configuration that passes.
+
+Usage:
+    python agents/shared/evaluation.py loop_agent \\
+        --config "one_pass=RECIPE_LOOP_MAX_ITERATIONS=1" \\
+        --config "short_state=PROMPT_SLOT_MAX_CHARS=800,HISTORY_MAX_TURNS=1" \\
+        --workers 4 --plot quality.png
+"""
+
+import argparse
+import asyncio
+import csv
+import importlib
+import logging
+import math
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+except ImportError:  # optional dependency; fall back to a text chart
+    plt = None
+
+SHARED_DIR = os.path.dirname(os.path.abspath(__file__))
+AGENTS_DIR = os.path.dirname(SHARED_DIR)
+
+logger = logging.getLogger(__name__)
+
+# Pseudo state key for the last final response of a run
+FINAL_RESPONSE = "(final)"
+
+# Settings that would make runs measure caches or background work instead of the pipeline
+EVAL_ENV = {
+    "SEMANTIC_CACHE_ENABLED": "false",
+    "PIPELINE_CACHE_TTL": "0",
+    "REQUEST_COALESCING": "false",
+    "MODEL_WARMUP": "false",
+    "ENDPOINT_MONITOR": "false",
+}
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Tags whose end tag HTML lets authors leave out
+OPTIONAL_END_TAGS = {"p", "li", "dt", "dd", "option", "tr", "td", "th", "thead", "tbody", "tfoot", "colgroup"}
+
+
+# Checks: text -> score between 0 and 1
+
+def non_empty(text: str) -> float:
+    return 1.0 if text.strip() else 0.0
+
+
+class _TagBalance(HTMLParser):
+    """Counts end tags that close nothing and elements left open"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tags = set()
+        self.open: List[str] = []
+        self.errors = 0
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.add(tag)
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.tags.add(tag)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if tag not in self.open:
+            self.errors += 1
+            return
+        while self.open:
+            unclosed = self.open.pop()
+            if unclosed == tag:
+                break
+            if unclosed not in OPTIONAL_END_TAGS:
+                self.errors += 1
+
+    def close(self):
+        super().close()
+        self.errors += sum(1 for tag in self.open if tag not in OPTIONAL_END_TAGS)
+
+
+def html_validity(text: str) -> float:
+    """Share passed of: has markup, is a whole document, tags balance, nothing but markup"""
+    fenced = re.search(r"```(?:html)?\s*\n(.*?)```", text, re.DOTALL)
+    code = (fenced.group(1) if fenced else text).strip()
+    parser = _TagBalance()
+    parser.feed(code)
+    parser.close()
+    raw = text.strip()
+    checks = [
+        bool(parser.tags),
+        {"html", "body"} <= parser.tags,
+        bool(parser.tags) and parser.errors == 0,
+        # Agents are asked for the code only: no prose or markdown fences around it
+        raw.startswith("<") and raw.endswith(">"),
+    ]
+    return sum(checks) / len(checks)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower().replace("&", " and ")).split())
+
+
+def section_presence(*sections: str) -> Callable[[str], float]:
+    """Check for the share of `sections` (heading phrases, any case) found in the text"""
+    wanted = [_normalize(section) for section in sections]
+
+    def sections_present(text: str) -> float:
+        normalized = f" {_normalize(text)} "
+        return sum(f" {section} " in normalized for section in wanted) / len(wanted)
+
+    return sections_present
+
+
+def score_outputs(outputs: Dict[str, str], checks: Dict[str, List[Callable[[str], float]]]) -> Dict[str, float]:
+    """Score per "state_key:check"; missing outputs score 0"""
+    return {
+        f"{key}:{check.__name__}": round(check(outputs.get(key) or ""), 4)
+        for key, key_checks in checks.items()
+        for check in key_checks
+    }
+
+
+# Runs (each in its own process)
+
+async def _run_prompt(module, app_name: str, prompt: str) -> Dict[str, Any]:
+    from google.adk.runners import Runner
+    from google.genai import types
+    from config import config, create_session
+    from deadline import deadline_scope
+    from usage import usage_ledger
+
+    session_service, session = await create_session(app_name, "evaluation")
+    runner = Runner(agent=module.root_agent, app_name=app_name, session_service=session_service)
+    content = types.Content(role="user", parts=[types.Part(text=prompt)])
+    final_text = ""
+    invocation_id = None
+    started = time.perf_counter()
+    # Measured under the configuration's RUN_DEADLINE_SECONDS, as batch and server runs are
+    with deadline_scope(config.run_deadline):
+        async for event in runner.run_async(user_id="evaluation", session_id=session.id, new_message=content):
+            invocation_id = event.invocation_id
+            if event.error_code:
+                raise RuntimeError(f"{event.author}: {event.error_code} {event.error_message}")
+            if event.is_final_response() and event.content and event.content.parts:
+                final_text = "".join(part.text or "" for part in event.content.parts)
+    latency = time.perf_counter() - started
+
+    session = await session_service.get_session(app_name=app_name, user_id="evaluation", session_id=session.id)
+    outputs = {key: value if isinstance(value, str) else str(value) for key, value in session.state.items()}
+    outputs[FINAL_RESPONSE] = final_text
+    usage = usage_ledger.usage("run", invocation_id) or {}
+    return {
+        "latency_s": latency,
+        "tokens": usage.get("total_tokens", 0),
+        "outputs": outputs,
+    }
+
+
+def run_task(agent: str, configuration: str, env: Dict[str, str], items: List[Dict[str, str]],
+             timeout: float) -> List[Dict[str, Any]]:
+    """Prompts under one configuration, one after another; runs in a fresh process"""
+    # Configuration is read at import, so the env is set before any agent code loads
+    os.environ.update(env)
+    sys.path.insert(0, AGENTS_DIR)
+    sys.path.insert(0, SHARED_DIR)
+    logging.disable(logging.INFO)
+    app_name = f"eval_{agent}"
+
+    async def run_all():
+        module = importlib.import_module(f"{agent}.agent")
+        checks = getattr(module, "EVAL_CHECKS", None) or {FINAL_RESPONSE: [non_empty]}
+        try:
+            # One unmeasured run pays for lazy imports and connection setup
+            await asyncio.wait_for(_run_prompt(module, app_name, items[0]["query"]), timeout)
+        except Exception:
+            pass  # the measured runs will report it
+        records = []
+        for item in items:
+            record = {"configuration": configuration, "prompt_id": item["id"]}
+            try:
+                result = await asyncio.wait_for(_run_prompt(module, app_name, item["query"]), timeout)
+                scores = score_outputs(result.pop("outputs"), checks)
+                record.update(result, scores=scores, quality=round(sum(scores.values()) / len(scores), 4))
+            except Exception as e:
+                record.update(error=f"{type(e).__name__}: {e}", quality=0.0)
+            records.append(record)
+        return records
+
+    try:
+        return asyncio.run(run_all())
+    except Exception as e:  # the agent failed to load under this configuration
+        return [{"configuration": configuration, "prompt_id": item["id"], "error": f"{type(e).__name__}: {e}",
+                 "quality": 0.0} for item in items]
+
+
+def summarize(records: List[Dict[str, Any]], min_quality: float) -> List[Dict[str, Any]]:
+    """Quality, latency and tokens per configuration, fastest first"""
+    by_configuration = defaultdict(list)
+    for record in records:
+        by_configuration[record["configuration"]].append(record)
+
+    rows = []
+    for configuration, runs in by_configuration.items():
+        ok = [run for run in runs if "error" not in run]
+        latencies = sorted(run["latency_s"] for run in ok)
+        quality = sum(run["quality"] for run in runs) / len(runs)
+        rows.append({
+            "configuration": configuration,
+            "runs": len(runs),
+            "errors": len(runs) - len(ok),
+            "quality": round(quality, 4),
+            "min_quality": round(min(run["quality"] for run in runs), 4),
+            "latency_p50": round(latencies[len(latencies) // 2], 3) if latencies else math.nan,
+            "latency_mean": round(sum(latencies) / len(latencies), 3) if latencies else math.nan,
+            "tokens_mean": round(sum(run["tokens"] for run in ok) / len(ok), 1) if ok else math.nan,
+            "passed": len(ok) == len(runs) and quality >= min_quality,
+        })
+    # NaN latency (every run failed) sorts last
+    rows.sort(key=lambda row: (math.isnan(row["latency_p50"]), row["latency_p50"]))
+    return rows
+
+
+def print_summary(rows: List[Dict[str, Any]], min_quality: float):
+    print(f"\n{'configuration':<24} {'runs':>5} {'errors':>6} {'quality':>8} {'worst':>6} "
+          f"{'p50 (s)':>8} {'mean (s)':>9} {'tokens':>8}  pass (quality >= {min_quality})")
+    for row in rows:
+        print(
+            f"{row['configuration']:<24} {row['runs']:>5} {row['errors']:>6} {row['quality']:>8} "
+            f"{row['min_quality']:>6} {row['latency_p50']:>8} {row['latency_mean']:>9} {row['tokens_mean']:>8}  "
+            f"{'✅' if row['passed'] else '❌'}"
+        )
+
+
+def text_chart(rows: List[Dict[str, Any]], x_key: str, width: int = 50, height: int = 11) -> str:
+    """Quality (y) against `x_key` (x) as text; points are configuration numbers"""
+    points = [(i, row[x_key], row["quality"]) for i, row in enumerate(rows, 1) if not math.isnan(row[x_key])]
+    if not points:
+        return ""
+    x_min, x_max = min(p[1] for p in points), max(p[1] for p in points)
+    grid = [[" "] * width for _ in range(height)]
+    for label, x, quality in points:
+        column = int((x - x_min) / (x_max - x_min) * (width - 1)) if x_max > x_min else 0
+        row = height - 1 - round(min(max(quality, 0.0), 1.0) * (height - 1))
+        grid[row][column] = str(label)[-1]
+    lines = [f"{1 - i / (height - 1):>5.2f} |{''.join(line)}" for i, line in enumerate(grid)]
+    lines.append(f"{'':>6}+{'-' * width}")
+    lines.append(f"{'':>7}{x_min:<{width // 2}}{x_max:>{width - width // 2}}  {x_key}")
+    return "\n".join(lines)
+
+
+def plot(rows: List[Dict[str, Any]], path: str):
+    """Quality against latency and tokens, one point per configuration"""
+    figure, axes = plt.subplots(1, 2, figsize=(11, 4.5), sharey=True)
+    for axis, key, label in ((axes[0], "latency_p50", "p50 latency (s)"), (axes[1], "tokens_mean", "tokens per run")):
+        for row in rows:
+            axis.scatter(row[key], row["quality"], color="tab:green" if row["passed"] else "tab:red")
+            axis.annotate(row["configuration"], (row[key], row["quality"]), textcoords="offset points", xytext=(4, 4))
+        axis.set_xlabel(label)
+    axes[0].set_ylabel("quality")
+    figure.tight_layout()
+    figure.savefig(path)
+
+
+def parse_configuration(value: str) -> tuple:
+    """NAME=KEY=VALUE,KEY=VALUE -> (NAME, {KEY: VALUE})"""
+    name, _, overrides = value.partition("=")
+    env = dict(item.split("=", 1) for item in overrides.split(",") if "=" in item)
+    return name, env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score agent output quality against latency and tokens")
+    parser.add_argument("agent", help="Agent package name, e.g. sequential_agent")
+    parser.add_argument("--config", dest="configurations", action="append", type=parse_configuration, default=[],
+                        help="NAME=KEY=VALUE,KEY=VALUE environment overrides; repeatable ('default' is always run)")
+    parser.add_argument("--prompts", help="JSONL file of {\"id\", \"query\"} (default: the agent's TEST_QUERIES)")
+    parser.add_argument("--repeats", type=int, default=1, help="Runs of each prompt per configuration")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes running at once")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Processes per configuration, each running a share of the prompts in turn")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-run timeout in seconds")
+    parser.add_argument("--min-quality", type=float, default=0.8, help="Mean quality a configuration needs to pass")
+    parser.add_argument("--csv", help="Write every scored run to this CSV file")
+    parser.add_argument("--plot", help="Write quality vs latency and tokens to this image (needs matplotlib)")
+    parser.add_argument("--stub", action="store_true", help="Run against a local stub model server")
+    parser.add_argument("--stub-port", type=int, default=12435)
+    parser.add_argument("--stub-token-delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    from batch import read_queries
+    from loadgen import load_agent_module, start_stub_server
+
+    stub: Optional[Any] = None
+    if args.stub:
+        stub = start_stub_server(args.stub_port, args.stub_token_delay)
+        os.environ["DOCKER_MODEL_RUNNER"] = f"http://127.0.0.1:{args.stub_port}/engines/llama.cpp/v1"
+    # Inherited by every run; configurations override on top
+    os.environ.update(EVAL_ENV)
+
+    if args.prompts:
+        prompts = read_queries(args.prompts)
+    else:
+        corpus = getattr(load_agent_module(args.agent), "TEST_QUERIES", None) or ["Hello"]
+        prompts = [{"id": str(i), "query": query} for i, query in enumerate(corpus, 1)]
+    configurations = dict([("default", {}), *args.configurations])
+
+    items = [
+        {"id": f"{item['id']}#{repeat}" if args.repeats > 1 else item["id"], "query": item["query"]}
+        for item in prompts
+        for repeat in range(args.repeats)
+    ]
+    shards = max(1, min(args.shards, len(items)))
+    tasks = [
+        (args.agent, name, overrides, items[shard::shards], args.timeout)
+        for name, overrides in configurations.items()
+        for shard in range(shards)
+    ]
+    logger.info(
+        f"🧪 {len(configurations)} configurations x {len(items)} runs in {len(tasks)} processes "
+        f"({args.workers} at a time)"
+    )
+
+    records = []
+    try:
+        # A fresh interpreter per task: configuration is read at import and must not leak between tasks
+        with ProcessPoolExecutor(
+            max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"), max_tasks_per_child=1
+        ) as pool:
+            futures = [pool.submit(run_task, *task) for task in tasks]
+            for future in as_completed(futures):
+                for record in future.result():
+                    records.append(record)
+                    status = f"error: {record['error']}" if "error" in record else f"quality {record['quality']}"
+                    logger.info(
+                        f"{'❌' if 'error' in record else '✅'} {record['configuration']} / {record['prompt_id']}: {status}"
+                    )
+    finally:
+        if stub:
+            stub.terminate()
+
+    rows = summarize(records, args.min_quality)
+    print_summary(rows, args.min_quality)
+    print(f"\nQuality vs latency (points are configuration numbers above):\n{text_chart(rows, 'latency_p50')}")
+    print(f"\nQuality vs tokens:\n{text_chart(rows, 'tokens_mean')}")
+
+    best = next((row for row in rows if row["passed"]), None)
+    print(f"\n🏁 Fastest passing configuration: {best['configuration']}" if best
+          else "\n⚠️ No configuration reached the quality bar")
+
+    if args.csv:
+        check_names = sorted({name for record in records for name in record.get("scores", {})})
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[
+                "configuration", "prompt_id", "latency_s", "tokens", "quality", "error", *check_names
+            ])
+            writer.writeheader()
+            for record in sorted(records, key=lambda r: (r["configuration"], r["prompt_id"])):
+                writer.writerow({**{k: v for k, v in record.items() if k != "scores"}, **record.get("scores", {})})
+    if args.plot:
+        if plt is None:
+            logger.warning("⚠️ matplotlib is not installed; skipping the plot (text charts are above)")
+        else:
+            plot(rows, args.plot)
+            logger.info(f"📈 Plot written to {args.plot}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
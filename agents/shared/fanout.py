@@ -0,0 +1,174 @@
+"""
+Quorum fan-out for parallel research pipelines.
+Runs branch agents concurrently and starts the synthesizer as soon as a quorum
+of branches has answered, instead of waiting for the slowest one. Branches that
+answer after synthesis started are appended to the report as addendum sections.
+"""
+
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import AsyncGenerator, Dict, Optional
+
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+
+from model_client import skip_cache_store
+
+logger = logging.getLogger(__name__)
+
+# custom_metadata flag on events of a synthesis that missed branches, and on addenda
+PARTIAL_INPUT = "quorum_partial"
+
+
+def is_partial(event) -> bool:
+    """True for a synthesizer answer written without every branch, or a late addendum"""
+    return bool((getattr(event, "custom_metadata", None) or {}).get(PARTIAL_INPUT))
+
+
+def _final_text(event: Event) -> Optional[str]:
+    if not event.is_final_response() or not event.content or not event.content.parts:
+        return None
+    return "".join(part.text or "" for part in event.content.parts) or None
+
+
+def _branch_ctx(agent: BaseAgent, sub_agent: BaseAgent, ctx: InvocationContext) -> InvocationContext:
+    """Isolated branch for a sub-agent, named the way ParallelAgent names them"""
+    name = f"{agent.name}.{sub_agent.name}"
+    return ctx.model_copy(update={"branch": f"{ctx.branch}.{name}" if ctx.branch else name})
+
+
+class QuorumFanoutAgent(BaseAgent):
+    """Parallel branches followed by a synthesizer that starts on a quorum.
+
+    The last sub-agent is the synthesizer; the others run in parallel on isolated
+    branches like ParallelAgent. Synthesis starts once every branch has finished,
+    or once `quorum` branches have answered and `branch_timeout` seconds passed.
+    Late answers are appended to state[report_key] as they arrive, each once.
+    A synthesis that started without every branch is not stored in the response
+    caches, and its events (like the addenda) are flagged PARTIAL_INPUT so whole-run
+    caches can skip them too.
+    """
+
+    quorum: int = 0  # 0 = all branches
+    branch_timeout: Optional[float] = None
+    late_timeout: Optional[float] = None  # None = wait for stragglers
+    report_key: Optional[str] = None
+
+    async def _pump(self, name: str, events: AsyncGenerator[Event, None], queue: asyncio.Queue):
+        """Forward one sub-agent's events, waiting for each to be consumed before the next"""
+        error = None
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    consumed = asyncio.Event()
+                    await queue.put((name, event, consumed))
+                    await consumed.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            queue.put_nowait((name, None, error))
+
+    def _addendum(self, ctx: InvocationContext, branch: str, text: str) -> Event:
+        section = f"## Addendum: {branch} (arrived after synthesis)\n\n{text}"
+        state_delta = {}
+        if self.report_key:
+            report = ctx.session.state.get(self.report_key) or ""
+            state_delta[self.report_key] = f"{report}\n\n{section}" if report else section
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=section)]),
+            actions=EventActions(state_delta=state_delta),
+            custom_metadata={PARTIAL_INPUT: True},
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        if not self.sub_agents:
+            return
+
+        *branches, synthesizer = self.sub_agents
+        quorum = min(self.quorum or len(branches), len(branches))
+        loop = asyncio.get_running_loop()
+        quorum_deadline = loop.time() + self.branch_timeout if self.branch_timeout is not None else None
+
+        queue: asyncio.Queue = asyncio.Queue()
+        tasks: Dict[str, asyncio.Task] = {}
+        answers: Dict[str, str] = {}
+        finished = set()
+        included = None  # branch answers the synthesizer saw
+        degraded = False
+        appended = set()
+        late_deadline = None
+
+        for branch in branches:
+            branch_ctx = _branch_ctx(self, branch, ctx)
+            tasks[branch.name] = asyncio.create_task(self._pump(branch.name, branch.run_async(branch_ctx), queue))
+
+        try:
+            while True:
+                if included is None:
+                    all_done = len(finished) == len(branches)
+                    timed_out = quorum_deadline is None or loop.time() >= quorum_deadline
+                    if all_done or (len(answers) >= quorum and timed_out):
+                        included = set(answers)
+                        degraded = len(answers) < len(branches)
+                        if not all_done:
+                            pending = [b.name for b in branches if b.name not in finished]
+                            logger.info(f"⚡ {self.name}: synthesizing with {len(answers)}/{len(branches)} branches, still waiting on {pending}")
+                        # The task copies the current context, so the flag only covers the synthesizer
+                        token = skip_cache_store.set(degraded)
+                        try:
+                            tasks[synthesizer.name] = asyncio.create_task(
+                                self._pump(synthesizer.name, synthesizer.run_async(ctx), queue)
+                            )
+                        finally:
+                            skip_cache_store.reset(token)
+
+                if synthesizer.name in finished:
+                    for name in answers.keys() - included - appended:
+                        appended.add(name)
+                        logger.info(f"➕ {self.name}: appending late result from {name}")
+                        yield self._addendum(ctx, name, answers[name])
+                    if len(finished) == len(tasks):
+                        return
+                    if late_deadline is None and self.late_timeout is not None:
+                        late_deadline = loop.time() + self.late_timeout
+
+                wake_at = quorum_deadline if included is None else late_deadline
+                try:
+                    async with asyncio.timeout_at(wake_at):
+                        name, event, payload = await queue.get()
+                except TimeoutError:
+                    if included is None:
+                        quorum_deadline = None  # take the next answer that completes the quorum
+                        continue
+                    stragglers = [name for name in tasks if name not in finished]
+                    logger.warning(f"⚠️ {self.name}: dropping late branches {stragglers}")
+                    return
+
+                if event is None:
+                    finished.add(name)
+                    if isinstance(payload, BaseException):
+                        if name == synthesizer.name:
+                            raise payload
+                        logger.warning(f"⚠️ {self.name}: branch {name} failed: {payload}")
+                    continue
+
+                if degraded and name == synthesizer.name:
+                    event.custom_metadata = {**(event.custom_metadata or {}), PARTIAL_INPUT: True}
+                yield event
+                payload.set()
+                text = _final_text(event)
+                if text and name != synthesizer.name:
+                    answers[name] = text
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
@@ -0,0 +1,194 @@
+"""
+Declarative agent graphs with hot reload.
+An agent graph (instructions, model parameters, structure) is defined in a YAML
+or JSON file and built from the regular ADK agent classes. `GraphAgent` is a
+stable root that rebuilds the graph when the file changes and swaps it in
+between runs; sessions, model clients and caches are kept.
+
+Example (YAML):
+    name: CodePipelineAgent
+    type: sequential
+    sub_agents:
+      - name: CodeWriterAgent
+        type: llm
+        model: {temperature: 0.1, semantic_cache_threshold: 0.92}
+        instruction: Create clean, semantic HTML code...
+        output_key: generated_code
+      - name: CodeReviewerAgent
+        instruction: Review the HTML code in <generated_code>...
+        slots: {generated_code: 6000}   # state keys appended to the instruction, with length caps
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+import yaml
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.agents.loop_agent import LoopAgent
+from google.adk.agents.parallel_agent import ParallelAgent
+from google.adk.agents.sequential_agent import SequentialAgent
+from google.adk.events.event import Event
+from pydantic import PrivateAttr
+
+from callbacks import CALLBACK_FIELDS, add_callbacks
+from config import config, get_model_config
+from prompts import PromptTemplate
+
+logger = logging.getLogger(__name__)
+
+WORKFLOW_TYPES = {
+    "sequential": SequentialAgent,
+    "parallel": ParallelAgent,
+    "loop": LoopAgent,
+}
+LLM_FIELDS = ("description", "output_key", "include_contents")
+
+
+def load_graph_spec(path: str) -> Dict[str, Any]:
+    """Read a graph definition from a .yaml/.yml or .json file"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class GraphBuilder:
+    """Builds agent trees from graph specs, reusing model clients across builds.
+
+    `tools` and `callbacks` map the names used in the spec to Python objects.
+    """
+
+    def __init__(self, tools: Optional[Dict[str, Any]] = None,
+                 callbacks: Optional[Dict[str, Callable]] = None):
+        self.tools = tools or {}
+        self.callbacks = callbacks or {}
+        self._models: Dict[str, Any] = {}
+
+    def model(self, params: Dict[str, Any]):
+        """Shared client per distinct parameter set, so connections and stats survive reloads"""
+        key = json.dumps(params, sort_keys=True)
+        if key not in self._models:
+            self._models[key] = get_model_config(**params)
+        return self._models[key]
+
+    def _lookup(self, registry: Dict[str, Any], kind: str, name: str):
+        if name not in registry:
+            raise ValueError(f"Unknown {kind} '{name}' in agent graph")
+        return registry[name]
+
+    def build(self, spec: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> BaseAgent:
+        defaults = {**(defaults or {}), **spec.get("defaults", {})}
+        agent_type = spec.get("type", "llm")
+        callbacks = {
+            f"{hook}_callback": self._lookup(self.callbacks, "callback", name)
+            for hook, name in spec.get("callbacks", {}).items()
+        }
+        unknown = set(callbacks) - set(CALLBACK_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown callback hooks {sorted(unknown)} on {spec['name']}")
+
+        if agent_type == "llm":
+            instruction = spec.get("instruction", "")
+            if "slots" in spec:
+                instruction = PromptTemplate(instruction, spec["slots"])
+            agent = LlmAgent(
+                name=spec["name"],
+                model=self.model({**defaults, **spec.get("model", {})}),
+                instruction=instruction,
+                tools=[self._lookup(self.tools, "tool", name) for name in spec.get("tools", [])],
+                **{field: spec[field] for field in LLM_FIELDS if field in spec},
+            )
+        elif agent_type in WORKFLOW_TYPES:
+            kwargs = {"max_iterations": spec["max_iterations"]} if "max_iterations" in spec else {}
+            agent = WORKFLOW_TYPES[agent_type](
+                name=spec["name"],
+                description=spec.get("description", ""),
+                sub_agents=[self.build(sub_spec, defaults) for sub_spec in spec.get("sub_agents", [])],
+                **kwargs,
+            )
+        else:
+            raise ValueError(f"Unknown agent type '{agent_type}' for {spec['name']}")
+
+        if callbacks:
+            add_callbacks(agent, recursive=False, **callbacks)
+        return agent
+
+
+class GraphAgent(BaseAgent):
+    """Stable root agent for a graph file, rebuilt when the file changes.
+
+    The file is checked at most every `reload_interval` seconds, at the start of
+    a run. A run keeps the graph it started with; a graph that fails to build
+    is logged and the previous one stays active.
+    """
+
+    path: str
+    reload_interval: float = config.graph_reload_interval
+
+    _builder: GraphBuilder = PrivateAttr()
+    _mtime: float = PrivateAttr(default=0.0)
+    _checked_at: float = PrivateAttr(default=0.0)
+    _tree_callbacks: List[Dict[str, Callable]] = PrivateAttr(default_factory=list)
+    _tree_setups: List[Callable] = PrivateAttr(default_factory=list)
+
+    def __init__(self, tools: Optional[Dict[str, Any]] = None,
+                 callbacks: Optional[Dict[str, Callable]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._builder = GraphBuilder(tools, callbacks)
+        self.reload(force=True)
+
+    def remember_callbacks(self, callbacks: Dict[str, Callable]):
+        """Re-apply callbacks added across the tree (see add_callbacks) to reloaded graphs"""
+        self._tree_callbacks.append(callbacks)
+
+    def remember_setup(self, setup: Callable):
+        """Re-apply a tree-wide `setup(agent)` (e.g. offload_tools) to reloaded graphs"""
+        if setup not in self._tree_setups:
+            self._tree_setups.append(setup)
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild the graph if the file changed; returns True when a new graph was swapped in"""
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            if force:
+                raise
+            logger.error(f"❌ Keeping current graph; cannot read {self.path}: {e}")
+            return False
+        if not force and mtime == self._mtime:
+            return False
+
+        try:
+            graph = self._builder.build(load_graph_spec(self.path))
+        except Exception as e:
+            if force:
+                raise
+            logger.error(f"❌ Keeping current graph; failed to reload {self.path}: {e}")
+            self._mtime = mtime  # retry once the file changes again
+            return False
+
+        for setup in self._tree_setups:
+            setup(graph)
+        for callbacks in self._tree_callbacks:
+            add_callbacks(graph, **callbacks)
+        graph.parent_agent = self
+        # One assignment: runs already in progress keep the graph they started with
+        self.sub_agents = [graph]
+        self._mtime = mtime
+        if not force:
+            logger.info(f"🔄 Reloaded agent graph {graph.name} from {self.path}")
+        return True
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        if config.graph_hot_reload and time.monotonic() - self._checked_at >= self.reload_interval:
+            # Checked between runs only, so the swap never lands mid-run
+            self.reload()
+        graph = self.sub_agents[0]
+        async for event in graph.run_async(ctx):
+            yield event
@@ -0,0 +1,160 @@
+"""
+Bounded conversation history for long sessions.
+A before-model callback that keeps the last N turns, drops superseded sub-agent
+messages and folds older turns into a rolling summary stored in session state.
+"""
+
+import logging
+import re
+from typing import List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# ADK relays other agents' output to the model as user messages with this prefix
+OTHER_AGENT_PREFIX = "For context:"
+_AUTHOR_PATTERN = re.compile(r"\[([^\]]+)\] said:")
+
+SUMMARY_STATE_KEY = "history_summary"
+
+
+def _text(content: types.Content) -> str:
+    return "\n".join(part.text for part in content.parts or [] if part.text)
+
+
+def _has_function_parts(content: types.Content) -> bool:
+    return any(part.function_call or part.function_response for part in content.parts or [])
+
+
+def _is_user_turn_start(content: types.Content) -> bool:
+    """A new turn starts with a real user message (not relayed agent output or tool results)"""
+    return (
+        content.role == "user"
+        and not _has_function_parts(content)
+        and not _text(content).startswith(OTHER_AGENT_PREFIX)
+    )
+
+
+def _message_author(content: types.Content) -> Optional[str]:
+    """Author of a plain text message, or None for tool traffic and unknown senders"""
+    if _has_function_parts(content):
+        return None
+    if content.role == "model":
+        return "self"
+    match = _AUTHOR_PATTERN.search(_text(content))
+    return match.group(1) if match else None
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class HistoryPolicy:
+    """How much conversation history an agent sends to the model"""
+
+    def __init__(self, max_turns: int = 4, summary_chars_per_turn: int = 200,
+                 max_summary_chars: int = 2000):
+        self.max_turns = max_turns
+        self.summary_chars_per_turn = summary_chars_per_turn
+        self.max_summary_chars = max_summary_chars
+
+    def split_turns(self, contents: List[types.Content]) -> List[List[types.Content]]:
+        turns: List[List[types.Content]] = []
+        for content in contents:
+            if not turns or _is_user_turn_start(content):
+                turns.append([])
+            turns[-1].append(content)
+        return turns
+
+    def condense_turn(self, turn: List[types.Content], is_current: bool) -> List[types.Content]:
+        """Drop intermediate sub-agent messages.
+
+        Past turns keep only the user message and the final answer. The current
+        turn keeps tool traffic but only the latest message of each author, so
+        loop iterations don't pile up superseded drafts.
+        """
+        if not is_current:
+            return [turn[0], turn[-1]] if len(turn) > 1 else turn
+
+        latest = {}
+        for index, content in enumerate(turn):
+            author = _message_author(content)
+            if author is not None:
+                latest[author] = index
+        return [
+            content for index, content in enumerate(turn)
+            if index == 0 or _message_author(content) is None
+            or latest[_message_author(content)] == index
+        ]
+
+    def summarize_turn(self, turn: List[types.Content]) -> str:
+        request = _shorten(_text(turn[0]), self.summary_chars_per_turn)
+        answer = _shorten(_text(turn[-1]), self.summary_chars_per_turn) if len(turn) > 1 else ""
+        return f"- {request} -> {answer}" if answer else f"- {request}"
+
+    def cap_summary(self, text: str) -> str:
+        """Keep the newest summary lines within max_summary_chars; a line cut by the cap is dropped"""
+        if len(text) <= self.max_summary_chars:
+            return text
+        kept = text[-self.max_summary_chars:]
+        if text[-self.max_summary_chars - 1] == "\n":
+            return kept
+        # A single line longer than the cap is kept cut rather than leaving no summary
+        newline = kept.find("\n")
+        return kept[newline + 1:] if newline != -1 else kept
+
+
+def make_history_callback(policy: HistoryPolicy):
+    """Build a before_model_callback applying the policy to each request"""
+
+    def compact_history(callback_context: CallbackContext, llm_request: LlmRequest):
+        if policy.max_turns <= 0 or not llm_request.contents:
+            return None
+
+        # The rolling summary is stored per agent together with its watermark: the
+        # number of leading messages already folded into it. History only grows,
+        # so each call splits and folds just the messages after the watermark.
+        state_key = f"{SUMMARY_STATE_KEY}:{callback_context.agent_name}"
+        stored = callback_context.state.get(state_key) or {"text": "", "watermark": 0}
+        if stored["watermark"] > len(llm_request.contents):
+            stored = {"text": "", "watermark": 0}  # history was rewritten; start over
+        watermark = stored["watermark"]
+        turns = policy.split_turns(llm_request.contents[watermark:])
+
+        fold = max(len(turns) - 1 - policy.max_turns, 0)
+        if fold:
+            new_lines = [policy.summarize_turn(turn) for turn in turns[:fold]]
+            text = "\n".join(filter(None, [stored["text"], *new_lines]))
+            watermark += sum(len(turn) for turn in turns[:fold])
+            stored = {"text": policy.cap_summary(text), "watermark": watermark}
+            callback_context.state[state_key] = stored
+
+        contents: List[types.Content] = []
+        if stored["text"]:
+            contents.append(types.Content(
+                role="user",
+                parts=[types.Part(text=f"Summary of the earlier conversation:\n{stored['text']}")]
+            ))
+        kept_turns = turns[fold:]
+        for index, turn in enumerate(kept_turns):
+            contents.extend(policy.condense_turn(turn, is_current=index == len(kept_turns) - 1))
+
+        logger.debug(f"History compacted from {len(llm_request.contents)} to {len(contents)} messages")
+        llm_request.contents = contents
+        return None
+
+    return compact_history
+
+
+# Shared callback configured from the environment
+compact_history = make_history_callback(HistoryPolicy(
+    max_turns=config.history_max_turns,
+    summary_chars_per_turn=config.history_summary_chars,
+    max_summary_chars=config.history_max_summary_chars,
+))
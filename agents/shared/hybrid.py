@@ -0,0 +1,174 @@
+"""
+Hybrid local/remote model routing.
+Each model call runs on Docker Model Runner unless the local runner is busy,
+slow or unhealthy, or the agent's policy asks for the remote provider; then it
+is offloaded to Gemini (or a local mock standing in for it in tests).
+
+Policies (per agent with HYBRID_AGENT_POLICY, default HYBRID_DEFAULT_POLICY):
+    auto    local, offloading overflow to the remote provider
+    local   always local
+    remote  remote when one is configured, local otherwise
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import AsyncGenerator, Dict, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from config import config, get_gemini_model
+from endpoint_health import endpoint_monitor
+from model_client import local_load
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("auto", "local", "remote")
+
+
+class RoutingStats:
+    """Model calls per agent and route, with the reason for each offload"""
+
+    def __init__(self):
+        self.remote_in_flight = 0
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, agent: Optional[str], route: str):
+        self._counts[agent or "unknown"][route] += 1
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {agent: dict(counts) for agent, counts in self._counts.items()}
+
+
+routing_stats = RoutingStats()
+
+
+class MockRemoteLlm(BaseLlm):
+    """Stand-in for the remote provider: answers after a fixed latency, no network"""
+
+    model: str = "gemini-mock"
+    latency: float = config.hybrid_mock_latency
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.latency)
+        prompt = "\n".join(
+            part.text for content in llm_request.contents for part in content.parts or [] if part.text
+        )
+        text = f"[{self.model}] {prompt[-200:]}"
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=len(prompt.split()),
+                candidates_token_count=len(text.split()),
+                total_token_count=len(prompt.split()) + len(text.split()),
+            ),
+        )
+
+
+def get_remote_model() -> Optional[BaseLlm]:
+    """The configured remote provider, or None when offloading isn't possible"""
+    if config.hybrid_remote == "mock":
+        return MockRemoteLlm()
+    if config.hybrid_remote == "gemini" and config.google_api_key:
+        return get_gemini_model(config.hybrid_remote_model)
+    return None
+
+
+def _strip_builtin_tools(llm_request: LlmRequest):
+    """Drop Gemini built-in tools (google_search, ...) the local model can't run"""
+    if llm_request.config and llm_request.config.tools:
+        llm_request.config.tools = [
+            tool for tool in llm_request.config.tools
+            if not isinstance(tool, types.Tool) or tool.function_declarations
+        ]
+
+
+class HybridLlm(BaseLlm):
+    """Routes each call to the local model or the remote provider.
+
+    The model name is the remote model's, so agents may carry Gemini built-in
+    tools; those run on the remote route only and are dropped for local calls.
+    """
+
+    local: BaseLlm
+    remote: Optional[BaseLlm] = None
+    policy: str = "auto"
+
+    def __init__(self, local: BaseLlm, remote: Optional[BaseLlm] = None, **kwargs):
+        kwargs.setdefault("model", remote.model if remote else config.hybrid_remote_model)
+        super().__init__(local=local, remote=remote, **kwargs)
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy '{self.policy}', expected one of {', '.join(POLICIES)}")
+
+    @property
+    def capabilities(self):
+        # Local is the default route, so requests must be answerable there
+        return self.local.capabilities
+
+    def route(self, agent_name: Optional[str]) -> str:
+        """'local' or 'remote' for the next call of an agent, from policy and live load"""
+        policy = config.hybrid_agent_policies.get(agent_name, self.policy)
+        if self.remote is None or policy == "local":
+            return "local"
+        if config.hybrid_max_remote_concurrency and routing_stats.remote_in_flight >= config.hybrid_max_remote_concurrency:
+            return "local"
+        if policy == "remote":
+            return "remote"
+        if endpoint_monitor.degraded:
+            return "remote"
+        if config.hybrid_max_local_queue and local_load.in_flight >= config.hybrid_max_local_queue:
+            return "remote"
+        latency_limit = config.hybrid_max_local_latency
+        if latency_limit and local_load.latency is not None and local_load.latency > latency_limit:
+            return "remote"
+        return "local"
+
+    async def _generate_local(
+        self, llm_request: LlmRequest, stream: bool
+    ) -> AsyncGenerator[LlmResponse, None]:
+        _strip_builtin_tools(llm_request)
+        llm_request.model = self.local.model
+        async for response in self.local.generate_content_async(llm_request, stream=stream):
+            yield response
+
+    async def _generate_remote(
+        self, llm_request: LlmRequest, stream: bool
+    ) -> AsyncGenerator[LlmResponse, None]:
+        local_request = llm_request.model_copy(deep=True)
+        llm_request.model = self.remote.model
+        routing_stats.remote_in_flight += 1
+        started = False
+        try:
+            async for response in self.remote.generate_content_async(llm_request, stream=stream):
+                started = True
+                yield response
+            return
+        except Exception as e:
+            if started:
+                raise
+            # Nothing reached the caller yet, so the local model can still answer
+            logger.warning(f"⚠️ Remote model failed ({e}); answering locally")
+        finally:
+            routing_stats.remote_in_flight -= 1
+        async for response in self._generate_local(local_request, stream):
+            yield response
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        labels = llm_request.config.labels if llm_request.config else None
+        agent_name = (labels or {}).get("adk_agent_name")
+        route = self.route(agent_name)
+        routing_stats.record(agent_name, route)
+        if route == "remote":
+            logger.debug(f"☁️ Offloading {agent_name} to {self.remote.model}")
+            generator = self._generate_remote(llm_request, stream)
+        else:
+            generator = self._generate_local(llm_request, stream)
+        async for response in generator:
+            yield response
@@ -0,0 +1,223 @@
+"""
+Load generator for end-to-end capacity testing.
+Drives any registered `root_agent` with open-loop (Poisson) or closed-loop
+traffic built from the agent modules' TEST_QUERIES, records latency histograms
+and error rates, and prints a saturation curve.
+
+Usage:
+    # Open loop at 0.5, 1 and 2 runs/s against the stub model server
+    python agents/shared/loadgen.py sequential_agent --mode open --load 0.5,1,2 --stub
+
+    # Closed loop with 1, 4 and 8 concurrent users against the real runner
+    python agents/shared/loadgen.py parallel_agent --mode closed --load 1,4,8 --duration 120
+"""
+
+import argparse
+import asyncio
+import csv
+import importlib
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+SHARED_DIR = os.path.dirname(os.path.abspath(__file__))
+AGENTS_DIR = os.path.dirname(SHARED_DIR)
+
+
+class LatencyHistogram:
+    """HDR-style histogram: log-spaced buckets with a fixed relative precision"""
+
+    def __init__(self, precision: float = 0.01):
+        self._log_base = math.log1p(precision)
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.total = 0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        bucket = int(math.log(max(seconds, 1e-6)) / self._log_base)
+        self.counts[bucket] += 1
+        self.total += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p: float) -> float:
+        if not self.total:
+            return float("nan")
+        target = math.ceil(self.total * p / 100)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(math.exp((bucket + 0.5) * self._log_base), self.max)
+        return self.max
+
+
+class StepResult:
+    """Outcome of one load level"""
+
+    def __init__(self, load: float, duration: float):
+        self.load = load
+        self.duration = duration
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+
+    @property
+    def completed(self) -> int:
+        return self.histogram.total
+
+    @property
+    def error_rate(self) -> float:
+        attempts = self.completed + self.errors
+        return self.errors / attempts if attempts else 0.0
+
+    def row(self) -> Dict[str, float]:
+        return {
+            "load": self.load,
+            "throughput": round(self.completed / self.duration, 3),
+            "p50": round(self.histogram.percentile(50), 3),
+            "p90": round(self.histogram.percentile(90), 3),
+            "p99": round(self.histogram.percentile(99), 3),
+            "max": round(self.histogram.max, 3),
+            "error_rate": round(self.error_rate, 4),
+        }
+
+
+async def run_once(root_agent, app_name: str, query: str):
+    """One end-to-end pipeline run; raises if the agent reports an error"""
+    from google.adk.runners import Runner
+    from google.genai import types
+    from config import create_session
+
+    session_service, session = await create_session(app_name, "loadgen")
+    runner = Runner(agent=root_agent, app_name=app_name, session_service=session_service)
+    content = types.Content(role="user", parts=[types.Part(text=query)])
+    async for event in runner.run_async(user_id="loadgen", session_id=session.id, new_message=content):
+        if event.error_code:
+            raise RuntimeError(f"{event.author}: {event.error_code} {event.error_message}")
+
+
+async def _timed_run(root_agent, app_name: str, query: str, result: StepResult, timeout: float):
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(run_once(root_agent, app_name, query), timeout)
+        result.histogram.record(time.perf_counter() - started)
+    except Exception:
+        result.errors += 1
+
+
+async def open_loop(root_agent, app_name, corpus, rate, duration, timeout) -> StepResult:
+    """Poisson arrivals at `rate` runs/s, independent of completions"""
+    result = StepResult(rate, duration)
+    tasks = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        tasks.append(asyncio.create_task(
+            _timed_run(root_agent, app_name, random.choice(corpus), result, timeout)
+        ))
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return result
+
+
+async def closed_loop(root_agent, app_name, corpus, concurrency, duration, timeout) -> StepResult:
+    """`concurrency` users each sending the next request when the previous one returns"""
+    result = StepResult(concurrency, duration)
+    end = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < end:
+            await _timed_run(root_agent, app_name, random.choice(corpus), result, timeout)
+
+    await asyncio.gather(*(user() for _ in range(int(concurrency))))
+    return result
+
+
+def load_agent_module(name: str):
+    sys.path.insert(0, AGENTS_DIR)
+    return importlib.import_module(f"{name}.agent")
+
+
+def start_stub_server(port: int, token_delay: float) -> subprocess.Popen:
+    """Start the stub model server in a separate process so it doesn't share our event loop"""
+    process = subprocess.Popen([
+        sys.executable, os.path.join(SHARED_DIR, "stub_server.py"),
+        "--port", str(port), "--token-delay", str(token_delay),
+    ], stdout=subprocess.DEVNULL)
+    time.sleep(1.5)
+    return process
+
+
+def print_curve(rows: List[Dict[str, float]], mode: str):
+    header = "concurrency" if mode == "closed" else "rate (/s)"
+    print(f"\n{header:>12} {'thru (/s)':>10} {'p50 (s)':>9} {'p90 (s)':>9} {'p99 (s)':>9} {'max (s)':>9} {'errors':>8}")
+    for row in rows:
+        print(
+            f"{row['load']:>12} {row['throughput']:>10} {row['p50']:>9} {row['p90']:>9} "
+            f"{row['p99']:>9} {row['max']:>9} {row['error_rate']:>8.2%}"
+        )
+
+
+async def run_steps(args, module) -> List[Dict[str, float]]:
+    corpus = list(getattr(module, "TEST_QUERIES", [])) or ["Hello"]
+    app_name = f"loadgen_{args.agent}"
+    driver = open_loop if args.mode == "open" else closed_loop
+
+    # One unmeasured run pays for lazy imports and connection setup
+    await _timed_run(module.root_agent, app_name, corpus[0], StepResult(0, 1), args.timeout)
+
+    rows = []
+    for load in args.load:
+        result = await driver(module.root_agent, app_name, corpus, load, args.duration, args.timeout)
+        rows.append(result.row())
+        print(f"✅ load={load}: {result.completed} runs, {result.errors} errors")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for ADK agent pipelines")
+    parser.add_argument("agent", help="Agent package name, e.g. sequential_agent")
+    parser.add_argument("--mode", choices=["open", "closed"], default="closed")
+    parser.add_argument("--load", type=lambda v: [float(x) for x in v.split(",")], default=[1.0],
+                        help="Comma-separated rates (open loop) or concurrencies (closed loop)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds per load level")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-run timeout in seconds")
+    parser.add_argument("--csv", help="Write the saturation curve to this CSV file")
+    parser.add_argument("--stub", action="store_true", help="Run against a local stub model server")
+    parser.add_argument("--stub-port", type=int, default=12435)
+    parser.add_argument("--stub-token-delay", type=float, default=0.005)
+    parser.add_argument("--with-cache", action="store_true",
+                        help="Keep pipeline and semantic caches and request coalescing enabled (off by default)")
+    args = parser.parse_args()
+
+    stub: Optional[subprocess.Popen] = None
+    if args.stub:
+        stub = start_stub_server(args.stub_port, args.stub_token_delay)
+        os.environ["DOCKER_MODEL_RUNNER"] = f"http://127.0.0.1:{args.stub_port}/engines/llama.cpp/v1"
+    if not args.with_cache:
+        # Cached answers would measure the cache, not the pipeline
+        os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+        os.environ["PIPELINE_CACHE_TTL"] = "0"
+        os.environ["REQUEST_COALESCING"] = "false"
+
+    try:
+        # Configuration is read at import, so agents are imported after the env is set
+        module = load_agent_module(args.agent)
+        rows = asyncio.run(run_steps(args, module))
+    finally:
+        if stub:
+            stub.terminate()
+
+    print_curve(rows, args.mode)
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
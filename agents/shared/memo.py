@@ -0,0 +1,152 @@
+"""
+Pipeline-level result memoization.
+Caches whole-pipeline results keyed by the normalized query and the agent graph
+version, with TTL expiry and an optional stale-while-revalidate window.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry"""
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.rstrip(" .!?")
+
+
+def _describe_instruction(instruction) -> Any:
+    """Text of a plain instruction, or what determines a compiled template's output"""
+    if isinstance(instruction, str):
+        return instruction
+    describe = getattr(instruction, "describe", None)
+    return describe() if describe else None
+
+
+def _describe_agent(agent) -> Dict[str, Any]:
+    """Describe the parts of an agent that influence its output"""
+    model = getattr(agent, "model", None)
+    instruction = getattr(agent, "instruction", None)
+    return {
+        "name": agent.name,
+        "type": type(agent).__name__,
+        "model": getattr(model, "model", model) if model is not None else None,
+        "instruction": _describe_instruction(instruction),
+        "output_key": getattr(agent, "output_key", None),
+        "max_iterations": getattr(agent, "max_iterations", None),
+        "quorum": getattr(agent, "quorum", None),
+        "branch_timeout": getattr(agent, "branch_timeout", None),
+        "sub_agents": [_describe_agent(sub_agent) for sub_agent in agent.sub_agents or []],
+    }
+
+
+def agent_graph_version(agent) -> str:
+    """Stable hash of an agent graph; changes whenever prompts, models or structure change"""
+    description = json.dumps(_describe_agent(agent), sort_keys=True, default=str)
+    return hashlib.sha256(description.encode()).hexdigest()[:12]
+
+
+class PipelineMemo:
+    """LRU result cache with TTL and stale-while-revalidate refresh"""
+
+    def __init__(self, ttl: float, stale_ttl: float = 0.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, ...], Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: Dict[Tuple[str, ...], asyncio.Task] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def get_or_compute(self, key: Tuple[str, ...], compute: Callable[[], Awaitable[Any]],
+                             should_cache: Callable[[Any], bool] = lambda result: True) -> Any:
+        """Return a cached result for key, computing (or refreshing) it when needed"""
+        if not self.enabled:
+            return await compute()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, created_at = entry
+            age = time.monotonic() - created_at
+            if age <= self.ttl:
+                self._entries.move_to_end(key)
+                logger.debug(f"Pipeline cache hit for {key}")
+                return copy.deepcopy(value)
+            if age <= self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, compute, should_cache)
+                logger.debug(f"Serving stale pipeline result for {key}")
+                return copy.deepcopy(value)
+
+        value = await compute()
+        if should_cache(value):
+            self._store(key, value)
+        return value
+
+    def _store(self, key: Tuple[str, ...], value: Any):
+        self._entries[key] = (copy.deepcopy(value), time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _schedule_refresh(self, key: Tuple[str, ...], compute: Callable[[], Awaitable[Any]],
+                          should_cache: Callable[[Any], bool]):
+        """Refresh an entry in the background; at most one refresh per key"""
+        if key in self._refreshing:
+            return
+
+        async def _refresh():
+            try:
+                value = await compute()
+                if should_cache(value):
+                    self._store(key, value)
+            except Exception as e:
+                logger.warning(f"⚠️ Background refresh failed for {key}: {e}")
+
+        task = asyncio.create_task(_refresh())
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Global pipeline cache configured from the environment
+pipeline_memo = PipelineMemo(
+    ttl=config.pipeline_cache_ttl,
+    stale_ttl=config.pipeline_cache_stale_ttl,
+    max_entries=config.pipeline_cache_max_entries,
+)
+
+
+def memoize_pipeline(root_agent, should_cache: Callable[[Any], bool] = lambda result: True,
+                     memo: Optional[PipelineMemo] = None):
+    """Decorator memoizing an async `fn(query)` pipeline entry point"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(query: str, *args, **kwargs):
+            # Only the plain `fn(query)` form is cached; extra arguments bypass the cache
+            if args or kwargs:
+                return await func(query, *args, **kwargs)
+
+            # Computed per call: hot-reloaded graphs (GraphAgent) change version in place
+            key = (func.__qualname__, agent_graph_version(root_agent), normalize_query(query))
+            return await (memo or pipeline_memo).get_or_compute(
+                key, lambda: func(query), should_cache
+            )
+
+        return wrapper
+    return decorator
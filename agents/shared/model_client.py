@@ -0,0 +1,241 @@
+"""
+Shared model client for Docker Model Runner.
+Extends ADK's LiteLlm wrapper with request-level optimizations that apply to
+every agent using the local model.
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import AsyncGenerator, Optional
+
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+from coalesce import SingleFlight
+from config import config, ModelRunnerConfig
+from deadline import check_deadline, iterate_with_deadline
+from endpoint_health import endpoint_monitor, is_connection_error
+from speculative import AGENT_HEADER, TimingsClient
+
+logger = logging.getLogger(__name__)
+
+# Identical in-flight model calls, shared across all agents of the process
+request_flights = SingleFlight()
+
+class LocalLoad:
+    """Model calls waiting or running on the local runner, and their smoothed latency"""
+
+    def __init__(self, smoothing: float = 0.3):
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+
+    def observe(self, seconds: float):
+        self.latency = seconds if self.latency is None else (
+            self.smoothing * seconds + (1 - self.smoothing) * self.latency
+        )
+
+
+# Load on Docker Model Runner from this process (read by hybrid routing)
+local_load = LocalLoad()
+
+# Optional admission gate for the model calls of the current run; anything with
+# an async context manager `slot(agent_name)` (e.g. batch stage grouping)
+model_gate: ContextVar = ContextVar("model_gate", default=None)
+
+# Set for calls whose answers must not be reused, e.g. a synthesis that only saw
+# part of its inputs (cache lookups still happen)
+skip_cache_store: ContextVar[bool] = ContextVar("skip_cache_store", default=False)
+
+
+def _content_text(content) -> str:
+    """Flatten the text parts of a Content (or plain string)"""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    return "\n".join(part.text for part in content.parts or [] if part.text)
+
+
+def request_prompt(llm_request: LlmRequest) -> str:
+    """Conversation text of a request, used for similarity matching"""
+    return "\n".join(
+        f"{content.role}: {_content_text(content)}" for content in llm_request.contents
+    )
+
+
+def _coalesced_copy(response: LlmResponse) -> LlmResponse:
+    """A joiner's copy of a shared response; its tokens were generated (and billed) once"""
+    response = response.model_copy(deep=True)
+    response.custom_metadata = {**(response.custom_metadata or {}), "coalesced": True}
+    return response
+
+
+def _with_agent_header(llm_request: LlmRequest, agent_name: Optional[str]) -> LlmRequest:
+    """Name the calling agent in the request's headers, for per-agent decode timings"""
+    if agent_name:
+        if llm_request.config.http_options is None:
+            llm_request.config.http_options = types.HttpOptions()
+        llm_request.config.http_options.headers = {
+            **(llm_request.config.http_options.headers or {}), AGENT_HEADER: agent_name
+        }
+    return llm_request
+
+
+def _is_cacheable(response: LlmResponse) -> bool:
+    """Only plain text answers are reusable; tool calls depend on live state"""
+    if response.error_code or not response.content:
+        return False
+    return all(part.function_call is None for part in response.content.parts or [])
+
+
+class ModelRunnerLlm(LiteLlm):
+    """LiteLlm client with run deadlines, request coalescing, decode timings,
+    endpoint failover and opt-in semantic response caching"""
+
+    _semantic_cache_threshold: Optional[float] = PrivateAttr(default=None)
+    _follow_endpoint: bool = PrivateAttr(default=False)
+    _config: ModelRunnerConfig = PrivateAttr(default=None)
+
+    def __init__(self, model: str, semantic_cache_threshold: Optional[float] = None,
+                 cfg: Optional[ModelRunnerConfig] = None, **kwargs):
+        kwargs.setdefault("llm_client", TimingsClient())
+        super().__init__(model=model, **kwargs)
+        self._semantic_cache_threshold = semantic_cache_threshold
+        self._config = cfg or config
+        # Clients on the detected endpoint follow it when the health monitor switches
+        self._follow_endpoint = kwargs.get("api_base") == self._config.api_base
+
+    def _sync_endpoint(self) -> Optional[str]:
+        """Point this client's next request at the active endpoint"""
+        api_base = self._config.api_base
+        if self._follow_endpoint and self._additional_args.get("api_base") != api_base:
+            # Requests already in flight built their arguments from the previous value
+            self._additional_args["api_base"] = api_base
+        return self._additional_args.get("api_base")
+
+    def _cache_namespace(self, llm_request: LlmRequest) -> str:
+        """Requests may only share answers with the same model, parameters and instruction"""
+        params = {k: v for k, v in self._additional_args.items() if k != "api_key"}
+        system_instruction = _content_text(llm_request.config.system_instruction) if llm_request.config else ""
+        key = json.dumps([self.model, params, system_instruction], sort_keys=True, default=str)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _flight_key(self, llm_request: LlmRequest, stream: bool) -> str:
+        """Requests coalesce only when model, parameters and the full request are identical"""
+        params = {k: v for k, v in self._additional_args.items() if k != "api_key"}
+        request = llm_request.model_dump(exclude={"tools_dict", "live_connect_config"}, exclude_none=True)
+        # The agent-name label doesn't change what the model generates
+        (request.get("config") or {}).pop("labels", None)
+        key = json.dumps([self.model, params, request, stream], sort_keys=True, default=str)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _generate_upstream(
+        self, llm_request: LlmRequest, stream: bool, agent_name: Optional[str]
+    ) -> AsyncGenerator[LlmResponse, None]:
+        def upstream():
+            # Tagged after the flight key is taken, so agents still share identical calls
+            return LiteLlm.generate_content_async(self, _with_agent_header(llm_request, agent_name), stream=stream)
+
+        if not self._config.request_coalescing:
+            return upstream()
+        return request_flights.stream(
+            self._flight_key(llm_request, stream),
+            upstream,
+            copy=lambda response: response.model_copy(deep=True),
+            copy_joined=_coalesced_copy,
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        # Don't start a generation for a run that is already out of time, and abort
+        # the in-flight HTTP request if the deadline passes mid-generation
+        check_deadline()
+        endpoint_monitor.ensure_started()
+        labels = llm_request.config.labels if llm_request.config else None
+        agent_name = (labels or {}).get("adk_agent_name")
+        responses = self._generate_gated(llm_request, stream, agent_name)
+        try:
+            while True:
+                # Counted only while waiting on the model, never across a yield, so
+                # the count is right however the caller finalizes this generator
+                local_load.in_flight += 1
+                try:
+                    response = await anext(responses)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    local_load.in_flight -= 1
+                yield response
+        finally:
+            await responses.aclose()
+
+    async def _generate_gated(
+        self, llm_request: LlmRequest, stream: bool, agent_name: Optional[str]
+    ) -> AsyncGenerator[LlmResponse, None]:
+        gate = model_gate.get()
+        async with gate.slot(agent_name) if gate else contextlib.nullcontext():
+            endpoint = self._sync_endpoint()
+            started = time.perf_counter()
+            try:
+                async for response in iterate_with_deadline(self._generate_cached(llm_request, stream, agent_name)):
+                    if started is not None:
+                        # Time to the first response tracks queueing, not answer length
+                        local_load.observe(time.perf_counter() - started)
+                        started = None
+                    yield response
+            except Exception as e:
+                if is_connection_error(e):
+                    endpoint_monitor.record(endpoint, ok=False, error=str(e))
+                raise
+            endpoint_monitor.record(endpoint, ok=True)
+
+    async def _generate_cached(
+        self, llm_request: LlmRequest, stream: bool, agent_name: Optional[str]
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self._semantic_cache_threshold is None:
+            async for response in self._generate_upstream(llm_request, stream, agent_name):
+                yield response
+            return
+
+        # Imported on first use: it pulls in NumPy, which agents without a
+        # cached stage never need
+        from semantic_cache import semantic_cache
+
+        namespace = self._cache_namespace(llm_request)
+        prompt = request_prompt(llm_request)
+        # The cache only speeds calls up: an unreachable embedding model is a miss, not a failure
+        vector = cached = None
+        try:
+            vector = await semantic_cache.embed(prompt)
+            cached = await semantic_cache.lookup(namespace, prompt, self._semantic_cache_threshold, vector=vector)
+        except Exception as e:
+            logger.warning(f"⚠️ Semantic cache lookup failed, calling the model: {e}")
+        if cached is not None:
+            for response in cached:
+                response = response.model_copy(deep=True)
+                # Lets token accounting tell replayed answers from generated ones
+                response.custom_metadata = {**(response.custom_metadata or {}), "semantic_cache_hit": True}
+                yield response
+            return
+
+        final_responses = []
+        async for response in self._generate_upstream(llm_request, stream, agent_name):
+            if not response.partial:
+                final_responses.append(response.model_copy(deep=True))
+            yield response
+
+        if (vector is not None and final_responses and not skip_cache_store.get()
+                and all(_is_cacheable(response) for response in final_responses)):
+            try:
+                await semantic_cache.store(namespace, prompt, final_responses, vector=vector)
+            except Exception as e:
+                logger.warning(f"⚠️ Semantic cache store failed, skipping it: {e}")
@@ -0,0 +1,259 @@
+"""
+Profiling hooks for orchestration overhead.
+Enabled with ADK_PROFILE=true: wraps pipeline runs in a sampling profiler,
+records per-agent wall time versus time spent waiting on the model, and
+measures event-loop lag.
+"""
+
+import asyncio
+import cProfile
+import itertools
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional
+
+from callbacks import add_callbacks
+from config import config
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # optional dependency; fall back to cProfile
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+
+class RunProfile:
+    """Per-agent timing of a single pipeline run"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.agent_wall: Dict[str, float] = defaultdict(float)
+        self.model_wait: Dict[str, float] = defaultdict(float)
+        self.model_calls: Dict[str, int] = defaultdict(int)
+        self._started: Dict[tuple, float] = {}
+
+    def start(self, kind: str, callback_context):
+        self._started[(kind, callback_context.invocation_id, callback_context.agent_name)] = time.perf_counter()
+
+    def stop(self, kind: str, callback_context) -> Optional[float]:
+        started = self._started.pop((kind, callback_context.invocation_id, callback_context.agent_name), None)
+        return None if started is None else time.perf_counter() - started
+
+    def breakdown(self, root_agent) -> Dict[str, Dict[str, float]]:
+        """Wall, model-wait and self (orchestration) time per agent"""
+        report = {}
+
+        def visit(agent):
+            children = agent.sub_agents or []
+            wall = self.agent_wall.get(agent.name, 0.0)
+            model = self.model_wait.get(agent.name, 0.0)
+            child_wall = sum(self.agent_wall.get(child.name, 0.0) for child in children)
+            report[agent.name] = {
+                "wall": round(wall, 6),
+                "model_wait": round(model, 6),
+                "model_calls": self.model_calls.get(agent.name, 0),
+                # Parallel children overlap, so their sum can exceed the parent's wall time
+                "self": round(max(wall - model - child_wall, 0.0), 6),
+            }
+            for child in children:
+                visit(child)
+
+        visit(root_agent)
+        return report
+
+
+_current_profile: ContextVar[Optional[RunProfile]] = ContextVar("run_profile", default=None)
+
+
+def _before_agent(callback_context):
+    profile = _current_profile.get()
+    if profile:
+        profile.start("agent", callback_context)
+
+
+def _after_agent(callback_context):
+    profile = _current_profile.get()
+    elapsed = profile.stop("agent", callback_context) if profile else None
+    if elapsed is not None:
+        profile.agent_wall[callback_context.agent_name] += elapsed
+
+
+def _before_model(callback_context, llm_request):
+    profile = _current_profile.get()
+    if profile:
+        profile.start("model", callback_context)
+
+
+def _after_model(callback_context, llm_response):
+    profile = _current_profile.get()
+    # Streaming calls report partial responses; time runs until the final one
+    if profile and not llm_response.partial:
+        elapsed = profile.stop("model", callback_context)
+        if elapsed is not None:
+            profile.model_wait[callback_context.agent_name] += elapsed
+            profile.model_calls[callback_context.agent_name] += 1
+
+
+def add_timing_callbacks(root_agent):
+    """Time every agent and model call of a tree into the RunProfile being recorded"""
+    add_callbacks(
+        root_agent,
+        before_agent_callback=_before_agent,
+        after_agent_callback=_after_agent,
+        before_model_callback=_before_model,
+        after_model_callback=_after_model,
+    )
+    return root_agent
+
+
+@contextmanager
+def recording(profile: RunProfile):
+    """Record timings of the runs started inside this block into `profile`"""
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a sleeping task"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - scheduled, 0.0))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {"samples": 0}
+        ordered = sorted(self.samples)
+        return {
+            "samples": len(ordered),
+            "mean_ms": round(1000 * sum(ordered) / len(ordered), 3),
+            "p99_ms": round(1000 * ordered[int(0.99 * (len(ordered) - 1))], 3),
+            "max_ms": round(1000 * ordered[-1], 3),
+        }
+
+
+class _Sampler:
+    """Process-wide sampling profiler shared by concurrent runs"""
+
+    def __init__(self):
+        self.active_runs = 0
+        self._profiler = None
+
+    def acquire(self):
+        self.active_runs += 1
+        if self.active_runs > 1:
+            return
+        if Profiler is not None:
+            self._profiler = Profiler(interval=config.profile_interval, async_mode="disabled")
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def release(self, path_prefix: str) -> Optional[str]:
+        self.active_runs -= 1
+        if self.active_runs > 0 or self._profiler is None:
+            return None
+
+        profiler, self._profiler = self._profiler, None
+        if Profiler is not None:
+            profiler.stop()
+            path = f"{path_prefix}.speedscope.json"
+            with open(path, "w") as f:
+                f.write(profiler.output(SpeedscopeRenderer()))
+        else:
+            profiler.disable()
+            path = f"{path_prefix}.prof"
+            profiler.dump_stats(path)
+        return path
+
+
+_sampler = _Sampler()
+_run_ids = itertools.count(1)
+
+
+@asynccontextmanager
+async def profile_run(name: str, root_agent):
+    """Profile everything run inside this block and write the reports to ADK_PROFILE_DIR"""
+    if not config.profile_enabled:
+        yield None
+        return
+
+    os.makedirs(config.profile_dir, exist_ok=True)
+    path_prefix = os.path.join(config.profile_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_run_ids)}")
+    profile = RunProfile(name)
+    token = _current_profile.set(profile)
+    lag_monitor = LoopLagMonitor()
+    lag_monitor.start()
+    _sampler.acquire()
+    started = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        total = time.perf_counter() - started
+        await lag_monitor.stop()
+        _current_profile.reset(token)
+        sample_path = _sampler.release(path_prefix)
+
+        report = {
+            "name": name,
+            "total_seconds": round(total, 6),
+            "agents": profile.breakdown(root_agent),
+            "event_loop_lag": lag_monitor.summary(),
+            "samples": sample_path,
+        }
+        with open(f"{path_prefix}.agents.json", "w") as f:
+            json.dump(report, f, indent=2)
+
+        model_wait = sum(profile.model_wait.values())
+        logger.info(
+            f"⏱️ Profile {name}: {total:.3f}s total, {model_wait:.3f}s waiting on the model, "
+            f"loop lag p99 {report['event_loop_lag'].get('p99_ms', 0)}ms -> {path_prefix}.*"
+        )
+
+
+def profile_pipeline(name: str, root_agent):
+    """Decorator profiling each call of an async pipeline entry point when ADK_PROFILE is set"""
+    def decorator(func):
+        if not config.profile_enabled:
+            return func
+
+        add_timing_callbacks(root_agent)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with profile_run(name, root_agent):
+                return await func(*args, **kwargs)
+
+        return wrapper
+    return decorator
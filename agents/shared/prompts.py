@@ -0,0 +1,82 @@
+"""
+Compiled prompt templates for agent instructions.
+A template is compiled once: the static text is dedented and frozen, and the
+state slots it reads are appended after it in a fixed order, each capped in
+length. The static text is a byte-identical prefix on every call, so the
+llama.cpp prompt cache (and warm-up) can reuse it, and no per-call template
+parsing is needed.
+
+Usage:
+    instruction=PromptTemplate(
+        "You are a senior code reviewer. Review the HTML code in <generated_code>.",
+        slots={"generated_code": 6000},
+    )
+"""
+
+import hashlib
+import inspect
+import json
+import re
+from typing import Any, Dict, Iterable, Mapping, Optional, Union
+
+from config import config
+
+# ADK state references ({key} / {key?}) would be re-rendered on every call
+_PLACEHOLDER = re.compile(r"\{[A-Za-z_][\w:]*\??\}")
+
+
+def cap_text(text: str, max_chars: Optional[int]) -> str:
+    """Truncate text to max_chars, saying how much was cut"""
+    if not max_chars or len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}\n[... {len(text) - max_chars} more characters truncated]"
+
+
+class PromptTemplate:
+    """Agent instruction with a static prefix and length-capped state slots.
+
+    `slots` maps state keys to their maximum length in characters (None uses
+    PROMPT_SLOT_MAX_CHARS); an iterable of keys uses the default cap for all.
+    Slots missing from state are left out. Instances are ADK instruction
+    providers, so they can be passed as `instruction=` directly.
+    """
+
+    def __init__(self, text: str, slots: Union[Mapping[str, Optional[int]], Iterable[str], None] = None):
+        self.static_text = inspect.cleandoc(text)
+        placeholder = _PLACEHOLDER.search(self.static_text)
+        if placeholder:
+            raise ValueError(
+                f"Prompt template has an inline placeholder {placeholder.group()}; declare it as a slot instead"
+            )
+        if slots is None:
+            slots = {}
+        elif not isinstance(slots, Mapping):
+            slots = dict.fromkeys(slots)
+        self.slots: Dict[str, int] = {
+            key: config.prompt_slot_max_chars if max_chars is None else max_chars
+            for key, max_chars in slots.items()
+        }
+        self.prefix_hash = hashlib.sha256(self.static_text.encode()).hexdigest()[:12]
+        # Slot headers are static too; build them once
+        self._sections = [(key, f"\n\n<{key}>\n", f"\n</{key}>") for key in self.slots]
+
+    def render(self, state: Mapping[str, Any]) -> str:
+        parts = [self.static_text]
+        for key, opening, closing in self._sections:
+            value = state.get(key)
+            if value is None or value == "":
+                continue
+            if not isinstance(value, str):
+                value = json.dumps(value, ensure_ascii=False, default=str)
+            parts += (opening, cap_text(value, self.slots[key]), closing)
+        return "".join(parts)
+
+    def __call__(self, ctx) -> str:
+        return self.render(ctx.state)
+
+    def describe(self) -> Dict[str, Any]:
+        """What determines the rendered prompt (for graph versioning)"""
+        return {"text": self.static_text, "slots": self.slots}
+
+    def __repr__(self) -> str:
+        return f"PromptTemplate(prefix={self.prefix_hash}, slots={list(self.slots)})"
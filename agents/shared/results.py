@@ -0,0 +1,115 @@
+"""
+Streaming result sinks for agent runs.
+Final responses are written to a file or socket as they arrive; the runner
+only keeps a compact record with a bounded preview, so memory per run stays
+flat regardless of report length.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Optional
+from urllib.parse import urlparse
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class EventRecord:
+    """Compact record of one final agent response"""
+
+    __slots__ = ("agent", "length", "preview")
+
+    def __init__(self, agent: str, length: int, preview: str):
+        self.agent = agent
+        self.length = length
+        self.preview = preview
+
+    @property
+    def truncated(self) -> bool:
+        return self.length > len(self.preview)
+
+    def __repr__(self):
+        return f"EventRecord(agent={self.agent!r}, length={self.length})"
+
+
+class ResultSink:
+    """Keeps previews only; subclasses also stream the full text somewhere"""
+
+    def __init__(self, preview_chars: int = 2000):
+        self.preview_chars = preview_chars
+
+    async def emit(self, agent: str, text: str, run_id: Optional[str] = None,
+                   session_id: Optional[str] = None) -> EventRecord:
+        await self._write({"run_id": run_id, "session_id": session_id, "agent": agent, "text": text})
+        return EventRecord(agent, len(text), text[:self.preview_chars])
+
+    async def _write(self, record: dict):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+class FileSink(ResultSink):
+    """Appends one JSON line per response to a file"""
+
+    def __init__(self, path: str, preview_chars: int = 2000):
+        super().__init__(preview_chars)
+        self._file = open(path, "a", encoding="utf-8")
+
+    async def _write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    async def aclose(self):
+        self._file.close()
+
+
+class SocketSink(ResultSink):
+    """Streams one JSON line per response to a TCP endpoint.
+
+    Streams belong to the event loop that opened them, so the sink keeps one
+    connection per loop; a lock keeps concurrent runs from interleaving lines.
+    """
+
+    def __init__(self, host: str, port: int, preview_chars: int = 2000):
+        super().__init__(preview_chars)
+        self.host = host
+        self.port = port
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _write(self, record: dict):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # The previous loop (and its connection) is gone or not ours to use
+            self._loop, self._lock, self._writer = loop, asyncio.Lock(), None
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                _, self._writer = await asyncio.open_connection(self.host, self.port)
+            self._writer.write(json.dumps(record, ensure_ascii=False).encode() + b"\n")
+            await self._writer.drain()
+
+    async def aclose(self):
+        if self._writer is not None and self._loop is asyncio.get_running_loop():
+            async with self._lock:
+                self._writer.close()
+                await self._writer.wait_closed()
+        self._loop, self._lock, self._writer = None, None, None
+
+
+def open_sink(target: Optional[str], preview_chars: int = 2000) -> ResultSink:
+    """Create a sink from a target: empty (previews only), a file path or tcp://host:port"""
+    if not target:
+        return ResultSink(preview_chars)
+    if target.startswith("tcp://"):
+        parsed = urlparse(target)
+        return SocketSink(parsed.hostname, parsed.port, preview_chars)
+    return FileSink(target, preview_chars)
+
+
+# Default sink for runners, configured from the environment
+result_sink = open_sink(config.result_sink, config.result_preview_chars)
@@ -0,0 +1,115 @@
+"""
+Semantic similarity cache for near-duplicate prompts.
+Embeds prompts with a local embedding model served by Docker Model Runner
+(EMBEDDING_MODEL) and keeps a bounded NumPy nearest-neighbour index with LRU
+eviction, so paraphrased requests to deterministic stages reuse responses.
+Without an embedding model the cache is off: lexical similarity can't tell
+"with navigation" from "without navigation".
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import aiohttp
+import numpy as np
+
+from config import config, ModelRunnerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRunnerEmbedder:
+    """Embeds text with a local embedding model served by Docker Model Runner"""
+
+    def __init__(self, cfg: ModelRunnerConfig, model: str):
+        self.cfg = cfg
+        self.model = model
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """One session (and connection pool) per event loop; sessions can't cross loops"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=30),
+                headers={"Authorization": f"Bearer {self.cfg.api_key}"},
+            )
+            self._loop = loop
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def embed(self, text: str) -> np.ndarray:
+        body = {"model": self.model, "input": text}
+        # The endpoint is read per call: it follows failover switches
+        async with self._get_session().post(f"{self.cfg.api_base.rstrip('/')}/embeddings", json=body) as response:
+            response.raise_for_status()
+            payload = await response.json()
+        return np.asarray(payload["data"][0]["embedding"], dtype=np.float32)
+
+
+class SemanticCache:
+    """Bounded nearest-neighbour response cache partitioned by namespace"""
+
+    def __init__(self, embedder, max_entries: int = 1024):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self._vectors: Optional[np.ndarray] = None  # allocated once the dimension is known
+        # Full namespace hashes; a shortened hash could let two namespaces share answers
+        self._namespaces = np.full(max_entries, "", dtype=object)
+        self._occupied = np.zeros(max_entries, dtype=bool)
+        self._values: "OrderedDict[int, Any]" = OrderedDict()  # slot -> value, in LRU order
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Normalized embedding of a prompt; pass it to lookup and store to embed only once"""
+        vector = await self.embedder.embed(text)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def lookup(self, namespace: str, prompt: str, threshold: float,
+                     vector: Optional[np.ndarray] = None) -> Optional[Any]:
+        """Return the cached value of the most similar prompt if above threshold"""
+        if self._vectors is None or not self._occupied.any():
+            return None
+
+        query = vector if vector is not None else await self.embed(prompt)
+        mask = self._occupied & (self._namespaces == namespace)
+        if not mask.any():
+            return None
+
+        scores = np.where(mask, self._vectors @ query, -np.inf)
+        slot = int(np.argmax(scores))
+        if scores[slot] < threshold:
+            return None
+
+        self._values.move_to_end(slot)
+        logger.debug(f"Semantic cache hit (similarity {scores[slot]:.3f})")
+        return self._values[slot]
+
+    async def store(self, namespace: str, prompt: str, value: Any, vector: Optional[np.ndarray] = None):
+        """Insert a prompt/value pair, evicting the least recently used entry when full"""
+        if vector is None:
+            vector = await self.embed(prompt)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+        if len(self._values) < self.max_entries:
+            slot = int(np.argmin(self._occupied))
+        else:
+            slot, _ = self._values.popitem(last=False)
+
+        self._vectors[slot] = vector
+        self._namespaces[slot] = namespace
+        self._occupied[slot] = True
+        self._values[slot] = value
+
+
+# Global semantic cache shared by all model clients (only used when EMBEDDING_MODEL is set)
+semantic_cache = SemanticCache(
+    ModelRunnerEmbedder(config, config.embedding_model), max_entries=config.semantic_cache_max_entries
+)
@@ -0,0 +1,156 @@
+"""
+Web server entry point for the ADK agents.
+Wraps the `adk web` FastAPI app with model warm-up, health/readiness probes and
+per-request deadlines.
+
+Usage (from the agents directory):
+    python shared/server.py
+"""
+
+import asyncio
+import os
+import sys
+
+# Make shared modules importable when run as a script
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config, setup_logging
+from deadline import deadline_scope
+from endpoint_health import endpoint_monitor
+from speculative import decode_stats
+from usage import usage_ledger
+from warmup import AGENTS_DIR, warmup_state, start_warmup_thread
+
+logger = setup_logging()
+
+DEADLINE_HEADER = b"x-request-timeout"
+
+
+class DeadlineMiddleware:
+    """ASGI middleware binding each request to a deadline and to its client connection.
+
+    The deadline comes from the `X-Request-Timeout` header (seconds) or
+    RUN_DEADLINE_SECONDS. If the client disconnects before the response is
+    complete, the request task is cancelled, which aborts the running agents
+    and their in-flight model calls.
+    """
+
+    def __init__(self, app, default_timeout=None):
+        self.app = app
+        self.default_timeout = default_timeout
+
+    def _timeout(self, scope):
+        for name, value in scope.get("headers", []):
+            if name == DEADLINE_HEADER:
+                try:
+                    return float(value)
+                except ValueError:
+                    logger.warning(f"⚠️ Ignoring invalid request timeout: {value!r}")
+        return self.default_timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        body_received = asyncio.Event()
+        disconnected = asyncio.Event()
+
+        async def tracked_receive():
+            if body_received.is_set():
+                # The body has been consumed; further reads only wait for disconnect
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_received.set()
+            return message
+
+        with deadline_scope(self._timeout(scope)):
+            app_task = asyncio.create_task(self.app(scope, tracked_receive, send))
+
+        async def watch_disconnect():
+            await body_received.wait()
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+            app_task.cancel()
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                app_task.cancel()
+                raise
+            logger.info(f"🔌 Client disconnected, cancelled {scope.get('path')}")
+        finally:
+            watcher.cancel()
+
+
+def create_app():
+    """Create the ADK web app with health, readiness, endpoint, routing, decode-stats and usage endpoints"""
+    from fastapi.responses import JSONResponse
+    from google.adk.cli.fast_api import get_fast_api_app
+
+    app = get_fast_api_app(agents_dir=AGENTS_DIR, web=True)
+    app.add_middleware(DeadlineMiddleware, default_timeout=config.run_deadline)
+
+    @app.get("/healthz")
+    async def healthz():
+        """Liveness probe: the process is up and serving"""
+        return {"status": "ok"}
+
+    @app.get("/readyz")
+    async def readyz():
+        """Readiness probe: only ready once the model is loaded and warmed"""
+        status_code = 200 if warmup_state.is_ready else 503
+        return JSONResponse(warmup_state.as_dict(), status_code=status_code)
+
+    @app.get("/endpoint")
+    async def endpoint_status():
+        """Active Model Runner endpoint and its health"""
+        return endpoint_monitor.as_dict()
+
+    @app.get("/routing")
+    async def routing_summary():
+        """Local and remote model calls per agent (hybrid models)"""
+        from hybrid import routing_stats
+        return routing_stats.summary()
+
+    @app.get("/decode-stats")
+    async def decode_stats_summary():
+        """Per-agent decode speed and speculative draft acceptance rates"""
+        return decode_stats.summary()
+
+    @app.get("/usage")
+    async def usage_summary():
+        """Token usage per agent and per user, with the configured budgets"""
+        return usage_ledger.summary()
+
+    @app.get("/usage/{scope}/{key}")
+    async def usage_detail(scope: str, key: str):
+        """Token usage of one run (invocation id), session, user or agent"""
+        try:
+            usage = usage_ledger.usage(scope, key)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        if usage is None:
+            return JSONResponse({"error": f"No usage recorded for {scope} '{key}'"}, status_code=404)
+        return usage
+
+    start_warmup_thread(config, warmup_state)
+    endpoint_monitor.ensure_started()
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        create_app(),
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+    )
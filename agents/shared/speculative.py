@@ -0,0 +1,129 @@
+"""
+Speculative decoding with a llama.cpp draft model.
+Agents opt in per model client; requests carry llama.cpp's `speculative.*`
+fields, and the `timings` block of each completion is aggregated per agent to
+report draft acceptance rates and decode speed.
+
+Usage:
+    # Compare decode speed with and without the draft model
+    python agents/shared/speculative.py --requests 5 --max-tokens 256
+"""
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+from google.adk.models.lite_llm import LiteLLMClient
+
+from config import config, ModelRunnerConfig
+
+# Request header naming the calling agent (set by ModelRunnerLlm, removed before sending)
+AGENT_HEADER = "X-ADK-Agent"
+
+TIMING_FIELDS = ("predicted_n", "predicted_ms", "draft_n", "draft_n_accepted")
+
+
+class DecodeStats:
+    """Per-agent totals of llama.cpp completion timings"""
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def record(self, agent: Optional[str], timings: Dict[str, Any]):
+        totals = self._totals[agent or "unknown"]
+        totals["calls"] += 1
+        for field in TIMING_FIELDS:
+            totals[field] += timings.get(field) or 0
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for agent, totals in self._totals.items():
+            report[agent] = {
+                "calls": int(totals["calls"]),
+                "tokens": int(totals["predicted_n"]),
+                "tokens_per_second": round(1000 * totals["predicted_n"] / totals["predicted_ms"], 2)
+                if totals["predicted_ms"] else None,
+                "draft_tokens": int(totals["draft_n"]),
+                "acceptance_rate": round(totals["draft_n_accepted"] / totals["draft_n"], 3)
+                if totals["draft_n"] else None,
+            }
+        return report
+
+
+decode_stats = DecodeStats()
+
+
+class TimingsClient(LiteLLMClient):
+    """LiteLLM client that records llama.cpp timings of non-streaming completions"""
+
+    async def acompletion(self, model, messages, tools, **kwargs):
+        headers = dict(kwargs.pop("extra_headers", None) or {})
+        agent = headers.pop(AGENT_HEADER, None)
+        if headers:
+            kwargs["extra_headers"] = headers
+        # A per-request max_output_tokens (e.g. a token budget downgrade) arrives as
+        # max_completion_tokens next to the client's max_tokens; llama.cpp reads max_tokens
+        cap = kwargs.pop("max_completion_tokens", None)
+        if cap:
+            kwargs["max_tokens"] = min(cap, kwargs.get("max_tokens") or cap)
+        response = await super().acompletion(model=model, messages=messages, tools=tools, **kwargs)
+        # Streamed chunks don't carry the timings block through LiteLLM
+        timings = getattr(response, "timings", None)
+        if isinstance(timings, dict):
+            decode_stats.record(agent, timings)
+        return response
+
+
+async def _measure(cfg: ModelRunnerConfig, prompt: str, max_tokens: int, speculative: bool) -> Dict[str, Any]:
+    import aiohttp
+
+    body = {
+        "model": cfg.served_model_name,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": 0,
+        **cfg.get_speculative_params(speculative),
+    }
+    headers = {"Authorization": f"Bearer {cfg.api_key}"}
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{cfg.api_base.rstrip('/')}/chat/completions", json=body, headers=headers) as response:
+            response.raise_for_status()
+            payload = await response.json()
+    timings = payload.get("timings") or {}
+    timings.setdefault("predicted_n", payload.get("usage", {}).get("completion_tokens", 0))
+    timings.setdefault("predicted_ms", 1000 * (time.perf_counter() - started))
+    return timings
+
+
+async def probe_acceptance(cfg: ModelRunnerConfig, prompt: str, max_tokens: int = 256,
+                           requests: int = 3) -> Dict[str, Dict[str, Any]]:
+    """Decode speed and acceptance rate with the draft model on and off"""
+    stats = DecodeStats()
+    for _ in range(requests):
+        for label, speculative in (("baseline", False), ("speculative", True)):
+            stats.record(label, await _measure(cfg, prompt, max_tokens, speculative))
+    return stats.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure speculative decoding on Docker Model Runner")
+    parser.add_argument("--prompt", default="Write a detailed report on the state of container orchestration.")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--requests", type=int, default=3)
+    args = parser.parse_args()
+
+    if not config.draft_model:
+        parser.error("DRAFT_MODEL is not set; load a draft model and set DRAFT_MODEL first")
+
+    report = asyncio.run(probe_acceptance(config, args.prompt, args.max_tokens, args.requests))
+    print(f"\n{'mode':>12} {'tokens/s':>10} {'acceptance':>11}")
+    for label, row in report.items():
+        acceptance = "-" if row["acceptance_rate"] is None else f"{row['acceptance_rate']:.1%}"
+        print(f"{label:>12} {row['tokens_per_second']:>10} {acceptance:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Non-blocking structured logging.
+Log calls only enqueue records; formatting and I/O happen on a background
+writer thread. Records carry run/session/agent ids from the current context,
+and per-event logs can be sampled.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+CONTEXT_FIELDS = ("app", "run_id", "session_id", "agent")
+
+_log_context: ContextVar[Dict[str, str]] = ContextVar("log_context", default={})
+_listener: Optional[QueueListener] = None
+
+
+@contextmanager
+def log_context(**ids):
+    """Attach ids (app, run_id, session_id, agent) to every record logged in this block"""
+    token = _log_context.set({**_log_context.get(), **{k: v for k, v in ids.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextQueueHandler(QueueHandler):
+    """Queue handler that defers message formatting to the writer thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler.prepare, don't format here; only capture the
+        # context ids, which are not visible from the writer thread
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return record
+
+
+class EventSampler(logging.Filter):
+    """Keep only a fraction of per-event records (logged with extra={'event': True})"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or not getattr(record, "event", False):
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including context ids when present"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                payload[field] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = "INFO", fmt: str = "text", event_sample_rate: float = 1.0):
+    """Install the queue handler on the root logger (once per process)"""
+    global _listener
+
+    root = logging.getLogger()
+    # Like logging.basicConfig, leave an already configured root logger alone
+    if _listener is not None or root.handlers:
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(log_queue)
+    queue_handler.addFilter(EventSampler(event_sample_rate))
+
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
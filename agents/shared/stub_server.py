@@ -0,0 +1,162 @@
+"""
+Stub OpenAI-compatible model server for profiling, load and benchmark runs.
+Serves `/models`, `/chat/completions` and `/embeddings` under any path prefix,
+with deterministic output and a configurable per-token delay. Completions carry
+llama.cpp-style `timings`, including synthetic draft statistics for requests
+that enable speculative decoding when a draft acceptance rate is set.
+
+Usage:
+    python agents/shared/stub_server.py --port 12435
+    DOCKER_MODEL_RUNNER=http://localhost:12435/engines/llama.cpp/v1 python agents/sequential_agent/agent.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+
+from aiohttp import web
+
+WORDS = (
+    "the model runner returns deterministic stub output so that pipeline "
+    "timings reflect python overhead rather than token generation"
+).split()
+
+
+def _prompt_digest(messages) -> int:
+    return int(hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()[:8], 16)
+
+
+def _completion_words(messages, count: int):
+    """Deterministic pseudo-text derived from the prompt"""
+    offset = _prompt_digest(messages)
+    return [WORDS[(offset + i) % len(WORDS)] for i in range(count)]
+
+
+def _timings(body, prompt_tokens: int, predicted: int, elapsed: float, draft_acceptance: float):
+    """llama.cpp server `timings` block"""
+    timings = {
+        "prompt_n": prompt_tokens,
+        "predicted_n": predicted,
+        "predicted_ms": round(elapsed * 1000, 3),
+        "predicted_per_second": round(predicted / elapsed, 3) if elapsed > 0 else None,
+    }
+    if draft_acceptance > 0 and body.get("speculative.n_max", 0) > 0:
+        timings["draft_n"] = predicted
+        timings["draft_n_accepted"] = int(predicted * draft_acceptance)
+    return timings
+
+
+def create_stub_app(model: str = "ai/llama3.2:1B-Q8_0", completion_tokens: int = 64,
+                    token_delay: float = 0.0, prompt_delay: float = 0.0,
+                    draft_acceptance: float = 0.0) -> web.Application:
+    """Build the stub server application"""
+    counters = {"requests": 0}
+
+    async def list_models(request):
+        return web.json_response({"object": "list", "data": [{"id": model, "object": "model"}]})
+
+    async def chat_completions(request):
+        body = await request.json()
+        counters["requests"] += 1
+        messages = body.get("messages", [])
+        max_tokens = body.get("max_tokens") or completion_tokens
+        words = _completion_words(messages, min(max_tokens, completion_tokens))
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(words),
+            "total_tokens": prompt_tokens + len(words),
+        }
+        completion_id = f"chatcmpl-stub-{counters['requests']}"
+        created = int(time.time())
+
+        await asyncio.sleep(prompt_delay)
+        started = time.perf_counter()
+
+        if not body.get("stream"):
+            await asyncio.sleep(token_delay * len(words))
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model", model),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+                "timings": _timings(body, prompt_tokens, len(words), time.perf_counter() - started, draft_acceptance),
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for index, word in enumerate(words):
+            await asyncio.sleep(token_delay)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model", model),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if index == 0 else f" {word}"},
+                    "finish_reason": None,
+                }],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": body.get("model", model),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": usage,
+            "timings": _timings(body, prompt_tokens, len(words), time.perf_counter() - started, draft_acceptance),
+        }
+        await response.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+        await response.write_eof()
+        return response
+
+    async def embeddings(request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        data = []
+        for index, text in enumerate(inputs):
+            digest = hashlib.sha256(text.encode()).digest()
+            data.append({"object": "embedding", "index": index, "embedding": [b / 255.0 for b in digest]})
+        return web.json_response({"object": "list", "data": data, "model": body.get("model", model)})
+
+    app = web.Application()
+    app["counters"] = counters
+    app.router.add_get(r"/{prefix:.*}models", list_models)
+    app.router.add_post(r"/{prefix:.*}chat/completions", chat_completions)
+    app.router.add_post(r"/{prefix:.*}embeddings", embeddings)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible model server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12435)
+    parser.add_argument("--model", default="ai/llama3.2:1B-Q8_0")
+    parser.add_argument("--completion-tokens", type=int, default=64)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--prompt-delay", type=float, default=0.0, help="Seconds of prompt processing")
+    parser.add_argument("--draft-acceptance", type=float, default=0.0,
+                        help="Report this draft acceptance rate for speculative requests")
+    args = parser.parse_args()
+
+    web.run_app(
+        create_stub_app(args.model, args.completion_tokens, args.token_delay, args.prompt_delay,
+                        args.draft_acceptance),
+        host=args.host,
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Off-loop execution for synchronous tools.
+ADK calls a sync tool function inline, so a blocking or CPU-heavy tool stalls
+every session sharing the event loop. Sync tools are wrapped to run on a
+bounded thread (or process) pool with a per-tool timeout and concurrency limit.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+import logging
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from google.adk.tools import FunctionTool
+
+from config import config
+from deadline import remaining_time
+
+logger = logging.getLogger(__name__)
+
+
+def is_sync_callable(func: Callable) -> bool:
+    """True for plain sync functions and callables (not coroutines or streaming generators)"""
+    call = func if inspect.isroutine(func) else getattr(func, "__call__", func)
+    checks = (inspect.iscoroutinefunction, inspect.isasyncgenfunction, inspect.isgeneratorfunction)
+    return not any(check(call) for check in checks)
+
+
+class ToolExecutor:
+    """Shared thread and process pools for synchronous tools (created on first use)"""
+
+    def __init__(self, max_threads: int = 8, max_processes: int = 2):
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def pool(self, process: bool) -> Executor:
+        if process:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.max_processes)
+            return self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="adk-tool")
+        return self._threads
+
+    async def run(self, func: Callable, kwargs: Dict[str, Any], process: bool = False) -> Any:
+        loop = asyncio.get_running_loop()
+        if process:
+            # Arguments and results cross a process boundary, so both must be picklable
+            return await loop.run_in_executor(self.pool(True), functools.partial(func, **kwargs))
+        # Carry log context and deadline into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.pool(False), functools.partial(context.run, func, **kwargs))
+
+    def shutdown(self):
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+
+tool_executor = ToolExecutor(config.tool_max_threads, config.tool_max_processes)
+
+
+def offload(func: Callable, timeout: Optional[float] = None, max_concurrency: Optional[int] = None,
+            process: bool = False, executor: Optional[ToolExecutor] = None) -> Callable:
+    """Wrap a sync tool function in an async one that runs on the tool pool.
+
+    The wrapper keeps the function's name, docstring and signature, so ADK builds
+    the same declaration for the model. A timeout returns an error result to the
+    model instead of failing the run; the worker thread itself cannot be killed
+    and finishes in the background.
+    """
+    if not is_sync_callable(func):
+        return func
+
+    timeout = config.tool_timeout if timeout is None else timeout
+    max_concurrency = config.tool_max_concurrency if max_concurrency is None else max_concurrency
+    # asyncio semaphores belong to one event loop; keep one per loop
+    semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+    name = getattr(func, "__name__", type(func).__name__)
+
+    @functools.wraps(func)
+    async def wrapper(**kwargs):
+        semaphore = contextlib.nullcontext()
+        if max_concurrency:
+            semaphore = semaphores.setdefault(asyncio.get_running_loop(), asyncio.Semaphore(max_concurrency))
+
+        # The timeout covers the call itself, not the wait for a free slot
+        # (which the run deadline already bounds)
+        async with semaphore:
+            limit = timeout or None
+            remaining = remaining_time()
+            if remaining is not None:
+                limit = remaining if limit is None else min(limit, remaining)
+            try:
+                async with asyncio.timeout(limit):
+                    return await (executor or tool_executor).run(func, kwargs, process)
+            except TimeoutError:
+                logger.warning(f"⏱️ Tool {name} timed out after {limit:.1f}s")
+                return {"error": f"Tool {name} timed out after {limit:.1f}s"}
+
+    return wrapper
+
+
+def make_function_tool(func: Callable, timeout: Optional[float] = None, max_concurrency: Optional[int] = None,
+                       process: bool = False, **kwargs) -> FunctionTool:
+    """FunctionTool whose sync function runs off the event loop"""
+    return FunctionTool(offload(func, timeout, max_concurrency, process), **kwargs)
+
+
+def offload_tools(agent, recursive: bool = True):
+    """Move the sync function tools of an agent tree onto the tool pool.
+
+    FunctionTools keep their identity and settings (name, confirmation); only
+    their `func` is swapped for the offloaded wrapper, so applying this twice
+    or to tools shared between trees is harmless.
+    """
+    tools = getattr(agent, "tools", None)
+    if tools:
+        offloaded = []
+        for tool in tools:
+            # Subclasses may override run_async, so only plain FunctionTools are rewrapped
+            if type(tool) is FunctionTool and is_sync_callable(tool.func):
+                tool.func = offload(tool.func)
+            elif inspect.isfunction(tool) and is_sync_callable(tool):
+                tool = offload(tool)
+            offloaded.append(tool)
+        agent.tools = offloaded
+
+    if recursive:
+        # Agents that rebuild their sub-tree (GraphAgent) re-apply this after a reload
+        remember = getattr(agent, "remember_setup", None)
+        if remember is not None:
+            remember(offload_tools)
+        for sub_agent in agent.sub_agents or []:
+            offload_tools(sub_agent, recursive=True)
@@ -0,0 +1,197 @@
+"""
+Token accounting and budgets for model calls.
+Token counts reported with each model response are aggregated per run
+(invocation), session, user and agent. Optional soft and hard budgets per run,
+session and user are enforced before each model call: past the soft budget
+further calls are capped to a short answer, past the hard budget the run stops.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from callbacks import add_callbacks
+from config import config
+
+logger = logging.getLogger(__name__)
+
+BUDGET_SCOPES = ("run", "session", "user")
+SCOPES = (*BUDGET_SCOPES, "agent")
+BUDGET_EXCEEDED = "TOKEN_BUDGET_EXCEEDED"
+
+
+class TokenUsage:
+    """Token totals of one run, session, user or agent"""
+
+    __slots__ = ("prompt_tokens", "completion_tokens", "total_tokens", "calls", "cached_calls",
+                 "agents", "notices")
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+        self.calls = 0
+        self.cached_calls = 0
+        self.agents: Dict[str, "TokenUsage"] = {}
+        self.notices: Set[str] = set()
+
+    def add(self, prompt: int, completion: int, total: int):
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.total_tokens += total
+        self.calls += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        report = {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "calls": self.calls,
+            "cached_calls": self.cached_calls,
+        }
+        if self.agents:
+            report["agents"] = {name: usage.as_dict() for name, usage in self.agents.items()}
+        return report
+
+
+class UsageLedger:
+    """Token usage per run, session, user and agent.
+
+    Runs and sessions are kept for the most recent `max_entries` of each, so a
+    long-lived server doesn't grow without bound.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, Dict[str, int]]] = None, max_entries: int = 4096):
+        self.budgets = budgets or {}
+        self.max_entries = max_entries
+        self._entries: Dict[str, "OrderedDict[str, TokenUsage]"] = {scope: OrderedDict() for scope in SCOPES}
+
+    def _entry(self, scope: str, key: str) -> TokenUsage:
+        entries = self._entries[scope]
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = TokenUsage()
+            if scope in ("run", "session") and len(entries) > self.max_entries:
+                entries.popitem(last=False)
+        else:
+            entries.move_to_end(key)
+        return entry
+
+    def _keys(self, callback_context) -> Dict[str, str]:
+        return {
+            "run": callback_context.invocation_id,
+            "session": callback_context.session.id,
+            "user": callback_context.user_id,
+            "agent": callback_context.agent_name,
+        }
+
+    def record(self, callback_context, usage_metadata, cached: bool = False):
+        keys = self._keys(callback_context)
+        prompt = completion = total = 0
+        if usage_metadata is not None:
+            prompt = usage_metadata.prompt_token_count or 0
+            completion = usage_metadata.candidates_token_count or 0
+            total = usage_metadata.total_token_count or prompt + completion
+
+        for scope, key in keys.items():
+            entry = self._entry(scope, key)
+            targets = [entry]
+            if scope != "agent":
+                targets.append(entry.agents.setdefault(keys["agent"], TokenUsage()))
+            for target in targets:
+                if cached:
+                    # Served from the semantic cache or shared with a coalesced call
+                    target.cached_calls += 1
+                else:
+                    target.add(prompt, completion, total)
+
+    def usage(self, scope: str, key: str) -> Optional[Dict[str, Any]]:
+        """Totals (with a per-agent breakdown) for one run, session, user or agent"""
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown usage scope '{scope}', expected one of {', '.join(SCOPES)}")
+        entry = self._entries[scope].get(key)
+        return None if entry is None else entry.as_dict()
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals per agent and per user, plus the configured budgets"""
+        return {
+            "agents": {name: entry.as_dict() for name, entry in self._entries["agent"].items()},
+            "users": {name: entry.as_dict() for name, entry in self._entries["user"].items()},
+            "budgets": {scope: dict(limits) for scope, limits in self.budgets.items()},
+        }
+
+    def check(self, callback_context) -> Optional[Tuple[str, str, int]]:
+        """The first (scope, limit, tokens used) whose budget is used up, hard limits first"""
+        keys = self._keys(callback_context)
+        for limit in ("hard", "soft"):
+            for scope in BUDGET_SCOPES:
+                budget = self.budgets.get(scope, {}).get(limit)
+                entry = self._entries[scope].get(keys[scope])
+                if budget and entry is not None and entry.total_tokens >= budget:
+                    return scope, limit, entry.total_tokens
+        return None
+
+    def first_notice(self, invocation_id: str, notice: str) -> bool:
+        """True the first time a run reports `notice`, so each run logs it once"""
+        run = self._entry("run", invocation_id)
+        if notice in run.notices:
+            return False
+        run.notices.add(notice)
+        return True
+
+
+usage_ledger = UsageLedger(config.token_budgets)
+
+
+def enforce_token_budget(callback_context, llm_request):
+    """before_model_callback: stop the run past a hard budget, shorten answers past a soft one"""
+    exceeded = usage_ledger.check(callback_context)
+    if exceeded is None:
+        return None
+
+    scope, limit, used = exceeded
+    if limit == "hard":
+        message = f"Token budget exceeded for {scope}: {used} of {config.token_budgets[scope]['hard']} tokens used"
+        if usage_ledger.first_notice(callback_context.invocation_id, "hard"):
+            logger.warning(f"🛑 {message}; stopping at {callback_context.agent_name}")
+        # Every later model call of the run is answered here without reaching the
+        # model; escalating also ends an enclosing loop
+        callback_context.actions.escalate = True
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=message)]),
+            error_code=BUDGET_EXCEEDED,
+            error_message=message,
+        )
+
+    cap = config.token_budget_downgrade_max_tokens
+    current = llm_request.config.max_output_tokens
+    llm_request.config.max_output_tokens = min(current, cap) if current else cap
+    if usage_ledger.first_notice(callback_context.invocation_id, "soft"):
+        logger.warning(f"⚠️ Soft token budget reached for {scope} ({used} tokens); capping answers at {cap} tokens")
+    return None
+
+
+def record_token_usage(callback_context, llm_response):
+    """after_model_callback: add the response's token counts to the ledger"""
+    # Streaming calls report partial responses; the final one carries the usage
+    if llm_response.partial:
+        return None
+    # Replayed answers (semantic cache hits, coalesced joiners) generated no tokens of their own
+    metadata = llm_response.custom_metadata or {}
+    cached = bool(metadata.get("semantic_cache_hit") or metadata.get("coalesced"))
+    if llm_response.usage_metadata is not None or cached:
+        usage_ledger.record(callback_context, llm_response.usage_metadata, cached=cached)
+    return None
+
+
+def track_usage(root_agent):
+    """Account token usage and enforce budgets for every model call in an agent tree"""
+    add_callbacks(
+        root_agent,
+        before_model_callback=enforce_token_budget,
+        after_model_callback=record_token_usage,
+    )
+    return root_agent
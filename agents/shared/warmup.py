@@ -0,0 +1,195 @@
+"""
+Startup warm-up for Docker Model Runner.
+Preloads the model and primes the llama.cpp prompt cache with each agent's
+system prefix so the first user request does not pay the cold-start cost.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from config import config, ModelRunnerConfig, probe_endpoint
+
+logger = logging.getLogger(__name__)
+
+AGENTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class WarmupState:
+    """Tracks warm-up progress for readiness reporting"""
+
+    def __init__(self):
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.prompts_warmed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+
+    def mark_ready(self):
+        self.status = "ready"
+        self.finished_at = time.time()
+
+    def mark_failed(self, error: str):
+        self.status = "failed"
+        self.error = error
+        self.finished_at = time.time()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "error": self.error,
+            "prompts_warmed": self.prompts_warmed,
+            "duration": (self.finished_at - self.started_at)
+            if self.started_at and self.finished_at else None,
+        }
+
+
+# Global warm-up state shared with the readiness endpoint
+warmup_state = WarmupState()
+
+
+def discover_agent_names(agents_dir: str = AGENTS_DIR) -> List[str]:
+    """List agent packages in the agents directory (same layout `adk web` uses)"""
+    return sorted(
+        name for name in os.listdir(agents_dir)
+        if os.path.isfile(os.path.join(agents_dir, name, "agent.py"))
+    )
+
+
+def load_root_agents(names: List[str], agents_dir: str = AGENTS_DIR) -> Dict[str, Any]:
+    """Import agent modules and return their root agents by package name"""
+    if agents_dir not in sys.path:
+        sys.path.insert(0, agents_dir)
+
+    root_agents = {}
+    for name in names:
+        try:
+            module = importlib.import_module(f"{name}.agent")
+            root_agents[name] = module.root_agent
+        except Exception as e:
+            logger.warning(f"⚠️ Skipping warm-up for {name}: {e}")
+    return root_agents
+
+
+def collect_system_prompts(agent, model_name: str) -> Dict[str, str]:
+    """Collect static instructions of every LLM agent served by the local model"""
+    prompts = {}
+    model = getattr(agent, "model", None)
+    # Hybrid models run on the local model by default
+    model = getattr(model, "local", model)
+    instruction = getattr(agent, "instruction", None)
+    # Compiled templates: the static prefix is what every call shares
+    instruction = getattr(instruction, "static_text", instruction)
+    if getattr(model, "model", None) == model_name and isinstance(instruction, str) and instruction:
+        prompts[agent.name] = instruction
+
+    for sub_agent in getattr(agent, "sub_agents", None) or []:
+        prompts.update(collect_system_prompts(sub_agent, model_name))
+    return prompts
+
+
+async def warm_prompt(session: aiohttp.ClientSession, cfg: ModelRunnerConfig, system_prompt: str):
+    """Issue a one-token completion so the server loads the model and caches the prefix"""
+    body = {
+        "model": cfg.served_model_name,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": "ping"},
+        ],
+        "max_tokens": 1,
+        "temperature": 0,
+        "cache_prompt": True,
+    }
+    headers = {"Authorization": f"Bearer {cfg.api_key}"}
+    async with session.post(
+        f"{cfg.api_base.rstrip('/')}/chat/completions", json=body, headers=headers
+    ) as response:
+        response.raise_for_status()
+        await response.read()
+
+
+async def _warm_once(cfg: ModelRunnerConfig, prompts: List[str], state: WarmupState, timeout: float):
+    """One warm-up attempt; prompts already warmed by earlier attempts are skipped"""
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        probe = await probe_endpoint(session, cfg.api_base, cfg.served_model_name)
+        if not probe.reachable:
+            raise RuntimeError(f"Model Runner not reachable at {cfg.api_base}: {probe.error}")
+        if not probe.serves_model:
+            raise RuntimeError(
+                f"Model {cfg.served_model_name} not found; run `docker model pull {cfg.served_model_name}`"
+            )
+
+        for system_prompt in prompts[state.prompts_warmed:]:
+            await warm_prompt(session, cfg, system_prompt)
+            state.prompts_warmed += 1
+
+
+async def run_warmup(root_agents: Dict[str, Any], cfg: ModelRunnerConfig = config,
+                     state: WarmupState = warmup_state, initial_backoff: float = 1.0,
+                     max_backoff: float = 30.0):
+    """Verify the model exists and prime each agent's system prefix, then mark ready.
+
+    Failed attempts (Model Runner still starting, model still being pulled) are
+    retried with exponential backoff; warm-up only fails once MODEL_WARMUP_TIMEOUT
+    has passed, and readiness stays "warming" until then.
+    """
+    state.status = "warming"
+    state.started_at = time.time()
+    deadline = time.monotonic() + cfg.warmup_timeout
+
+    prompts = {}
+    for root_agent in root_agents.values():
+        prompts.update(collect_system_prompts(root_agent, cfg.model_name))
+    # Agents sharing an identical prefix only need one warm-up call
+    unique_prompts = list(dict.fromkeys(prompts.values()))
+
+    logger.info(f"🔥 Warming up {cfg.served_model_name} at {cfg.api_base}")
+    backoff = initial_backoff
+    attempt = 1
+    while True:
+        try:
+            await _warm_once(cfg, unique_prompts, state, max(deadline - time.monotonic(), 0.001))
+            break
+        except Exception as e:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                state.mark_failed(str(e) or type(e).__name__)
+                logger.error(f"❌ Warm-up failed after {attempt} attempts: {state.error}")
+                return
+            delay = min(backoff, remaining)
+            logger.warning(f"⚠️ Warm-up attempt {attempt} failed ({e or type(e).__name__}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, max_backoff)
+            attempt += 1
+
+    state.mark_ready()
+    logger.info(
+        f"✅ Warm-up complete: {state.prompts_warmed} prompt prefixes "
+        f"in {state.finished_at - state.started_at:.1f}s"
+    )
+
+
+def start_warmup_thread(cfg: ModelRunnerConfig = config, state: WarmupState = warmup_state):
+    """Run warm-up on a background thread so the web server can start serving probes"""
+    if not cfg.warmup_enabled:
+        state.mark_ready()
+        return None
+
+    def _run():
+        names = cfg.warmup_agents or discover_agent_names()
+        asyncio.run(run_warmup(load_root_agents(names), cfg, state))
+
+    thread = threading.Thread(target=_run, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,18 @@
+"""
+Shared setup for the unit tests.
+The shared modules read their configuration at import, so the environment is
+pinned here first: no warm-up, no background endpoint monitor, and a Model
+Runner URL nothing listens on (these tests never reach a model).
+"""
+
+import os
+import sys
+
+os.environ.update({
+    "DOCKER_MODEL_RUNNER": "http://127.0.0.1:9/engines/llama.cpp/v1",
+    "MODEL_WARMUP": "false",
+    "ENDPOINT_MONITOR": "false",
+    "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+})
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "agents", "shared"))
@@ -0,0 +1,137 @@
+"""Stage scheduling and checkpoint/resume of the batch runner"""
+
+import asyncio
+import json
+
+import pytest
+
+import batch
+from batch import StageScheduler, completed_ids, read_queries, run_batch, trim_partial_line
+from model_client import model_gate
+
+
+async def call(scheduler, agent, log, duration=0.01):
+    async with scheduler.slot(agent):
+        log.append(agent)
+        await asyncio.sleep(duration)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_calls_in_flight():
+    scheduler, peak = StageScheduler(slots=2), 0
+
+    async def tracked():
+        nonlocal peak
+        async with scheduler.slot("Writer"):
+            peak = max(peak, scheduler.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(tracked() for _ in range(6)))
+    assert peak == 2
+    assert scheduler.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_groups_calls_by_stage():
+    scheduler, log = StageScheduler(slots=2), []
+    agents = ["Writer", "Reviewer", "Writer", "Reviewer", "Writer", "Reviewer", "Writer"]
+    await asyncio.gather(*(call(scheduler, agent, log) for agent in agents))
+    # One stage at a time, without interleaving
+    assert log == ["Writer"] * 4 + ["Reviewer"] * 3
+    assert scheduler.switches == 2  # none -> Writer -> Reviewer
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    scheduler, log = StageScheduler(slots=1), []
+    holder = asyncio.create_task(call(scheduler, "Writer", log, duration=0.05))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(call(scheduler, "Writer", log))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(holder, waiter, return_exceptions=True)
+    await call(scheduler, "Reviewer", log)
+    assert log == ["Writer", "Reviewer"]
+    assert scheduler.in_flight == 0
+
+
+def test_read_queries_accepts_objects_and_strings(tmp_path):
+    path = tmp_path / "queries.jsonl"
+    path.write_text('{"id": "docker", "query": "Docker market"}\n\n"SaaS market"\n')
+    assert read_queries(str(path)) == [{"id": "docker", "query": "Docker market"}, {"query": "SaaS market", "id": "3"}]
+
+
+def test_completed_ids_skips_failures_and_partial_lines(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text(
+        json.dumps({"id": "a", "results": []}) + "\n"
+        + json.dumps({"id": 2, "results": []}) + "\n"
+        + json.dumps({"id": "b", "error": "boom"}) + "\n"
+        + '{"id": "c", "resu'
+    )
+    assert completed_ids(str(path)) == {"a", "2"}
+    assert completed_ids(str(tmp_path / "missing.jsonl")) == set()
+
+
+@pytest.mark.asyncio
+async def test_run_batch_checkpoints_and_resumes(tmp_path, monkeypatch):
+    output = tmp_path / "out.jsonl"
+    queries = [{"id": str(index), "query": f"query {index}"} for index in range(4)]
+    failing = {"2"}
+    gates = []
+
+    async def fake_run_query(root_agent, app_name, query):
+        gates.append(model_gate.get())
+        if query.split()[-1] in failing:
+            raise RuntimeError("model unavailable")
+        return [{"agent": "Writer", "text": query.upper()}]
+
+    monkeypatch.setattr(batch, "run_query", fake_run_query)
+    counts = await run_batch(None, "app", queries, str(output), concurrency=2, slots=2)
+    assert (counts["succeeded"], counts["failed"]) == (3, 1)
+    assert all(isinstance(gate, StageScheduler) for gate in gates)
+    assert model_gate.get() is None
+
+    # Resume: only the failed query is left, and its retry is appended
+    failing.clear()
+    done = completed_ids(str(output))
+    remaining = [item for item in queries if item["id"] not in done]
+    assert [item["id"] for item in remaining] == ["2"]
+    await run_batch(None, "app", remaining, str(output), slots=0)
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(records) == 5
+    assert completed_ids(str(output)) == {"0", "1", "2", "3"}
+
+
+def test_trim_partial_line(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text('{"id": "a"}\n{"id": "b", "resu')
+    trim_partial_line(str(path))
+    assert path.read_text() == '{"id": "a"}\n'
+    trim_partial_line(str(path))  # complete files are left alone
+    assert path.read_text() == '{"id": "a"}\n'
+
+    path.write_text('{"id": "only", "res')
+    trim_partial_line(str(path))
+    assert path.read_text() == ""
+    trim_partial_line(str(tmp_path / "missing.jsonl"))
+
+
+@pytest.mark.asyncio
+async def test_resume_after_interrupted_write(tmp_path, monkeypatch):
+    output = tmp_path / "out.jsonl"
+    # Killed while writing query 1's record
+    output.write_text(json.dumps({"id": "0", "results": []}) + "\n" + '{"id": "1", "results": [{"ag')
+
+    async def fake_run_query(root_agent, app_name, query):
+        return [{"agent": "Writer", "text": query}]
+
+    monkeypatch.setattr(batch, "run_query", fake_run_query)
+    queries = [{"id": str(index), "query": f"query {index}"} for index in range(3)]
+    remaining = [item for item in queries if item["id"] not in completed_ids(str(output))]
+    assert [item["id"] for item in remaining] == ["1", "2"]
+
+    await run_batch(None, "app", remaining, str(output), slots=0)
+    assert completed_ids(str(output)) == {"0", "1", "2"}
+    assert all(json.loads(line) for line in output.read_text().splitlines())
@@ -0,0 +1,69 @@
+"""Statistics behind the benchmark regression check"""
+
+import pytest
+
+from bench import compare, mann_whitney_u
+
+BEFORE = [1.0, 1.1, 0.9, 1.05, 0.95, 1.02, 0.98, 1.01]
+
+
+def test_separated_samples():
+    before, after = [1, 2, 3, 4, 5], [6, 7, 8, 9, 10]
+    # Normal approximation with continuity correction (matches scipy's asymptotic method)
+    assert mann_whitney_u(before, after) == pytest.approx(0.01219, abs=1e-4)
+    assert mann_whitney_u(before, after, "greater") == pytest.approx(0.01219 / 2, abs=1e-4)
+    assert mann_whitney_u(before, after, "less") > 0.99
+    assert mann_whitney_u(after, before, "less") == pytest.approx(mann_whitney_u(before, after, "greater"))
+
+
+def test_identical_and_overlapping_samples():
+    assert mann_whitney_u([1, 1, 1], [1, 1, 1]) == 1.0
+    assert mann_whitney_u(BEFORE, list(BEFORE)) == 1.0
+    assert 0.05 < mann_whitney_u([1, 2, 2, 3], [2, 3, 3, 4]) < 0.5
+
+
+def rows_by_metric(rows):
+    return {row["metric"]: row for row in rows}
+
+
+def test_compare_flags_latency_regression():
+    slower = [value * 1.5 for value in BEFORE]
+    row = rows_by_metric(compare({("Writer", "latency_s"): BEFORE}, {("Writer", "latency_s"): slower}))["latency_s"]
+    assert row["verdict"] == "regressed"
+    assert row["change"] == pytest.approx(0.5, abs=0.01)
+    assert row["p_value"] < 0.05
+
+
+def test_compare_reports_improvement_and_noise():
+    faster = [value * 0.5 for value in BEFORE]
+    noisy = [value * 1.01 for value in BEFORE]
+    rows = compare(
+        {("Writer", "latency_s"): BEFORE, ("Reviewer", "latency_s"): BEFORE},
+        {("Writer", "latency_s"): faster, ("Reviewer", "latency_s"): noisy},
+    )
+    assert {row["agent"]: row["verdict"] for row in rows} == {"Writer": "improved", "Reviewer": "ok"}
+
+
+def test_small_significant_change_below_threshold_is_ok():
+    # Consistently 5% slower is significant, but within the 10% latency threshold
+    rows = compare({("Writer", "latency_s"): BEFORE}, {("Writer", "latency_s"): [v * 1.05 for v in BEFORE]})
+    assert rows[0]["verdict"] == "ok"
+
+
+def test_compare_two_sided_metrics():
+    shorter = [value * 0.5 for value in BEFORE]
+    rows = compare({("Writer", "output_chars"): BEFORE}, {("Writer", "output_chars"): shorter})
+    assert rows[0]["verdict"] == "changed"
+
+
+def test_compare_skips_small_or_unmatched_samples():
+    rows = compare(
+        {("Writer", "latency_s"): [1.0, 1.1], ("Writer", "prompt_tokens"): BEFORE},
+        {("Writer", "latency_s"): [5.0, 5.1], ("Reviewer", "prompt_tokens"): BEFORE},
+    )
+    assert rows == []
+
+
+def test_zero_baseline_median():
+    rows = compare({("Writer", "completion_tokens"): [0, 0, 0]}, {("Writer", "completion_tokens"): [5, 6, 7]})
+    assert rows[0]["change"] is None
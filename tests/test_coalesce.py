@@ -0,0 +1,147 @@
+"""Single-flight sharing of identical concurrent generations, and how it is billed"""
+
+import asyncio
+
+import pytest
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+import usage
+from coalesce import SingleFlight
+from model_client import ModelRunnerLlm, request_flights
+from usage import UsageLedger, record_token_usage
+
+
+def counting_factory(calls, items=("a", "b", "c"), delay=0.01, fail=False):
+    async def generate():
+        calls.append(1)
+        for item in items:
+            await asyncio.sleep(delay)
+            yield item
+        if fail:
+            raise RuntimeError("upstream failed")
+    return generate
+
+
+async def collect(flight, key, factory, **kwargs):
+    return [item async for item in flight.stream(key, factory, **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_run():
+    flight, calls = SingleFlight(), []
+    results = await asyncio.gather(*(collect(flight, "k", counting_factory(calls)) for _ in range(3)))
+    assert results == [["a", "b", "c"]] * 3
+    assert len(calls) == 1
+    assert (flight.started, flight.joined) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_late_joiner_gets_replay_then_stream():
+    flight, calls = SingleFlight(), []
+    first = asyncio.create_task(collect(flight, "k", counting_factory(calls, delay=0.02)))
+    await asyncio.sleep(0.03)  # the first item is out already
+    assert await collect(flight, "k", counting_factory(calls)) == ["a", "b", "c"]
+    assert await first == ["a", "b", "c"]
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_different_keys_and_later_calls_run_separately():
+    flight, calls = SingleFlight(), []
+    await asyncio.gather(collect(flight, "k1", counting_factory(calls)), collect(flight, "k2", counting_factory(calls)))
+    await collect(flight, "k1", counting_factory(calls))
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    flight, calls = SingleFlight(), []
+    results = await asyncio.gather(
+        *(collect(flight, "k", counting_factory(calls, fail=True)) for _ in range(2)), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_copy_isolates_callers():
+    flight = SingleFlight()
+
+    async def generate():
+        yield {"text": "shared"}
+
+    results = await asyncio.gather(*(collect(flight, "k", generate, copy=dict) for _ in range(2)))
+    results[0][0]["text"] = "changed"
+    assert results[1][0]["text"] == "shared"
+
+
+@pytest.mark.asyncio
+async def test_upstream_cancelled_when_last_caller_leaves():
+    flight, cancelled = SingleFlight(), asyncio.Event()
+
+    async def generate():
+        try:
+            yield "first"
+            await asyncio.sleep(10)
+            yield "never"
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    stream = flight.stream("k", generate)
+    assert await anext(stream) == "first"
+    await stream.aclose()
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+@pytest.mark.asyncio
+async def test_joiners_get_their_own_copy():
+    flight, calls = SingleFlight(), []
+    results = await asyncio.gather(*(
+        collect(flight, "k", counting_factory(calls), copy_joined=lambda item: f"{item}*") for _ in range(2)
+    ))
+    assert results == [["a", "b", "c"], ["a*", "b*", "c*"]]
+
+
+class FakeSession:
+    id = "session-1"
+
+
+class FakeCallbackContext:
+    invocation_id = "run-1"
+    session = FakeSession()
+    user_id = "user-1"
+    agent_name = "Writer"
+
+
+@pytest.mark.asyncio
+async def test_coalesced_calls_are_billed_once(monkeypatch):
+    async def fake_generate(self, llm_request, stream=False):
+        await asyncio.sleep(0.01)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="hi")]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=10, candidates_token_count=5, total_token_count=15,
+            ),
+        )
+
+    monkeypatch.setattr(LiteLlm, "generate_content_async", fake_generate)
+    monkeypatch.setattr(usage, "usage_ledger", UsageLedger())
+    llm = ModelRunnerLlm(model="openai/test", api_base="http://127.0.0.1:9/v1")
+    request = LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text="hello")])])
+
+    async def call():
+        return [response async for response in llm._generate_upstream(request.model_copy(deep=True), False, "Writer")]
+
+    started = request_flights.started
+    results = await asyncio.gather(call(), call(), call())
+    assert request_flights.started == started + 1
+    assert [bool((r[0].custom_metadata or {}).get("coalesced")) for r in results] == [False, True, True]
+
+    for [response] in results:
+        record_token_usage(FakeCallbackContext(), response)
+    run = usage.usage_ledger.usage("run", "run-1")
+    assert (run["total_tokens"], run["calls"], run["cached_calls"]) == (15, 1, 2)
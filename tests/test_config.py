@@ -0,0 +1,88 @@
+"""Endpoint probing, detection inside a running loop and health-monitor failover"""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import config as config_module
+from config import ModelRunnerConfig, probe_endpoints
+from endpoint_health import EndpointMonitor
+
+MODEL = "ai/llama3.2:1B-Q8_0"
+DEAD = "http://127.0.0.1:9/engines/llama.cpp/v1"
+
+
+async def start_runner(models):
+    """A Model Runner stand-in whose `/models` lists `models`"""
+    async def list_models(request):
+        return web.json_response({"data": [{"id": model} for model in models]})
+
+    app = web.Application()
+    app.router.add_get("/engines/llama.cpp/v1/models", list_models)
+    server = TestServer(app)
+    await server.start_server()
+    return server, str(server.make_url("/engines/llama.cpp/v1"))
+
+
+@pytest.mark.asyncio
+async def test_probe_tells_serving_from_answering_and_unreachable():
+    serving, serving_url = await start_runner([MODEL])
+    other, other_url = await start_runner(["ai/other"])
+    try:
+        probes = await probe_endpoints([serving_url, other_url, DEAD], MODEL, "anything", timeout=2)
+    finally:
+        await serving.close()
+        await other.close()
+
+    assert [probe.endpoint for probe in probes] == [serving_url, other_url, DEAD]
+    assert probes[0].serves_model is True and probes[0].latency is not None
+    assert probes[1].serves_model is False and probes[1].reachable
+    assert not probes[2].reachable and probes[2].error
+
+
+@pytest.mark.asyncio
+async def test_config_built_in_a_running_loop_detects_in_the_background(monkeypatch):
+    server, url = await start_runner([MODEL])
+    monkeypatch.setattr(config_module, "CONTAINER_ENDPOINTS", [DEAD, url])
+    try:
+        cfg = ModelRunnerConfig(env={"CONTAINER": "docker", "ENDPOINT_PROBE_TIMEOUT": "1"})
+        # Returned without waiting on a probe: still on the provisional endpoint
+        assert cfg.api_base == DEAD
+        assert not cfg._detection.done()
+
+        await cfg._detection
+        assert cfg.api_base == url
+    finally:
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_create_probes_before_returning(monkeypatch):
+    server, url = await start_runner([MODEL])
+    monkeypatch.setattr(config_module, "CONTAINER_ENDPOINTS", [DEAD, url])
+    try:
+        cfg = await ModelRunnerConfig.create(env={"CONTAINER": "docker", "ENDPOINT_PROBE_TIMEOUT": "1"})
+    finally:
+        await server.close()
+
+    assert cfg.api_base == url
+    assert cfg._detection is None
+
+
+@pytest.mark.asyncio
+async def test_monitor_switches_to_an_endpoint_serving_the_model():
+    server, url = await start_runner([MODEL])
+    cfg = ModelRunnerConfig(env={
+        "DOCKER_MODEL_RUNNER": DEAD, "MODEL_RUNNER_FALLBACK_ENDPOINTS": url, "ENDPOINT_FAILURE_THRESHOLD": "1",
+    })
+    monitor = EndpointMonitor(cfg)
+    try:
+        # The monitor probes from its own thread, with its own event loop
+        switched = await asyncio.to_thread(monitor.check)
+    finally:
+        await server.close()
+
+    assert switched and cfg.api_base == url
+    assert monitor.switches == 1 and monitor.latency is not None
@@ -0,0 +1,74 @@
+"""Output checks of the evaluation harness and the deadline of measured runs"""
+
+import asyncio
+from types import SimpleNamespace
+from typing import AsyncGenerator
+
+import pytest
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events.event import Event
+from google.genai import types
+
+import config as config_module
+from deadline import DeadlineExceeded, check_deadline
+from evaluation import FINAL_RESPONSE, _run_prompt, html_validity, non_empty, score_outputs, section_presence
+
+PAGE = "<!DOCTYPE html>\n<html><head><title>t</title></head><body><p>Hi<br><ul><li>a<li>b</ul></body></html>"
+
+
+def test_non_empty():
+    assert non_empty(" text ") == 1.0
+    assert non_empty(" \n ") == 0.0
+
+
+def test_html_validity_scores_each_check():
+    assert html_validity(PAGE) == 1.0
+    # Fenced and explained: the markup is whole, but the answer isn't code only
+    assert html_validity(f"Here you go:\n```html\n{PAGE}\n```") == 0.75
+    # A fragment with an unclosed element
+    assert html_validity("<div><span>text</div>") == 0.5
+    assert html_validity("no markup at all") == 0.0
+
+
+def test_section_presence_matches_headings_loosely():
+    check = section_presence("Market Size", "Risks & Opportunities", "Outlook")
+    assert check("## MARKET SIZE\n...\n### Risks and opportunities\n...\n## Outlook") == 1.0
+    assert check("## Market-size\nOnly one section") == pytest.approx(1 / 3)
+    # Whole words only
+    assert check("Outlooks everywhere") == 0.0
+
+
+def test_score_outputs_keys_scores_and_missing_outputs():
+    checks = {FINAL_RESPONSE: [non_empty], "code": [non_empty, html_validity]}
+    scores = score_outputs({FINAL_RESPONSE: "done"}, checks)
+    assert scores == {f"{FINAL_RESPONSE}:non_empty": 1.0, "code:non_empty": 0.0, "code:html_validity": 0.0}
+
+
+class SlowAgent(BaseAgent):
+    """Answers after `delay` seconds if the run still has time"""
+
+    delay: float = 0.0
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        await asyncio.sleep(self.delay)
+        check_deadline()
+        yield Event(
+            invocation_id=ctx.invocation_id, author=self.name,
+            content=types.Content(role="model", parts=[types.Part(text="answer")]),
+        )
+
+
+@pytest.mark.asyncio
+async def test_measured_runs_keep_the_run_deadline(monkeypatch):
+    fast = SimpleNamespace(root_agent=SlowAgent(name="Fast"))
+    # The first run of a process pays for ADK's lazy setup, as in the harness
+    await _run_prompt(fast, "eval_test", "hello")
+
+    monkeypatch.setattr(config_module, "config", config_module.config.replace(run_deadline=0.5))
+    result = await _run_prompt(fast, "eval_test", "hello")
+    assert result["outputs"][FINAL_RESPONSE] == "answer"
+
+    slow = SimpleNamespace(root_agent=SlowAgent(name="Slow", delay=1.0))
+    with pytest.raises(DeadlineExceeded):
+        await _run_prompt(slow, "eval_test", "hello")
@@ -0,0 +1,125 @@
+"""QuorumFanoutAgent quorum timing, late addenda and partial-input flags"""
+
+import asyncio
+from typing import AsyncGenerator, List
+
+import pytest
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events.event import Event
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from fanout import QuorumFanoutAgent, is_partial
+from model_client import skip_cache_store
+
+
+class Analyst(BaseAgent):
+    """Answers after `delay` seconds, or fails"""
+
+    delay: float = 0.0
+    fail: bool = False
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        yield Event(
+            invocation_id=ctx.invocation_id, author=self.name, branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=f"{self.name} findings")]),
+        )
+
+
+class Synthesizer(BaseAgent):
+    """Reports which analyses it could see, and whether its answer may be cached"""
+
+    seen: List[str] = []
+    cache_store_skipped: List[bool] = []
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        self.cache_store_skipped.append(skip_cache_store.get())
+        seen = sorted(
+            event.author for event in ctx.session.events
+            if event.author not in (self.name, "user") and event.content
+        )
+        self.seen.append(",".join(seen))
+        yield Event(
+            invocation_id=ctx.invocation_id, author=self.name, branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text="report")]),
+        )
+
+
+async def run(fanout: QuorumFanoutAgent) -> List[Event]:
+    session_service = InMemorySessionService()
+    session = await session_service.create_session(app_name="test", user_id="u")
+    runner = Runner(agent=fanout, app_name="test", session_service=session_service)
+    message = types.Content(role="user", parts=[types.Part(text="research")])
+    return [event async for event in runner.run_async(user_id="u", session_id=session.id, new_message=message)]
+
+
+def fanout(delays, quorum=0, branch_timeout=None, late_timeout=None, fail=()):
+    analysts = [Analyst(name=name, delay=delay, fail=name in fail) for name, delay in delays.items()]
+    return QuorumFanoutAgent(
+        name="Fanout", sub_agents=[*analysts, Synthesizer(name="Synth", seen=[], cache_store_skipped=[])],
+        quorum=quorum, branch_timeout=branch_timeout, late_timeout=late_timeout,
+    )
+
+
+def authors(events):
+    return [event.author for event in events]
+
+
+@pytest.mark.asyncio
+async def test_waits_for_every_branch_by_default():
+    agent = fanout({"A": 0.0, "B": 0.05})
+    events = await run(agent)
+    assert authors(events) == ["A", "B", "Synth"]
+    synthesizer = agent.sub_agents[-1]
+    assert synthesizer.seen == ["A,B"]
+    assert synthesizer.cache_store_skipped == [False]
+    assert not any(is_partial(event) for event in events)
+
+
+@pytest.mark.asyncio
+async def test_branches_run_on_isolated_branches():
+    events = await run(fanout({"A": 0.0, "B": 0.0}))
+    assert {event.author: event.branch for event in events if event.author != "Synth"} == {
+        "A": "Fanout.A", "B": "Fanout.B",
+    }
+
+
+@pytest.mark.asyncio
+async def test_quorum_starts_synthesis_and_late_answer_becomes_addendum():
+    agent = fanout({"A": 0.0, "B": 0.0, "C": 0.3}, quorum=2, branch_timeout=0.05)
+    events = await run(agent)
+    assert authors(events) == ["A", "B", "Synth", "C", "Fanout"]
+    synthesizer = agent.sub_agents[-1]
+    assert synthesizer.seen == ["A,B"]
+    # The partial report is neither stored in response caches nor reused as a whole run
+    assert synthesizer.cache_store_skipped == [True]
+    assert [event.author for event in events if is_partial(event)] == ["Synth", "Fanout"]
+    assert events[-1].content.parts[0].text.startswith("## Addendum: C")
+
+
+@pytest.mark.asyncio
+async def test_quorum_waits_for_branch_timeout():
+    # Both answer before the timeout, so the synthesizer sees both
+    agent = fanout({"A": 0.0, "B": 0.02}, quorum=1, branch_timeout=0.2)
+    assert authors(await run(agent)) == ["A", "B", "Synth"]
+    assert agent.sub_agents[-1].seen == ["A,B"]
+
+
+@pytest.mark.asyncio
+async def test_late_timeout_drops_stragglers():
+    agent = fanout({"A": 0.0, "B": 5.0}, quorum=1, branch_timeout=0.0, late_timeout=0.05)
+    events = await asyncio.wait_for(run(agent), 2)
+    assert authors(events) == ["A", "Synth"]
+
+
+@pytest.mark.asyncio
+async def test_failed_branch_does_not_stop_synthesis():
+    agent = fanout({"A": 0.0, "B": 0.0}, fail={"B"})
+    events = await run(agent)
+    assert authors(events) == ["A", "Synth"]
+    assert is_partial(events[-1])
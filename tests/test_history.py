@@ -0,0 +1,124 @@
+"""HistoryPolicy turn handling and the compaction callback"""
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from history import SUMMARY_STATE_KEY, HistoryPolicy, make_history_callback
+
+
+class FakeCallbackContext:
+    agent_name = "Writer"
+
+    def __init__(self):
+        self.state = {}
+
+
+def user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def model(text):
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+def relayed(author, text):
+    return user(f"For context: [{author}] said: {text}")
+
+
+def texts(contents):
+    return [content.parts[0].text for content in contents]
+
+
+def conversation(turns):
+    contents = []
+    for index in range(turns):
+        contents += [user(f"q{index}"), model(f"a{index}")]
+    return contents
+
+
+def test_split_turns_starts_on_real_user_messages():
+    contents = [user("q0"), relayed("Reviewer", "fix it"), model("a0"), user("q1"), model("a1")]
+    assert [texts(turn) for turn in HistoryPolicy().split_turns(contents)] == [
+        ["q0", "For context: [Reviewer] said: fix it", "a0"], ["q1", "a1"],
+    ]
+
+
+def test_condense_turn():
+    policy = HistoryPolicy()
+    turn = [user("q"), relayed("Reviewer", "v1"), model("draft 1"), relayed("Reviewer", "v2"), model("draft 2")]
+    assert texts(policy.condense_turn(turn, is_current=False)) == ["q", "draft 2"]
+    assert texts(policy.condense_turn(turn, is_current=True)) == [
+        "q", "For context: [Reviewer] said: v2", "draft 2",
+    ]
+
+
+def test_summarize_turn_shortens():
+    policy = HistoryPolicy(summary_chars_per_turn=10)
+    assert policy.summarize_turn([user("a very long question"), model("ok")]) == "- a very ... -> ok"
+
+
+def test_short_history_is_untouched():
+    callback, context = make_history_callback(HistoryPolicy(max_turns=2)), FakeCallbackContext()
+    request = LlmRequest(contents=conversation(3))
+    callback(context, request)
+    assert texts(request.contents) == ["q0", "a0", "q1", "a1", "q2", "a2"]
+    assert context.state == {}
+
+
+def test_old_turns_fold_into_summary_with_watermark():
+    callback, context = make_history_callback(HistoryPolicy(max_turns=2)), FakeCallbackContext()
+    state_key = f"{SUMMARY_STATE_KEY}:Writer"
+    for turns in range(1, 7):
+        request = LlmRequest(contents=conversation(turns))
+        callback(context, request)
+
+    assert context.state[state_key] == {"text": "- q0 -> a0\n- q1 -> a1\n- q2 -> a2", "watermark": 6}
+    assert texts(request.contents) == [
+        "Summary of the earlier conversation:\n- q0 -> a0\n- q1 -> a1\n- q2 -> a2",
+        "q3", "a3", "q4", "a4", "q5", "a5",
+    ]
+
+
+def test_only_messages_after_watermark_are_read():
+    callback, context = make_history_callback(HistoryPolicy(max_turns=1)), FakeCallbackContext()
+    context.state[f"{SUMMARY_STATE_KEY}:Writer"] = {"text": "- earlier", "watermark": 4}
+    # Messages before the watermark are already summarized; their content is never looked at
+    contents = [user("ignored"), model("ignored"), user("ignored"), model("ignored")] + conversation(2)
+    request = LlmRequest(contents=contents)
+    callback(context, request)
+    assert texts(request.contents) == ["Summary of the earlier conversation:\n- earlier", "q0", "a0", "q1", "a1"]
+
+
+def test_rewritten_history_restarts_summary():
+    callback, context = make_history_callback(HistoryPolicy(max_turns=1)), FakeCallbackContext()
+    context.state[f"{SUMMARY_STATE_KEY}:Writer"] = {"text": "- stale", "watermark": 40}
+    request = LlmRequest(contents=conversation(3))
+    callback(context, request)
+    assert texts(request.contents)[0] == "Summary of the earlier conversation:\n- q0 -> a0"
+
+
+def test_summary_is_capped():
+    policy = HistoryPolicy(max_turns=1, max_summary_chars=30)
+    callback, context = make_history_callback(policy), FakeCallbackContext()
+    for turns in range(1, 10):
+        callback(context, LlmRequest(contents=conversation(turns)))
+    summary = context.state[f"{SUMMARY_STATE_KEY}:Writer"]["text"]
+    assert len(summary) <= 30
+    # Whole lines only, newest last
+    assert summary.splitlines() == ["- q5 -> a5", "- q6 -> a6"]
+
+
+def test_cap_summary_cuts_at_line_boundaries():
+    policy = HistoryPolicy(max_summary_chars=12)
+    assert policy.cap_summary("- one\n- two") == "- one\n- two"
+    assert policy.cap_summary("- first\n- second\n- third") == "- third"
+    # Cut exactly at a line start: nothing more to drop
+    assert policy.cap_summary("- first line\n- 2nd\n- 3rd") == "- 2nd\n- 3rd"
+    assert policy.cap_summary("- a single very long line") == "ry long line"
+
+
+def test_zero_turns_keeps_full_history():
+    callback = make_history_callback(HistoryPolicy(max_turns=0))
+    request = LlmRequest(contents=conversation(10))
+    callback(FakeCallbackContext(), request)
+    assert len(request.contents) == 20
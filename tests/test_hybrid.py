@@ -0,0 +1,116 @@
+"""Routing of HybridLlm between the local model and the remote provider"""
+
+from typing import AsyncGenerator
+
+import pytest
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+import hybrid
+from hybrid import HybridLlm, routing_stats
+from model_client import local_load
+
+
+class FakeLlm(BaseLlm):
+    """Answers with its own name, or fails before answering"""
+
+    fail: bool = False
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.fail:
+            raise ConnectionError(f"{self.model} is down")
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.model)]))
+
+
+def make_request(agent: str = "Writer") -> LlmRequest:
+    return LlmRequest(
+        contents=[types.Content(role="user", parts=[types.Part(text="hello")])],
+        config=types.GenerateContentConfig(labels={"adk_agent_name": agent}),
+    )
+
+
+async def answer(llm: HybridLlm, agent: str = "Writer") -> str:
+    texts = [response.content.parts[0].text async for response in llm.generate_content_async(make_request(agent))]
+    return "".join(texts)
+
+
+@pytest.fixture
+def llm():
+    return HybridLlm(local=FakeLlm(model="local"), remote=FakeLlm(model="remote"))
+
+
+@pytest.fixture(autouse=True)
+def idle_runner(monkeypatch):
+    monkeypatch.setattr(local_load, "in_flight", 0)
+    monkeypatch.setattr(local_load, "latency", None)
+    monkeypatch.setattr(routing_stats, "remote_in_flight", 0)
+    monkeypatch.setattr(hybrid, "config", hybrid.config.replace(
+        hybrid_max_local_queue=4, hybrid_max_local_latency=0.0, hybrid_max_remote_concurrency=8,
+        hybrid_agent_policies={},
+    ))
+
+
+@pytest.mark.asyncio
+async def test_idle_local_runner_answers_locally(llm):
+    assert await answer(llm) == "local"
+
+
+@pytest.mark.asyncio
+async def test_saturated_local_runner_offloads(llm, monkeypatch):
+    monkeypatch.setattr(local_load, "in_flight", 4)
+    assert llm.route("Writer") == "remote"
+    assert await answer(llm) == "remote"
+
+
+def test_slow_local_runner_offloads(llm, monkeypatch):
+    monkeypatch.setattr(hybrid, "config", hybrid.config.replace(hybrid_max_local_latency=2.0))
+    monkeypatch.setattr(local_load, "latency", 5.0)
+    assert llm.route("Writer") == "remote"
+
+
+def test_remote_concurrency_limit_keeps_calls_local(llm, monkeypatch):
+    monkeypatch.setattr(local_load, "in_flight", 4)
+    monkeypatch.setattr(routing_stats, "remote_in_flight", 8)
+    assert llm.route("Writer") == "local"
+
+
+def test_agent_policies(llm, monkeypatch):
+    monkeypatch.setattr(hybrid, "config", hybrid.config.replace(
+        hybrid_agent_policies={"Searcher": "remote", "Reviewer": "local"},
+    ))
+    monkeypatch.setattr(local_load, "in_flight", 4)
+    assert llm.route("Searcher") == "remote"
+    assert llm.route("Reviewer") == "local"
+    assert llm.route("Writer") == "remote"
+
+
+def test_without_remote_everything_stays_local(monkeypatch):
+    monkeypatch.setattr(local_load, "in_flight", 100)
+    assert HybridLlm(local=FakeLlm(model="local"), policy="remote").route("Writer") == "local"
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        HybridLlm(local=FakeLlm(model="local"), policy="fastest")
+
+
+@pytest.mark.asyncio
+async def test_failed_remote_falls_back_to_local():
+    llm = HybridLlm(local=FakeLlm(model="local"), remote=FakeLlm(model="remote", fail=True), policy="remote")
+    assert await answer(llm) == "local"
+    assert routing_stats.remote_in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_local_route_drops_builtin_tools(llm):
+    request = make_request()
+    request.config.tools = [
+        types.Tool(google_search=types.GoogleSearch()),
+        types.Tool(function_declarations=[types.FunctionDeclaration(name="lookup")]),
+    ]
+    [response async for response in llm.generate_content_async(request)]
+    assert [tool.function_declarations[0].name for tool in request.config.tools] == ["lookup"]
@@ -0,0 +1,125 @@
+"""PipelineMemo expiry, stale-while-revalidate and the memoize_pipeline key"""
+
+import asyncio
+
+import pytest
+from google.adk.agents.llm_agent import LlmAgent
+
+import memo
+from memo import PipelineMemo, agent_graph_version, memoize_pipeline, normalize_query
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(memo.time, "monotonic", clock)
+    return clock
+
+
+def counter():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"answer": len(calls)}
+    return compute, calls
+
+
+@pytest.mark.asyncio
+async def test_fresh_entries_are_reused(clock):
+    cache, (compute, calls) = PipelineMemo(ttl=60), counter()
+    assert await cache.get_or_compute(("k",), compute) == {"answer": 1}
+    clock.now += 59
+    assert await cache.get_or_compute(("k",), compute) == {"answer": 1}
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_recomputed(clock):
+    cache, (compute, calls) = PipelineMemo(ttl=60), counter()
+    await cache.get_or_compute(("k",), compute)
+    clock.now += 61
+    assert await cache.get_or_compute(("k",), compute) == {"answer": 2}
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_refreshing(clock):
+    cache, (compute, calls) = PipelineMemo(ttl=60, stale_ttl=30), counter()
+    await cache.get_or_compute(("k",), compute)
+    clock.now += 75
+    # Stale: answered from the cache at once, refreshed in the background (once)
+    assert await cache.get_or_compute(("k",), compute) == {"answer": 1}
+    assert await cache.get_or_compute(("k",), compute) == {"answer": 1}
+    await asyncio.sleep(0)
+    assert len(calls) == 2
+    assert await cache.get_or_compute(("k",), compute) == {"answer": 2}
+
+    clock.now += 91  # past ttl + stale_ttl: computed inline
+    assert await cache.get_or_compute(("k",), compute) == {"answer": 3}
+
+
+@pytest.mark.asyncio
+async def test_should_cache_and_disabled_cache(clock):
+    cache, (compute, calls) = PipelineMemo(ttl=60), counter()
+    await cache.get_or_compute(("k",), compute, should_cache=lambda result: False)
+    await cache.get_or_compute(("k",), compute)
+    assert len(calls) == 2
+
+    disabled, (compute, calls) = PipelineMemo(ttl=0), counter()
+    await disabled.get_or_compute(("k",), compute)
+    await disabled.get_or_compute(("k",), compute)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_values_are_copies(clock):
+    cache, (compute, calls) = PipelineMemo(ttl=60), counter()
+    (await cache.get_or_compute(("k",), compute))["answer"] = "changed"
+    assert await cache.get_or_compute(("k",), compute) == {"answer": 1}
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction(clock):
+    cache, (compute, calls) = PipelineMemo(ttl=60, max_entries=2), counter()
+    for key in ("a", "b", "a", "c"):
+        await cache.get_or_compute((key,), compute)
+    await cache.get_or_compute(("a",), compute)
+    assert len(calls) == 3
+    await cache.get_or_compute(("b",), compute)
+    assert len(calls) == 4
+
+
+def test_normalize_query():
+    assert normalize_query("  Python   developer JOBS remote?! ") == normalize_query("python developer jobs remote")
+
+
+def test_graph_version_follows_instructions():
+    agent = LlmAgent(name="Writer", model="m", instruction="Write.")
+    version = agent_graph_version(agent)
+    assert agent_graph_version(LlmAgent(name="Writer", model="m", instruction="Write.")) == version
+    agent.instruction = "Write briefly."
+    assert agent_graph_version(agent) != version
+
+
+@pytest.mark.asyncio
+async def test_memoize_pipeline_caches_plain_calls_only(clock):
+    agent = LlmAgent(name="Writer", model="m", instruction="Write.")
+    calls = []
+
+    @memoize_pipeline(agent, memo=PipelineMemo(ttl=60))
+    async def run(query, sink=None):
+        calls.append(query)
+        return query.upper()
+
+    assert await run("hello") == "HELLO"
+    assert await run("Hello.") == "HELLO"
+    await run("hello", sink=object())
+    assert calls == ["hello", "hello"]
@@ -0,0 +1,56 @@
+"""PromptTemplate compilation and slot capping"""
+
+import pytest
+
+from config import config
+from prompts import PromptTemplate, cap_text
+
+
+def test_cap_text():
+    assert cap_text("short", 10) == "short"
+    assert cap_text("abcdefghij" * 2, 5) == "abcde\n[... 15 more characters truncated]"
+    assert cap_text("anything", None) == "anything"
+
+
+def test_static_prefix_is_dedented_and_stable():
+    template = PromptTemplate("""
+        You are a reviewer.
+        Review the code.
+    """, slots={"code": 100})
+    assert template.static_text == "You are a reviewer.\nReview the code."
+    assert template.render({"code": "a"}).startswith(template.static_text)
+    assert template.render({"code": "b"}).startswith(template.static_text)
+
+
+def test_slots_render_in_declared_order_and_skip_missing():
+    template = PromptTemplate("Task.", slots={"plan": 100, "draft": 100, "notes": 100})
+    assert template.render({"draft": "D", "plan": "P", "notes": ""}) == (
+        "Task.\n\n<plan>\nP\n</plan>\n\n<draft>\nD\n</draft>"
+    )
+
+
+def test_slots_are_capped():
+    template = PromptTemplate("Task.", slots={"draft": 4})
+    assert template.render({"draft": "abcdefgh"}) == (
+        "Task.\n\n<draft>\nabcd\n[... 4 more characters truncated]\n</draft>"
+    )
+
+
+def test_default_cap_and_structured_values():
+    template = PromptTemplate("Task.", slots=["data"])
+    assert template.slots == {"data": config.prompt_slot_max_chars}
+    assert template.render({"data": {"b": 1}}) == 'Task.\n\n<data>\n{"b": 1}\n</data>'
+
+
+def test_inline_placeholders_are_rejected():
+    with pytest.raises(ValueError):
+        PromptTemplate("Review {generated_code} carefully.")
+    with pytest.raises(ValueError):
+        PromptTemplate("Use {notes?} if present.")
+
+
+def test_instruction_provider_reads_state():
+    class Context:
+        state = {"draft": "D"}
+
+    assert PromptTemplate("Task.", slots={"draft": 10})(Context()) == "Task.\n\n<draft>\nD\n</draft>"
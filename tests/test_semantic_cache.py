@@ -0,0 +1,106 @@
+"""Semantic cache lookups and how the model client survives embedding failures"""
+
+import numpy as np
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+import semantic_cache as semantic_cache_module
+from model_client import ModelRunnerLlm
+from semantic_cache import SemanticCache
+
+
+class FakeEmbedder:
+    """Bag-of-letters vectors; counts calls, or fails when `down`"""
+
+    def __init__(self, down: bool = False):
+        self.calls = 0
+        self.down = down
+
+    async def embed(self, text: str) -> np.ndarray:
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("embedding endpoint unreachable")
+        vector = np.zeros(26, dtype=np.float32)
+        for char in text.lower():
+            if char.isalpha():
+                vector[ord(char) - ord("a")] += 1
+        return vector
+
+
+@pytest.mark.asyncio
+async def test_lookup_respects_threshold_and_namespace():
+    cache = SemanticCache(FakeEmbedder(), max_entries=4)
+    await cache.store("ns", "build a landing page", "page")
+    assert await cache.lookup("ns", "build a landing page!", 0.99) == "page"
+    assert await cache.lookup("ns", "xyz qqq", 0.9) is None
+    assert await cache.lookup("other", "build a landing page", 0.5) is None
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    cache = SemanticCache(FakeEmbedder(), max_entries=2)
+    for prompt in ("aaa", "bbb", "ccc"):
+        await cache.store("ns", prompt, prompt)
+    assert await cache.lookup("ns", "aaa", 0.99) is None
+    assert await cache.lookup("ns", "ccc", 0.99) == "ccc"
+
+
+def llm_and_request():
+    llm = ModelRunnerLlm(model="openai/test", semantic_cache_threshold=0.9, api_base="http://127.0.0.1:9/v1")
+    request = LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text="hello there")])])
+    return llm, request
+
+
+def fake_upstream(calls):
+    async def generate(self, llm_request, stream, agent_name):
+        calls.append(1)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="hi")]))
+    return generate
+
+
+async def answers(llm, request):
+    return [response async for response in llm._generate_cached(request, False, "Writer")]
+
+
+@pytest.mark.asyncio
+async def test_miss_embeds_once_then_hits(monkeypatch):
+    embedder, calls = FakeEmbedder(), []
+    monkeypatch.setattr(semantic_cache_module, "semantic_cache", SemanticCache(embedder))
+    monkeypatch.setattr(ModelRunnerLlm, "_generate_upstream", fake_upstream(calls))
+    llm, request = llm_and_request()
+
+    await answers(llm, request)
+    assert embedder.calls == 1  # one embedding serves both the lookup and the store
+    [hit] = await answers(llm, request)
+    assert hit.custom_metadata == {"semantic_cache_hit": True}
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_unreachable_embedding_model_is_a_miss(monkeypatch):
+    calls = []
+    monkeypatch.setattr(semantic_cache_module, "semantic_cache", SemanticCache(FakeEmbedder(down=True)))
+    monkeypatch.setattr(ModelRunnerLlm, "_generate_upstream", fake_upstream(calls))
+    llm, request = llm_and_request()
+
+    [response] = await answers(llm, request)
+    assert response.content.parts[0].text == "hi"
+    [response] = await answers(llm, request)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_store_is_skipped(monkeypatch):
+    cache, calls = SemanticCache(FakeEmbedder()), []
+
+    async def broken_store(*args, **kwargs):
+        raise RuntimeError("index full")
+
+    monkeypatch.setattr(cache, "store", broken_store)
+    monkeypatch.setattr(semantic_cache_module, "semantic_cache", cache)
+    monkeypatch.setattr(ModelRunnerLlm, "_generate_upstream", fake_upstream(calls))
+    llm, request = llm_and_request()
+    [response] = await answers(llm, request)
+    assert response.content.parts[0].text == "hi"
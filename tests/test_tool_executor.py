@@ -0,0 +1,47 @@
+"""Moving synchronous tools off the event loop"""
+
+import asyncio
+import inspect
+import threading
+
+import pytest
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.tools import FunctionTool
+
+from tool_executor import offload, offload_tools
+
+
+def where(x: int) -> dict:
+    """Report the thread the tool ran on"""
+    return {"thread": threading.current_thread().name, "x": x}
+
+
+def test_offload_tools_keeps_tool_settings():
+    tool = FunctionTool(where, require_confirmation=True)
+    declaration = tool._get_declaration()
+    agent = LlmAgent(name="Worker", model="m", tools=[tool, where])
+    offload_tools(LlmAgent(name="Root", model="m", sub_agents=[agent]))
+    offload_tools(agent)  # applying twice is harmless
+
+    assert agent.tools[0] is tool
+    assert inspect.iscoroutinefunction(tool.func) and tool.func.__wrapped__ is where
+    assert tool._get_declaration() == declaration
+    assert asyncio.run(tool.check_require_confirmation({"x": 1}, None)) is True
+    assert inspect.iscoroutinefunction(agent.tools[1])
+
+
+@pytest.mark.asyncio
+async def test_offloaded_tool_runs_on_the_pool():
+    result = await offload(where)(x=1)
+    assert result["thread"].startswith("adk-tool")
+
+
+@pytest.mark.asyncio
+async def test_timeout_returns_an_error_result():
+    def slow() -> dict:
+        """Sleep"""
+        threading.Event().wait(0.5)
+        return {}
+
+    result = await offload(slow, timeout=0.05)()
+    assert "timed out" in result["error"]
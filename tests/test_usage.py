@@ -0,0 +1,122 @@
+"""UsageLedger totals and eviction, and the soft and hard token budgets"""
+
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+import usage
+from config import config
+from usage import BUDGET_EXCEEDED, UsageLedger, enforce_token_budget, record_token_usage
+
+
+def callback_context(run="run-1", session="session-1", user="user-1", agent="Writer"):
+    return SimpleNamespace(
+        invocation_id=run,
+        session=SimpleNamespace(id=session),
+        user_id=user,
+        agent_name=agent,
+        actions=SimpleNamespace(escalate=None),
+    )
+
+
+def token_counts(prompt, completion):
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt, candidates_token_count=completion, total_token_count=prompt + completion,
+    )
+
+
+def budgets(**limits):
+    """Budgets like config.token_budgets, e.g. budgets(run={"hard": 100})"""
+    return {scope: {"soft": 0, "hard": 0, **limits.get(scope, {})} for scope in ("run", "session", "user")}
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    """Install a fresh ledger with the given budgets, mirrored in the config"""
+    def install(**limits):
+        limits = budgets(**limits)
+        monkeypatch.setattr(usage, "config", config.replace(token_budgets=limits))
+        monkeypatch.setattr(usage, "usage_ledger", UsageLedger(limits))
+        return usage.usage_ledger
+    return install
+
+
+def test_totals_per_scope_with_agent_breakdown():
+    ledger = UsageLedger()
+    ledger.record(callback_context(agent="Writer"), token_counts(10, 5))
+    ledger.record(callback_context(agent="Reviewer"), token_counts(20, 2))
+    ledger.record(callback_context(run="run-2", agent="Writer"), None, cached=True)
+
+    run = ledger.usage("run", "run-1")
+    assert (run["prompt_tokens"], run["completion_tokens"], run["total_tokens"], run["calls"]) == (30, 7, 37, 2)
+    assert run["agents"]["Reviewer"]["total_tokens"] == 22
+
+    user = ledger.usage("user", "user-1")
+    assert (user["total_tokens"], user["calls"], user["cached_calls"]) == (37, 2, 1)
+    assert ledger.usage("agent", "Writer")["cached_calls"] == 1
+    assert ledger.usage("run", "unknown") is None
+    with pytest.raises(ValueError):
+        ledger.usage("team", "a")
+
+
+def test_runs_and_sessions_are_bounded():
+    ledger = UsageLedger(max_entries=2)
+    for run in ("run-1", "run-2", "run-3"):
+        ledger.record(callback_context(run=run), token_counts(1, 1))
+    assert ledger.usage("run", "run-1") is None
+    assert ledger.usage("run", "run-3")["total_tokens"] == 2
+    # Users and agents are kept: they are what the summary reports on
+    assert ledger.usage("user", "user-1")["calls"] == 3
+
+
+def test_check_reports_hard_limits_before_soft_ones():
+    ledger = UsageLedger(budgets(run={"soft": 10}, user={"hard": 15}))
+    assert ledger.check(callback_context()) is None
+    ledger.record(callback_context(), token_counts(10, 2))
+    assert ledger.check(callback_context()) == ("run", "soft", 12)
+    ledger.record(callback_context(run="run-2"), token_counts(3, 0))
+    assert ledger.check(callback_context(run="run-2")) == ("user", "hard", 15)
+
+
+def test_hard_budget_stops_the_run(ledger):
+    ledger(run={"hard": 100})
+    context = callback_context()
+    record_token_usage(context, LlmResponse(usage_metadata=token_counts(90, 20)))
+
+    response = enforce_token_budget(context, LlmRequest())
+    assert response.error_code == BUDGET_EXCEEDED
+    assert "110 of 100 tokens" in response.content.parts[0].text
+    assert context.actions.escalate is True
+
+    # Other runs have their own budget
+    assert enforce_token_budget(callback_context(run="run-2"), LlmRequest()) is None
+
+
+def test_soft_budget_caps_answers(ledger):
+    ledger(session={"soft": 50})
+    record_token_usage(callback_context(), LlmResponse(usage_metadata=token_counts(40, 20)))
+    cap = config.token_budget_downgrade_max_tokens
+
+    request = LlmRequest()
+    assert enforce_token_budget(callback_context(run="run-2"), request) is None
+    assert request.config.max_output_tokens == cap
+
+    request = LlmRequest(config=types.GenerateContentConfig(max_output_tokens=cap // 2))
+    enforce_token_budget(callback_context(run="run-2"), request)
+    assert request.config.max_output_tokens == cap // 2
+
+    # Under budget nothing changes
+    request = LlmRequest()
+    assert enforce_token_budget(callback_context(session="session-2"), request) is None
+    assert request.config.max_output_tokens is None
+
+
+def test_partial_and_replayed_responses_add_no_tokens(ledger):
+    ledger()
+    record_token_usage(callback_context(), LlmResponse(partial=True, usage_metadata=token_counts(5, 5)))
+    record_token_usage(callback_context(), LlmResponse(custom_metadata={"semantic_cache_hit": True}))
+    run = usage.usage_ledger.usage("run", "run-1")
+    assert (run["total_tokens"], run["calls"], run["cached_calls"]) == (0, 0, 1)